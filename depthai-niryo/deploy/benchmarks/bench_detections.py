@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Microbenchmark of the post-processing of a frame
+
+Measures the cost of turning the detections of one frame into what the loop needs (mqtt
+records, label names, boxes and positions for the tracker, mask of the objects to grab)
+with the structured arrays of :mod:`src.runtime.detections`, compared with the previous
+processing one detection at a time.
+
+Examples:
+    From *depthai-niryo/deploy*:
+
+        $ python3 -m benchmarks.bench_detections --detections 1 5 20 50
+"""
+
+import argparse, random, timeit
+from typing import Dict, List
+from .common import save_results, compare
+
+import numpy as np
+from src.mqtt.payload import DetectionRecord
+from src.runtime.detections import LabelIndex, to_array, to_boxes, to_positions, grabbable
+from src.runtime.frame_source import SpatialDetection
+
+LABELS = ["good", "not_good"]
+WIDTH, HEIGHT = 416, 416
+DEPTH_RANGE = (100, 500)
+
+def make_detections(n: int, seed: int=0) -> List[SpatialDetection]:
+    rng = random.Random(seed)
+    detections = []
+    for _ in range(n):
+        x, y = rng.uniform(0, 0.8), rng.uniform(0, 0.8)
+        detections.append(SpatialDetection(rng.randrange(len(LABELS)), rng.random(), x, y, x + 0.2, y + 0.2,
+            rng.uniform(-200, 200), rng.uniform(-200, 200), rng.uniform(50, 600)))
+    return detections
+
+""" previous implementation of the roi stage of ObjectDetection """
+def legacy(detections: List[SpatialDetection]):
+    records, labels = [], []
+    for detection in detections:
+        x1 = int(detection.xmin * WIDTH)
+        x2 = int(detection.xmax * WIDTH)
+        y1 = int(detection.ymin * HEIGHT)
+        y2 = int(detection.ymax * HEIGHT)
+        try:
+            label = LABELS[detection.label]
+        except:
+            label = detection.label
+        c = detection.spatialCoordinates
+        x, y, z = round(c.x, 3), round(c.y, 3), round(c.z, 3)
+        records.append(DetectionRecord(detection.label, detection.confidence, x1, x2, y1, y2, x, y, z))
+        labels.append(label)
+    boxes = np.asarray([(d.xmin, d.ymin, d.xmax, d.ymax) for d in detections], dtype=np.float64).reshape(-1, 4)
+    positions = np.asarray([r[6:] for r in records], dtype=np.float64).reshape(-1, 3)
+    low, high = DEPTH_RANGE
+    candidates = [i for i, label in enumerate(labels) if label == "not_good"
+        and np.all(positions[i].astype(int) != 0) and low <= positions[i][2] <= high]
+    return records, boxes, positions, candidates
+
+def vectorized(detections: List[SpatialDetection], labels: LabelIndex):
+    records = to_array(detections, WIDTH, HEIGHT)
+    positions = to_positions(records)
+    candidates = np.flatnonzero(grabbable(records["label"], positions, labels.id_of("not_good"), DEPTH_RANGE))
+    return records, to_boxes(records), positions, candidates
+
+def bench(sizes: List[int], number: int, repeat: int) -> Dict:
+    labels = LabelIndex(LABELS)
+    results = {}
+    for n in sizes:
+        detections = make_detections(n)
+        assert list(legacy(detections)[3]) == vectorized(detections, labels)[3].tolist()
+        steps = {"legacy": lambda: legacy(detections), "array": lambda: vectorized(detections, labels)}
+        result = {}
+        for name, step in steps.items():
+            seconds = min(timeit.repeat(step, number=number, repeat=repeat)) / number
+            result[name] = {"us": round(seconds * 1e6, 3), "us_per_detection": round(seconds * 1e6 / max(n, 1), 3)}
+        results["{}_detections".format(n)] = result
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--detections", type=int, nargs="+", default=[1, 5, 20, 50], help="detections per frame")
+    parser.add_argument("--number", type=int, default=2000, help="frames per measure")
+    parser.add_argument("--repeat", type=int, default=5, help="measures, the fastest is kept")
+    parser.add_argument("--output", help="where to save the results, defaults to benchmarks/results/detections-<commit>.json")
+    parser.add_argument("--baseline", help="results file of a previous run to compare with")
+    args = parser.parse_args()
+
+    results = bench(args.detections, args.number, args.repeat)
+    print("\n{:<16} {:<8} {:>10} {:>14}".format("frame", "stage", "us", "us/detection"))
+    for frame, result in results.items():
+        for name, metrics in result.items():
+            print("{:<16} {:<8} {:>10.3f} {:>14.3f}".format(frame, name, metrics["us"], metrics["us_per_detection"]))
+    results["parameters"] = {"detections": args.detections, "number": args.number, "repeat": args.repeat}
+    save_results("detections", results, args.output)
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
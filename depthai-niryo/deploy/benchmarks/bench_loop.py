@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""End-to-end benchmark of the detection -> robot -> mqtt loop
+
+Runs ``ObjectDetection.run`` on a synthetic conveyor with a mock Niryo tcp server and a
+mock MQTT broker, so it only needs a plain Linux box. It reports the frames per second,
+the latency percentiles of every stage of the loop and the picks per minute.
+
+The robot runs on its own thread, the frames are paced at ``--fps`` by default so that the
+camera and the robot share the same time base. ``--fast`` reads the frames as fast as
+possible to measure the camera loop alone, the robot barely moves in this mode.
+
+Examples:
+    From *depthai-niryo/deploy*:
+
+        $ python3 -m benchmarks.bench_loop --frames 3000
+        $ python3 -m benchmarks.bench_loop --frames 3000 --fast
+        $ python3 -m benchmarks.bench_loop --output baseline.json
+        $ python3 -m benchmarks.bench_loop --baseline baseline.json
+        $ python3 -m benchmarks.bench_loop --no-intercept
+        $ python3 -m benchmarks.bench_loop --video 3
+"""
+
+import argparse, contextlib, os, tempfile, threading
+from typing import Dict
+from .common import DEPLOY_DIR, save_results, compare
+
+from src.utils import global_var
+from src.mqtt import MqttClient, PublishPolicy
+from src.niryo import Niryo
+from src.runtime import ObjectDetection, SyntheticFrameSource, InterceptPredictor, VideoStreamer
+from src.runtime.profiler import LoopProfiler
+from src.sim import MockNiryoServer, MockMqttBroker
+
+def run_benchmark(frames: int=1000, fps: float=30., realtime: bool=True, config: str="gear_yolov5.json",
+    n_objects: int=3, seed: int=0, verbose: bool=False, time_scale: float=0.1, policy: PublishPolicy=None,
+    predictor: InterceptPredictor=None, depth_failure_rate: float=0., host_depth: bool=False, streams: str="",
+    video_clients: int=0) -> Dict:
+    """Run the loop once and return its metrics"""
+    server = MockNiryoServer(port=0, time_scale=time_scale).start_in_thread()
+    broker = MockMqttBroker(port=0).start_in_thread()
+    global_var.init_var()
+    mqtt_client = None
+    streamer = None
+    out = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    try:
+        with tempfile.TemporaryDirectory() as models_dir, out:
+            # the blob is never uploaded with a synthetic source, a placeholder is enough
+            open(os.path.join(models_dir, "placeholder.blob"), "wb").close()
+            args = {"model": "placeholder.blob", "config": config, "threshold_up": 500, "threshold_down": 100,
+                "host_depth": host_depth, "streams": streams}
+            mqtt_client = MqttClient(broker.host, "cam", "niryo", broker.port, verbose=False, policy=policy)
+            global_var.NIRYO = Niryo(ip=server.host, port=server.port)
+            od = ObjectDetection(args, model_basename=models_dir,
+                config_basename=str(DEPLOY_DIR / "config"), mqtt_client=mqtt_client)
+            if video_clients:
+                # viewers of the mjpeg stream, reading every part like the api
+                streamer = VideoStreamer(renderer=od.overlay)
+                od.attach_video(streamer)
+                streamer.start()
+                for _ in range(video_clients):
+                    threading.Thread(target=lambda: all(True for _ in streamer.frames()), daemon=True).start()
+            # like the device, the synthetic camera only produces the consumed frames
+            source = SyntheticFrameSource(od.W, od.H, labels=od.labels, n_frames=frames, fps=fps,
+                realtime=realtime, n_objects=n_objects, depth_failure_rate=depth_failure_rate, seed=seed,
+                with_rgb="rgb" in od.streams, depth_size=(640, 400) if "depth" in od.streams else None)
+            profiler = LoopProfiler()
+            od.run(frame_source=source, profiler=profiler, predictor=predictor)
+    finally:
+        if streamer is not None:
+            streamer.stop()
+        if global_var.NIRYO is not None:
+            global_var.NIRYO.quit()
+        if mqtt_client is not None:
+            mqtt_client.quit()
+        server.stop_thread()
+        broker.stop_thread()
+
+    report = profiler.report()
+    elapsed = report["elapsed_s"]
+    counters = report["counters"]
+    if streamer is not None:
+        counters["video_encoded"] = streamer.encoded
+        counters["video_skipped"] = streamer.skipped
+        counters["overlay_mean_ms"] = streamer.renderer.report()["mean_ms"]
+        counters["overlay_max_ms"] = streamer.renderer.report()["max_ms"]
+    return {
+        "frames": counters.get("frames", 0),
+        "fps": round(counters.get("frames", 0) / elapsed, 2),
+        "picks_per_minute": round(counters.get("picks", 0) / elapsed * 60, 3),
+        "elapsed_s": elapsed,
+        "stages": report["stages"],
+        "counters": counters,
+        "mqtt_messages": broker.total_messages,
+        "mqtt_bytes": broker.total_bytes,
+        "mqtt_sent": mqtt_client.outbound.sent,
+        "mqtt_dropped": mqtt_client.outbound.dropped,
+        "mqtt_suppressed": policy.suppressed if policy is not None else 0,
+        "mqtt_rate_limited": policy.rate_limited if policy is not None else 0,
+        "niryo_commands": dict(server.commands),
+        "robot_motion_s": round(server.busy_time, 3),
+        "robot_latency_s": round(predictor.latency.value, 3) if predictor is not None else None
+    }
+
+def print_report(results: Dict) -> None:
+    print("\n[BENCH] {} frames in {}s : {} fps | {} picks/min | {} mqtt messages ({} bytes)".format(
+        results["frames"], results["elapsed_s"], results["fps"], results["picks_per_minute"],
+        results["mqtt_messages"], results["mqtt_bytes"]))
+    counters = results["counters"]
+    print("[BENCH] MQTT : {} sent, {} dropped, {} unchanged frames suppressed, {} frames rate limited".format(
+        results["mqtt_sent"], results["mqtt_dropped"], results["mqtt_suppressed"], results["mqtt_rate_limited"]))
+    print("[BENCH] Robot : {} targets received, {} stale targets dropped, {} aborts".format(
+        counters.get("targets", 0), counters.get("targets_dropped", 0), counters.get("aborts", 0)))
+    print("[BENCH] Depth : {} detections positioned from the depth frame".format(counters.get("depth_fallbacks", 0)))
+    if results["robot_latency_s"] is not None:
+        print("[BENCH] Intercept : measured robot latency {}s, {} grabs without prediction".format(
+            results["robot_latency_s"], counters.get("no_prediction", 0)))
+    if "video_encoded" in counters:
+        print("[BENCH] Video : {} frames encoded for all the clients, {} frames replaced before their encoding, overlay {} ms mean {} ms max".format(
+            counters["video_encoded"], counters["video_skipped"], counters["overlay_mean_ms"], counters["overlay_max_ms"]))
+    print("{:<20} {:>8} {:>10} {:>10} {:>10} {:>10}".format("stage", "count", "p50 ms", "p90 ms", "p99 ms", "max ms"))
+    for name, stage in results["stages"].items():
+        print("{:<20} {:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+            name, stage["count"], stage["p50_ms"], stage["p90_ms"], stage["p99_ms"], stage["max_ms"]))
+    print("[BENCH] Niryo commands {}".format(results["niryo_commands"]))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--frames", type=int, default=1000, help="number of synthetic frames")
+    parser.add_argument("--fps", type=float, default=30., help="frame rate of the synthetic camera")
+    parser.add_argument("--fast", action="store_true", help="read the frames as fast as possible instead of pacing them")
+    parser.add_argument("--config", default="gear_yolov5.json", help="json config located in deploy/config")
+    parser.add_argument("--objects", type=int, default=3, help="objects visible at the same time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-scale", type=float, default=0.1, help="factor applied by the mock robot to the motion durations")
+    parser.add_argument("--publish-all", action="store_true", help="publish every frame instead of only the changes and keyframes")
+    parser.add_argument("--max-rate", type=float, default=0., help="frames published per second, 0 for no limit")
+    parser.add_argument("--no-intercept", action="store_true", help="center the object with the roi loop instead of predicting its position")
+    parser.add_argument("--depth-failures", type=float, default=0., help="part of the detections without spatial coordinates")
+    parser.add_argument("--host-depth", action="store_true", help="position the detections without spatial coordinates from the depth frame")
+    parser.add_argument("--streams", default="", help="frames consumed besides the detections, comma separated rgb, depth")
+    parser.add_argument("--video", type=int, default=0, help="clients of the mjpeg stream, frames are encoded once for all of them")
+    parser.add_argument("--verbose", action="store_true", help="keep the output of the loop")
+    parser.add_argument("--output", help="where to save the results, defaults to benchmarks/results/loop-<commit>.json")
+    parser.add_argument("--baseline", help="results file of a previous run to compare with")
+    args = parser.parse_args()
+
+    policy = None if args.publish_all else PublishPolicy(max_rate=args.max_rate)
+    predictor = None if args.no_intercept else InterceptPredictor()
+    results = run_benchmark(args.frames, args.fps, not args.fast, args.config, args.objects, args.seed, args.verbose,
+        args.time_scale, policy, predictor, args.depth_failures, args.host_depth, args.streams, args.video)
+    results["parameters"] = {"frames": args.frames, "fps": args.fps, "realtime": not args.fast,
+        "config": args.config, "objects": args.objects, "seed": args.seed, "time_scale": args.time_scale,
+        "publish_all": args.publish_all, "max_rate": args.max_rate,
+        "intercept": not args.no_intercept, "depth_failures": args.depth_failures,
+        "host_depth": args.host_depth, "streams": args.streams, "video": args.video}
+    print_report(results)
+    save_results("loop", results, args.output)
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
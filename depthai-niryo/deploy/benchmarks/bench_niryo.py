@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Niryo command latency and pick-cycle benchmark
+
+Runs against the mock Niryo tcp server :
+    * command latency : every client sends a mix of GET_POSE, SHIFT_POSE and SET_ARM_MAX_VELOCITY,
+      several clients can load the server at the same time
+    * pick cycle : the grabing sequence of :obj:`Niryo` (first move, roi loop, grab) on a fixed object
+    * split answers : the answers of a server sending every answer in two segments ``--split-delay``
+      seconds apart are the same as when they are sent at once, the run fails otherwise
+
+Durations of the motions are simulated by the server and scaled by ``--time-scale``, the
+report gives both the wall time of a cycle and its motion time in real robot seconds.
+
+Examples:
+    From *depthai-niryo/deploy*:
+
+        $ python3 -m benchmarks.bench_niryo --clients 4 --commands 200
+        $ python3 -m benchmarks.bench_niryo --baseline benchmarks/results/niryo-abc1234.json
+        $ python3 -m benchmarks.bench_niryo --split-delay 0.2
+"""
+
+import argparse, asyncio, contextlib, os, sys, threading, time
+import numpy as np
+from enum import Enum
+from typing import Dict, List
+from .common import save_results, compare
+
+from niryo_one_tcp_client import NiryoOneClient, AsyncNiryoOneClient, PoseObject, RobotAxis, RobotPin, CalibrateMode, Shape, Color
+from src.niryo import Niryo
+from src.sim import MockNiryoServer
+
+def percentiles(samples: List[float]) -> Dict:
+    values = np.asarray(samples) * 1000
+    p50, p90, p99 = np.percentile(values, (50, 90, 99))
+    return {"count": len(values), "mean_ms": round(float(values.mean()), 4), "p50_ms": round(float(p50), 4),
+        "p90_ms": round(float(p90), 4), "p99_ms": round(float(p99), 4)}
+
+def bench_commands(server: MockNiryoServer, clients: int, commands: int) -> Dict:
+    """Latency per command type with several clients connected at the same time"""
+    samples = {"GET_POSE": [], "SHIFT_POSE": [], "SET_ARM_MAX_VELOCITY": []}
+    drained = [0]
+    lock = threading.Lock()
+
+    def worker():
+        client = NiryoOneClient(port=server.port)
+        client.connect(server.host)
+        client.calibrate(CalibrateMode.AUTO)
+        local = {name: [] for name in samples}
+        for i in range(commands):
+            for name, call in (("GET_POSE", client.get_pose),
+                               ("SHIFT_POSE", lambda: client.shift_pose(RobotAxis.YAW, 0.01 if i % 2 else -0.01)),
+                               ("SET_ARM_MAX_VELOCITY", lambda: client.set_arm_max_velocity(100))):
+                start = time.perf_counter()
+                call()
+                local[name].append(time.perf_counter() - start)
+        client.quit()
+        with lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+            drained[0] += client.drained_answers
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    total = sum(len(values) for values in samples.values())
+    # answers whose end was only found by the idle timeout of the client
+    return {"clients": clients, "commands_per_s": round(total / elapsed, 2), "drained_answers": drained[0],
+        "latency": {name: percentiles(values) for name, values in samples.items()}}
+
+def bench_pick_cycle(server: MockNiryoServer, cycles: int) -> Dict:
+    """Duration and number of commands of the grabing sequence"""
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        niryo = Niryo(ip=server.host, port=server.port)
+    durations, counts, motions = [], [], []
+    # object seen 35cm away, slightly on the left, then centered after the first move
+    sequence = [(60., -40., 350.), (12., 25., 320.), (5., 8., 300.)]
+    for _ in range(cycles):
+        before = sum(server.commands.values())
+        busy = server.busy_time
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            niryo.seq_first_move_to_roi(*sequence[0])
+            satisfying = False
+            for x, y, z in sequence[1:]:
+                if satisfying:
+                    break
+                satisfying = niryo.seq_do_roi_loop(x, y, z)
+            niryo.seq_grab_object(*sequence[-1])
+        durations.append(time.perf_counter() - start)
+        counts.append(sum(server.commands.values()) - before)
+        motions.append(server.busy_time - busy)
+    niryo.quit()
+    return {"cycles": cycles, "commands_per_cycle": float(np.mean(counts)),
+        "cycle_s": round(float(np.mean(durations)), 4),
+        # simulated duration of the motions, in real robot seconds
+        "motion_s": round(float(np.mean(motions)), 4)}
+
+CORNER = PoseObject(0.3, 0.1, 0.1, 0., 1.57, 0.)
+# commands whose answers are compared, with and without data, fixed and bracketed fields
+SPLIT_ANSWER_CALLS = [
+    ("calibrate", (CalibrateMode.AUTO,)),
+    ("create_workspace", ("bench", CORNER, CORNER, CORNER, CORNER)),
+    ("get_pose", ()),
+    ("get_joints", ()),
+    ("get_hardware_status", ()),
+    ("get_digital_io_state", ()),
+    ("digital_read", (RobotPin.GPIO_1A,)),
+    ("detect_object", ("bench", Shape.ANY, Color.ANY)),
+    ("get_target_pose_from_cam", ("bench", 0.01, Shape.ANY, Color.ANY)),
+    ("shift_pose", (RobotAxis.X, 0.01)),
+    ("set_arm_max_velocity", (100,)),
+    ("get_pose", ()),
+]
+
+def answer_text(answer) -> str:
+    """Comparable text of an answer, the answer objects without __str__ by their attributes"""
+    if isinstance(answer, (list, tuple)):
+        return "({})".format(", ".join(answer_text(value) for value in answer))
+    if hasattr(answer, "__dict__") and not isinstance(answer, (Enum, PoseObject)):
+        return str(vars(answer))
+    return str(answer)
+
+def error_text(error: Exception) -> str:
+    return "{}: {}".format(type(error).__name__, error)
+
+def sync_answers(server: MockNiryoServer) -> List[str]:
+    client = NiryoOneClient(port=server.port)
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        client.connect(server.host)
+    answers = []
+    for name, args in SPLIT_ANSWER_CALLS:
+        try:
+            answers.append(answer_text(getattr(client, name)(*args)))
+        except Exception as e:
+            answers.append(error_text(e))
+    client.quit()
+    return answers
+
+async def async_answers(server: MockNiryoServer) -> List[str]:
+    client = AsyncNiryoOneClient(port=server.port, command_timeout=5.)
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        await client.connect(server.host)
+    answers = []
+    for name, args in SPLIT_ANSWER_CALLS:
+        try:
+            answers.append(answer_text(await getattr(client, name)(*args)))
+        except Exception as e:
+            answers.append(error_text(e))
+    await client.quit()
+    return answers
+
+def check_split_answers(delay: float) -> Dict:
+    """Answers of every command with the answers sent at once, then split by the server"""
+    results = {"split_delay": delay, "commands": len(SPLIT_ANSWER_CALLS)}
+    for name, run in (("sync", sync_answers), ("async", lambda server: asyncio.run(async_answers(server)))):
+        answers = []
+        for split_delay in (None, delay):
+            server = MockNiryoServer(port=0, time_scale=0., split_delay=split_delay).start_in_thread()
+            try:
+                answers.append(run(server))
+            finally:
+                server.stop_thread()
+        mismatches = [(expected, received) for expected, received in zip(*answers) if expected != received]
+        for expected, received in mismatches:
+            print("[!] Split answer ({}) : expected {} received {}".format(name, expected, received))
+        results[name + "_mismatches"] = len(mismatches)
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--clients", type=int, default=4, help="clients connected at the same time")
+    parser.add_argument("--commands", type=int, default=100, help="command mixes sent by every client")
+    parser.add_argument("--cycles", type=int, default=5, help="number of pick cycles")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="factor applied by the server to the motion durations")
+    parser.add_argument("--split-delay", type=float, default=0.2, help="delay between the two segments of the split answers (s)")
+    parser.add_argument("--output", help="where to save the results, defaults to benchmarks/results/niryo-<commit>.json")
+    parser.add_argument("--baseline", help="results file of a previous run to compare with")
+    args = parser.parse_args()
+
+    server = MockNiryoServer(port=0, time_scale=args.time_scale).start_in_thread()
+    try:
+        results = {"single_client": bench_commands(server, 1, args.commands)}
+        if args.clients > 1:
+            results["multi_client"] = bench_commands(server, args.clients, args.commands)
+        results["pick_cycle"] = bench_pick_cycle(server, args.cycles)
+    finally:
+        server.stop_thread()
+    results["split_answers"] = check_split_answers(args.split_delay)
+    results["parameters"] = {"clients": args.clients, "commands": args.commands, "cycles": args.cycles,
+        "time_scale": args.time_scale, "split_delay": args.split_delay}
+
+    for name in ("single_client", "multi_client"):
+        if name in results:
+            print("\n[BENCH] {} clients : {} commands/s, {} answers drained".format(results[name]["clients"],
+                results[name]["commands_per_s"], results[name]["drained_answers"]))
+            for command, stats in results[name]["latency"].items():
+                print("{:<22} p50 {:>9.3f}ms p90 {:>9.3f}ms p99 {:>9.3f}ms".format(command, stats["p50_ms"], stats["p90_ms"], stats["p99_ms"]))
+    cycle = results["pick_cycle"]
+    print("\n[BENCH] Pick cycle : {} commands, {}s wall time, {}s of robot motion".format(
+        cycle["commands_per_cycle"], cycle["cycle_s"], cycle["motion_s"]))
+    split = results["split_answers"]
+    print("[BENCH] Split answers : {} commands, {} mismatches (sync), {} mismatches (async)".format(
+        split["commands"], split["sync_mismatches"], split["async_mismatches"]))
+    save_results("niryo", results, args.output)
+    if args.baseline:
+        compare(results, args.baseline)
+    if split["sync_mismatches"] or split["async_mismatches"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
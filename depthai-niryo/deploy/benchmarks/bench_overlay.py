@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Microbenchmark of the overlay of the detections
+
+Measures the time to annotate one rgb frame with :obj:`src.runtime.overlay.OverlayRenderer`
+at every detail level, compared with the previous ``ObjectDetection.draw`` (six ``putText``
+and a print to stdout per detection).
+
+Examples:
+    From *depthai-niryo/deploy*:
+
+        $ python3 -m benchmarks.bench_overlay --detections 1 5 20 50
+        $ python3 -m benchmarks.bench_overlay --budget 0.5
+"""
+
+import argparse, contextlib, os, timeit
+from typing import Dict, List
+from .common import save_results, compare
+
+import cv2
+import numpy as np
+from src.runtime.detections import to_array
+from src.runtime.overlay import OverlayRenderer, DETAILS
+from .bench_detections import make_detections, LABELS, WIDTH, HEIGHT
+
+""" previous implementation of ObjectDetection.draw """
+def legacy(exec_time, rgb_frame, detections, labels, fps=0, color=(255, 255, 255)):
+    height = rgb_frame.shape[0]
+    width  = rgb_frame.shape[1]
+    print("[*] {} detections".format(len(detections)))
+    for detection in detections:
+        x1 = int(detection.xmin * width)
+        x2 = int(detection.xmax * width)
+        y1 = int(detection.ymin * height)
+        y2 = int(detection.ymax * height)
+        try:
+            label = labels[detection.label]
+        except:
+            label = detection.label
+        cv2.putText(rgb_frame, str(label), (x1 + 10, y1 + 20), cv2.FONT_HERSHEY_TRIPLEX, 0.5, 255)
+        cv2.putText(rgb_frame, "{:.2f}".format(detection.confidence*100), (x1 + 10, y1 + 35), cv2.FONT_HERSHEY_TRIPLEX, 0.5, 255)
+        cv2.putText(rgb_frame, "X: {} mm".format(int(detection.spatialCoordinates.x)), (x1 + 10, y1 + 50), cv2.FONT_HERSHEY_TRIPLEX, 0.5, 255)
+        cv2.putText(rgb_frame, "Y: {} mm".format(int(detection.spatialCoordinates.y)), (x1 + 10, y1 + 65), cv2.FONT_HERSHEY_TRIPLEX, 0.5, 255)
+        cv2.putText(rgb_frame, "Z: {} mm".format(int(detection.spatialCoordinates.z)), (x1 + 10, y1 + 80), cv2.FONT_HERSHEY_TRIPLEX, 0.5, 255)
+        print("[*] Exec Time {}ms\nObject Position ( x {}mm ; y {}mm ; z {}mm )\nclass {}\n".format(exec_time, detection.spatialCoordinates.x, detection.spatialCoordinates.y, detection.spatialCoordinates.z, detection.label))
+        cv2.rectangle(rgb_frame, (x1, y1), (x2, y2), color, cv2.FONT_HERSHEY_SIMPLEX)
+    cv2.putText(rgb_frame, "NN fps: {:.2f}".format(fps), (2, rgb_frame.shape[0] - 4), cv2.FONT_HERSHEY_TRIPLEX, 0.4, color)
+
+def bench(sizes: List[int], number: int, repeat: int, budget_ms: float) -> Dict:
+    image = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    results = {}
+    for n in sizes:
+        detections = make_detections(n)
+        records = to_array(detections, WIDTH, HEIGHT)
+        steps = {}
+        # the previous draw printed every detection, measured with the output discarded
+        with open(os.devnull, "w") as devnull:
+            def step():
+                with contextlib.redirect_stdout(devnull):
+                    legacy(10, image, detections, LABELS, 30.)
+            steps["legacy"] = step
+            renderers = {}
+            for name in DETAILS:
+                renderer = renderers[name] = OverlayRenderer(LABELS, detail=name, budget_ms=budget_ms)
+                steps[name] = lambda renderer=renderer: renderer.draw(image, records, 30.)
+            result = {}
+            for name, step in steps.items():
+                seconds = min(timeit.repeat(step, number=number, repeat=repeat)) / number
+                result[name] = {"us": round(seconds * 1e6, 3), "us_per_detection": round(seconds * 1e6 / max(n, 1), 3)}
+                if name in renderers:
+                    report = renderers[name].report()
+                    result[name]["max_us"] = round(report["max_ms"] * 1e3, 3)
+                    result[name]["degraded_ratio"] = round(report["degraded"] / max(report["frames"], 1), 4)
+        results["{}_detections".format(n)] = result
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--detections", type=int, nargs="+", default=[1, 5, 20, 50], help="detections per frame")
+    parser.add_argument("--budget", type=float, default=0., help="overlay budget of a frame (ms), 0 for no limit")
+    parser.add_argument("--number", type=int, default=500, help="frames per measure")
+    parser.add_argument("--repeat", type=int, default=5, help="measures, the fastest is kept")
+    parser.add_argument("--output", help="where to save the results, defaults to benchmarks/results/overlay-<commit>.json")
+    parser.add_argument("--baseline", help="results file of a previous run to compare with")
+    args = parser.parse_args()
+
+    results = bench(args.detections, args.number, args.repeat, args.budget)
+    print("\n{:<16} {:<8} {:>10} {:>14} {:>10}".format("frame", "draw", "us", "us/detection", "degraded"))
+    for frame, result in results.items():
+        for name, metrics in result.items():
+            print("{:<16} {:<8} {:>10.3f} {:>14.3f} {:>10}".format(frame, name, metrics["us"], metrics["us_per_detection"],
+                metrics.get("degraded_ratio", "")))
+    results["parameters"] = {"detections": args.detections, "budget_ms": args.budget, "number": args.number, "repeat": args.repeat}
+    save_results("overlay", results, args.output)
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
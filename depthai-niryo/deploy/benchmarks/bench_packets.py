@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Microbenchmark of the packets sent to the robot
+
+Compares ``PacketBuilder.build_command_packet`` (command table built once per process, bytes
+ready for ``socket.send``) with the previous implementation, which looked the command up in a
+table built per instance, validated it in a per-command method, concatenated the packet with
+``+=`` and encoded it before sending.
+
+Examples:
+    From *depthai-niryo/deploy*:
+
+        $ python3 -m benchmarks.bench_packets --number 100000
+"""
+
+import argparse, timeit
+from enum import Enum
+from typing import Dict
+from .common import save_results, compare
+
+from niryo_one_tcp_client.packet_builder import PacketBuilder
+from niryo_one_tcp_client.enums import Command, RobotAxis
+
+""" previous implementation of PacketBuilder, for the benchmarked commands """
+class LegacyPacketBuilder:
+    def __init__(self):
+        self.__commands = {Command.MOVE_POSE: ("MOVE_POSE", self.__move_pose),
+            Command.SHIFT_POSE: ("SHIFT_POSE", self.__shift_pose),
+            Command.GET_POSE: ("GET_POSE", self.__get_pose)}
+
+    def __build_packet_with_parameter(self, command_type, parameter_list):
+        packet = self.__commands[command_type][0] + ":"
+        counter_param = 0
+        for parameter in parameter_list:
+            if isinstance(parameter, Enum):
+                packet += parameter.name
+            elif isinstance(parameter, bool):
+                packet += str(parameter).upper()
+            else:
+                packet += str(parameter)
+            counter_param += 1
+            if counter_param < len(parameter_list):
+                packet += ","
+        return packet
+
+    def __move_pose(self, parameter_list):
+        if len(parameter_list) != 6:
+            raise PacketBuilder.NotEnoughParameterException()
+        for parameter in parameter_list:
+            if not isinstance(parameter, float):
+                raise PacketBuilder.InvalidValueException()
+        return self.__build_packet_with_parameter(Command.MOVE_POSE, parameter_list)
+
+    def __shift_pose(self, parameter_list):
+        if len(parameter_list) != 2:
+            raise PacketBuilder.NotEnoughParameterException()
+        if not isinstance(parameter_list[0], RobotAxis) or not isinstance(parameter_list[1], float):
+            raise PacketBuilder.InvalidValueException()
+        return self.__build_packet_with_parameter(Command.SHIFT_POSE, parameter_list)
+
+    def __get_pose(self):
+        return self.__commands[Command.GET_POSE][0]
+
+    def build_command_packet(self, command_type, parameters):
+        if parameters is None:
+            parameters = []
+        if not parameters:
+            packet = self.__commands[command_type][1]()
+        else:
+            packet = self.__commands[command_type][1](parameters)
+        return packet.encode()
+
+CASES = {
+    "move_pose": (Command.MOVE_POSE, [0.2, -0.05, 0.3, 0.0, 1.5, 0.0]),
+    "shift_pose": (Command.SHIFT_POSE, [RobotAxis.X, 0.05]),
+    "get_pose": (Command.GET_POSE, None),
+}
+
+def bench(number: int, repeat: int) -> Dict:
+    legacy, builder = LegacyPacketBuilder(), PacketBuilder()
+    results = {}
+    for name, (command, parameters) in CASES.items():
+        assert legacy.build_command_packet(command, parameters) == builder.build_command_packet(command, parameters)
+        legacy_s = min(timeit.repeat(lambda: legacy.build_command_packet(command, parameters), number=number, repeat=repeat))
+        builder_s = min(timeit.repeat(lambda: builder.build_command_packet(command, parameters), number=number, repeat=repeat))
+        results[name] = {"legacy_packets_s": round(number / legacy_s), "builder_packets_s": round(number / builder_s),
+            "speedup": round(legacy_s / builder_s, 2)}
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--number", type=int, default=50000, help="packets per measure")
+    parser.add_argument("--repeat", type=int, default=5, help="measures, the fastest is kept")
+    parser.add_argument("--output", help="where to save the results, defaults to benchmarks/results/packets-<commit>.json")
+    parser.add_argument("--baseline", help="results file of a previous run to compare with")
+    args = parser.parse_args()
+
+    results = bench(args.number, args.repeat)
+    print("\n{:<12} {:>16} {:>16} {:>9}".format("command", "legacy pkt/s", "builder pkt/s", "speedup"))
+    for name, result in results.items():
+        print("{:<12} {:>16,} {:>16,} {:>8.1f}x".format(name, result["legacy_packets_s"], result["builder_packets_s"],
+            result["speedup"]))
+    results["parameters"] = {"number": args.number, "repeat": args.repeat}
+    save_results("packets", results, args.output)
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
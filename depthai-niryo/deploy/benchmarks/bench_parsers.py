@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Microbenchmark of the parsers of the structured robot answers
+
+Compares the parsers of the niryo tcp client (single compiled regular expression, NumPy
+arrays) with the previous implementation based on ``str.index`` slicing, regex + split and
+``ast.literal_eval``, on the answers sent by the mock Niryo server.
+
+Examples:
+    From *depthai-niryo/deploy*:
+
+        $ python3 -m benchmarks.bench_parsers --number 20000
+"""
+
+import argparse, ast, re, timeit
+import numpy as np
+from typing import Dict
+from .common import save_results, compare
+
+from niryo_one_tcp_client import HardwareStatusObject, DigitalPinObject
+from niryo_one_tcp_client import answer_parsers
+
+HARDWARE_STATUS = "34,1,True,'',1,False,['Stepper Axis 1', 'Stepper Axis 2', 'Stepper Axis 3', 'Servo Axis 4', " \
+    "'Servo Axis 5', 'Servo Axis 6'],['Niryo Stepper', 'Niryo Stepper', 'Niryo Stepper', 'DXL XL-430', 'DXL XL-430', " \
+    "'DXL XL-320'],(34, 34, 34, 36, 37, 35),(0.0, 0.0, 0.0, 11.3, 11.2, 7.4),(0, 0, 0, 0, 0, 0)"
+DIGITAL_IO_STATE = "[2, '1A', 1, 0],[3, '1B', 1, 0],[16, '1C', 1, 0],[26, '2A', 1, 0],[19, '2B', 1, 0],[6, '2C', 1, 0]," \
+    "[100, 'SW1', 0, 0],[101, 'SW2', 0, 0]"
+CALIBRATION_OBJECT = "True,[[520.0, 0.0, 320.0], [0.0, 520.0, 240.0], [0.0, 0.0, 1.0]],[0.12, -0.25, 0.0, 0.0, 0.1]"
+
+""" previous implementation of NiryoOneClient """
+def legacy_hardware_status(data):
+    first_infos = data[0:data.index(",[")].split(",")
+    rpi_temperature = int(first_infos[0])
+    hardware_version = int(first_infos[1])
+    connection_up = bool(first_infos[2])
+    error_message = first_infos[3].strip('\'')
+    calibration_needed = int(first_infos[4])
+    calibration_in_progress = bool(first_infos[5])
+    motor_names = ast.literal_eval(data[data.index("["):data.index("]") + 1])
+    motor_types = ast.literal_eval(data[data.index("],[") + 2:data.index("],(") + 1])
+
+    last_infos = data[data.index("],(") + 2:].split("),(")
+    temperatures = ast.literal_eval(last_infos[0] + ")")
+    voltages = ast.literal_eval("(" + last_infos[1] + ")")
+    hardware_errors = ast.literal_eval("(" + last_infos[2])
+    return HardwareStatusObject(rpi_temperature, hardware_version, connection_up, error_message,
+        calibration_needed, calibration_in_progress, motor_names, motor_types, temperatures, voltages, hardware_errors)
+
+def legacy_digital_io_state(data):
+    matches = re.findall('(\[\d+, ?\'\w+\', ?[0-1], \d+\])+', data)
+    digital_pin_array = []
+    for match in matches:
+        elements = match.split(', ')
+        pin_id = elements[0].lstrip('[')
+        name = elements[1]
+        mode = int(elements[2])
+        state = int(elements[3].rstrip(']'))
+        digital_pin_array.append(DigitalPinObject(pin_id, name, mode, state))
+    return digital_pin_array
+
+def legacy_calibration_object(data_raw):
+    status, data = data_raw.split(",", 1)
+    list_data = ast.literal_eval(data)
+    mtx = np.reshape(list_data[0], (3, 3))
+    dist = np.expand_dims(list_data[1], axis=0)
+    return status, mtx, dist
+
+CASES = {
+    "hardware_status": (HARDWARE_STATUS, legacy_hardware_status, answer_parsers.parse_hardware_status),
+    "digital_io_state": (DIGITAL_IO_STATE, legacy_digital_io_state, answer_parsers.parse_digital_io_state),
+    "calibration_object": (CALIBRATION_OBJECT, legacy_calibration_object, answer_parsers.parse_calibration_object),
+}
+
+def check(name: str) -> None:
+    """Both implementations must read the same values"""
+    data, legacy, parser = CASES[name]
+    if name == "hardware_status":
+        old, new = legacy(data), parser(data)
+        assert (old.motor_names, old.temperatures, old.voltages) == (new.motor_names, new.temperatures, new.voltages)
+    elif name == "digital_io_state":
+        assert [(int(p.pin_id), p.state) for p in legacy(data)] == [(p.pin_id, p.state) for p in parser(data)]
+    else:
+        _, old_mtx, old_dist = legacy(data)
+        _, mtx, dist = parser(data)
+        assert np.allclose(old_mtx, mtx) and np.allclose(old_dist, dist)
+
+def bench(number: int, repeat: int) -> Dict:
+    results = {}
+    for name, (data, legacy, parser) in CASES.items():
+        check(name)
+        legacy_us = min(timeit.repeat(lambda: legacy(data), number=number, repeat=repeat)) / number * 1e6
+        parser_us = min(timeit.repeat(lambda: parser(data), number=number, repeat=repeat)) / number * 1e6
+        results[name] = {"legacy_us": round(legacy_us, 3), "parser_us": round(parser_us, 3),
+            "speedup": round(legacy_us / parser_us, 2)}
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--number", type=int, default=5000, help="calls per measure")
+    parser.add_argument("--repeat", type=int, default=5, help="measures, the fastest is kept")
+    parser.add_argument("--output", help="where to save the results, defaults to benchmarks/results/parsers-<commit>.json")
+    parser.add_argument("--baseline", help="results file of a previous run to compare with")
+    args = parser.parse_args()
+
+    results = bench(args.number, args.repeat)
+    print("\n{:<20} {:>12} {:>12} {:>9}".format("answer", "legacy us", "parser us", "speedup"))
+    for name, result in results.items():
+        print("{:<20} {:>12.3f} {:>12.3f} {:>8.1f}x".format(name, result["legacy_us"], result["parser_us"], result["speedup"]))
+    results["parameters"] = {"number": args.number, "repeat": args.repeat}
+    save_results("parsers", results, args.output)
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
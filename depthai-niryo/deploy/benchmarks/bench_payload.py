@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Microbenchmark of the mqtt payloads
+
+Measures the cost of encoding the detections of one frame with the binary and JSON formats
+of :mod:`src.mqtt.payload`, compared with the previous string formatting which produced two
+messages per detection (``label:x:y:z`` and ``label:x1:x2:y1:y2``).
+
+Examples:
+    From *depthai-niryo/deploy*:
+
+        $ python3 -m benchmarks.bench_payload --detections 1 5 20
+"""
+
+import argparse, random, timeit
+from typing import Dict, List
+from .common import save_results, compare
+
+from src.mqtt import payload
+from src.mqtt.payload import DetectionRecord
+
+LABELS = ["good", "not_good"]
+
+def make_records(n: int, seed: int=0) -> List[DetectionRecord]:
+    rng = random.Random(seed)
+    return [DetectionRecord(rng.randrange(len(LABELS)), rng.random(), rng.randrange(416), rng.randrange(416),
+        rng.randrange(416), rng.randrange(416), round(rng.uniform(-200, 200), 3), round(rng.uniform(-200, 200), 3),
+        round(rng.uniform(100, 500), 3)) for _ in range(n)]
+
+""" previous implementation of ObjectDetection.__publish_results """
+def legacy_strings(records: List[DetectionRecord]) -> List[str]:
+    messages = []
+    for r in records:
+        label = LABELS[r.label]
+        messages.append("{}:{}:{}:{}".format(label, r.x, r.y, r.z))
+        messages.append("{}:{}:{}:{}:{}".format(label, r.x1, r.x2, r.y1, r.y2))
+    return messages
+
+def bench(sizes: List[int], number: int, repeat: int) -> Dict:
+    results = {}
+    for n in sizes:
+        records = make_records(n)
+        assert payload.decode(payload.encode_binary(7, 1.5, records))["seq"] == 7
+        encoders = {
+            "legacy": lambda: legacy_strings(records),
+            "binary": lambda: payload.encode_binary(7, 1.5, records),
+            "json": lambda: payload.encode_json(7, 1.5, records, LABELS),
+        }
+        sizes_bytes = {"legacy": sum(len(m) for m in legacy_strings(records)),
+            "binary": len(payload.encode_binary(7, 1.5, records)),
+            "json": len(payload.encode_json(7, 1.5, records, LABELS))}
+        result = {}
+        for name, encoder in encoders.items():
+            seconds = min(timeit.repeat(encoder, number=number, repeat=repeat)) / number
+            result[name] = {"us": round(seconds * 1e6, 3), "bytes": sizes_bytes[name],
+                "messages": 2 * n if name == "legacy" else 1}
+        results["{}_detections".format(n)] = result
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--detections", type=int, nargs="+", default=[1, 5, 20], help="detections per frame")
+    parser.add_argument("--number", type=int, default=20000, help="frames per measure")
+    parser.add_argument("--repeat", type=int, default=5, help="measures, the fastest is kept")
+    parser.add_argument("--output", help="where to save the results, defaults to benchmarks/results/payload-<commit>.json")
+    parser.add_argument("--baseline", help="results file of a previous run to compare with")
+    args = parser.parse_args()
+
+    results = bench(args.detections, args.number, args.repeat)
+    print("\n{:<16} {:<8} {:>10} {:>8} {:>9}".format("frame", "format", "us", "bytes", "messages"))
+    for frame, result in results.items():
+        for name, metrics in result.items():
+            print("{:<16} {:<8} {:>10.3f} {:>8} {:>9}".format(frame, name, metrics["us"], metrics["bytes"], metrics["messages"]))
+    results["parameters"] = {"detections": args.detections, "number": args.number, "repeat": args.repeat}
+    save_results("payload", results, args.output)
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Benchmark helpers
+
+This module gathers what every benchmark needs : importing the source code and the niryo
+tcp client from a plain checkout, saving results as JSON and comparing them to a baseline
+recorded on another commit.
+"""
+
+import json, platform, subprocess, sys, time
+from pathlib import Path
+from typing import Dict
+
+DEPLOY_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = DEPLOY_DIR / "benchmarks" / "results"
+
+"""Append source code to access it, like main.py does in the docker image"""
+for _path in (DEPLOY_DIR, DEPLOY_DIR / "build" / "python_tcp_client"):
+    if str(_path) not in sys.path:
+        sys.path.append(str(_path))
+
+def git_commit() -> str:
+    """Short hash of the checked out commit, "unknown" outside a git repository"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=DEPLOY_DIR,
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def save_results(name: str, results: Dict, path: str=None) -> Path:
+    """Save results with the environment they were measured in
+
+    Arguments:
+        name                 (str): Name of the benchmark
+        results             (dict): Metrics of the run
+        path (:obj:`str`, optional): Output file, defaults to results/<name>-<commit>.json
+    """
+    commit = git_commit()
+    document = {
+        "benchmark": name,
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results
+    }
+    path = Path(path) if path else RESULTS_DIR / "{}-{}.json".format(name, commit)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as f:
+        json.dump(document, f, indent=2)
+    print("[BENCH] Results saved to {}".format(path))
+    return path
+
+def flatten(metrics: Dict, prefix: str="") -> Dict[str, float]:
+    """Flatten nested metrics to ``a.b.c`` keys, keeping only numbers"""
+    flat = {}
+    for key, value in metrics.items():
+        name = prefix + str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(results: Dict, baseline_path: str) -> Dict[str, float]:
+    """Print the relative change of every metric against a baseline file
+
+    Returns:
+        dict: Relative change per metric (0.1 means +10%)
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old, new = flatten(baseline["results"]), flatten(results)
+    print("\n[BENCH] Comparison with {} (commit {})".format(baseline_path, baseline.get("commit")))
+    print("{:<48} {:>14} {:>14} {:>9}".format("metric", "baseline", "current", "change"))
+    changes = {}
+    for name in sorted(set(old) & set(new)):
+        change = (new[name] - old[name]) / old[name] if old[name] else 0.
+        changes[name] = change
+        print("{:<48} {:>14.4f} {:>14.4f} {:>+8.1f}%".format(name, old[name], new[name], change * 100))
+    return changes
@@ -1,6 +1,7 @@
 # __init__.py
 
 from .tcp_client import NiryoOneClient
+from .async_tcp_client import AsyncNiryoOneClient
 from .enums import *
 from .digital_pin_object import DigitalPinObject
 from .hardware_status_object import HardwareStatusObject
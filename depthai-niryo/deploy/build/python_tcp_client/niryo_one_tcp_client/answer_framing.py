@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+# answer_framing.py
+# Copyright (C) 2019 Niryo
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Framing of the short answers, shared by NiryoOneClient and AsyncNiryoOneClient.
+#
+# A short answer (COMMAND:OK[,data] / COMMAND:KO,reason) has no size and no terminator, it can
+# arrive in several TCP segments. The bytes after "COMMAND:" are fed to a ShortAnswerFrame until
+# it is complete : the bytes known to be missing are waited for (status, separators of the
+# fields the command answers, closing brackets), then, unless the last field is a closed
+# list or tuple, a float with its decimals or a boolean, the answer is drained until the
+# socket stays idle for a short time since its last field could still continue (an integer,
+# a name, the reason of a KO).
+
+import re
+from .enums import Command
+
+MISSING, OPEN, CLOSED = 0, 1, 2
+
+# fields of the data of the OK answers, the commands not listed answer a bare OK
+SHORT_ANSWER_FIELDS = {
+    Command.GET_JOINTS: 6,
+    Command.GET_POSE: 6,
+    Command.GET_TARGET_POSE_FROM_REL: 6,
+    Command.DIGITAL_READ: 1,
+    Command.GET_LEARNING_MODE: 1,
+    Command.GET_CURRENT_TOOL_ID: 1,
+    Command.GET_WORKSPACE_RATIO: 1,
+    # found flag, followed by the pose and / or the object when found
+    Command.GET_TARGET_POSE_FROM_CAM: {b"True": 9, b"False": 1},
+    Command.DETECT_OBJECT: {b"True": 6, b"False": 1},
+    Command.VISION_PICK: {b"True": 3, b"False": 1},
+    Command.MOVE_TO_OBJECT: {b"True": 3, b"False": 1},
+    # fields with separators of their own, only the separators outside of brackets and quotes count
+    Command.GET_HARDWARE_STATUS: 11,
+    Command.GET_DIGITAL_IO_STATE: 6,
+}
+OPENING, CLOSING, QUOTE = b"[(", b")]", ord("'")
+# last fields that end the answer : floats as written by python (decimals, 2 digits exponent), booleans
+COMPLETE_FIELD = re.compile(rb"(-?\d+\.\d+|-?\d+(\.\d+)?e[+-]\d{2,}|True|False)")
+
+
+def split_fields(data):
+    """Separators of the top level fields and True if the last field is a closed list or tuple
+
+    Returns None while a bracket or a quote is still open.
+    """
+    if not any(c in data for c in b"[('"):
+        return data.count(b","), False
+    separators, depth, quoted = 0, 0, False
+    for c in data:
+        if c == QUOTE:
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif c in OPENING:
+            depth += 1
+        elif c in CLOSING:
+            depth -= 1
+        elif c == 44 and depth == 0:
+            separators += 1
+    if depth or quoted:
+        return None
+    return separators, data[-1] in CLOSING
+
+
+def expected_fields(command_type, data):
+    """Fields of the data of an OK answer, None for a free length"""
+    fields = SHORT_ANSWER_FIELDS.get(command_type, 0)
+    if not isinstance(fields, dict):
+        return fields
+    flag = data.partition(b",")[0]
+    if flag in fields:
+        return fields[flag]
+    if b"," not in data and any(key.startswith(flag) for key in fields):
+        # the flag itself is not complete
+        return len(data) + 1
+    # unknown flag, left to the parser of the answer
+    return None
+
+
+def short_answer_state(command_type, answer):
+    """MISSING while bytes are known to be missing, OPEN when the answer is complete but its last
+    field could still continue, CLOSED when nothing more can follow
+
+    Args:
+        command_type: Command of the answer, None if unknown (free length)
+        answer: bytes received after "COMMAND:"
+    """
+    status = answer[:2]
+    if len(status) < 2 or (status == b"KO" and len(answer) < 4):
+        return MISSING
+    if status != b"OK" or command_type is None:
+        return OPEN
+    if len(answer) == 2:
+        return CLOSED if SHORT_ANSWER_FIELDS.get(command_type, 0) == 0 else MISSING
+    data = answer[3:]
+    fields = expected_fields(command_type, data)
+    if fields is None:
+        return OPEN if data else MISSING
+    if not fields:
+        return OPEN
+    split = split_fields(data) if data and not data.endswith(b",") else None
+    if split is None or split[0] < fields - 1:
+        return MISSING
+    if split[0] != fields - 1:
+        # more separators than expected : unknown answer, drained
+        return OPEN
+    if split[1] or COMPLETE_FIELD.fullmatch(data.rpartition(b",")[2]):
+        return CLOSED
+    return OPEN
+
+
+def parse_short_answer(answer):
+    """'OK,data' -> (True, 'data'), 'KO,reason' -> (False, 'reason'), 'OK' -> (True, None)"""
+    answer = answer.decode()
+    if ',' in answer:
+        answer_status, answer_data = answer.split(',', 1)
+        return answer_status == "OK", answer_data
+    return answer == "OK", None
+
+
+class ShortAnswerFrame:
+    """Bytes of a short answer received so far
+
+    Attributes:
+        command_type : Command of the answer, None if unknown
+        answer       : bytes received after "COMMAND:"
+        state        : MISSING, OPEN or CLOSED
+    """
+    __slots__ = ("command_type", "answer", "state")
+
+    def __init__(self, command_type=None):
+        self.command_type = command_type
+        self.answer = b""
+        self.state = MISSING
+
+    def feed(self, data):
+        self.answer += data
+        self.state = short_answer_state(self.command_type, self.answer)
+
+    def result(self):
+        return parse_short_answer(self.answer)
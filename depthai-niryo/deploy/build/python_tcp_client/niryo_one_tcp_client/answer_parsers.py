@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+# answer_parsers.py
+# Copyright (C) 2019 Niryo
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Parsers of the structured answers of the robot. Each answer is matched once by a compiled
+# regular expression, the fields are converted without ast.literal_eval.
+#
+# Types of the fields, changed from the former parsers of NiryoOneClient :
+#   - DigitalPinObject.pin_id is an int (was the str of the number), its name has no quotes
+#   - HardwareStatusObject.connection_up and calibration_in_progress are read from the text
+#     ("True" / "False"), bool() of the text was always True
+#   - the status of get_calibration_object is a bool (was the str "True" or "False")
+
+import re
+import numpy as np
+from .hardware_status_object import HardwareStatusObject
+from .digital_pin_object import DigitalPinObject
+
+# rpi_temperature,hardware_version,connection_up,'error_message',calibration_needed,calibration_in_progress,
+# [motor_names],[motor_types],(temperatures),(voltages),(hardware_errors)
+HARDWARE_STATUS_PATTERN = re.compile(
+    r"(-?\d+),(-?\d+),(\w+),'([^']*)',(\d+),(\w+),\[([^\]]*)\],\[([^\]]*)\],\(([^)]*)\),\(([^)]*)\),\(([^)]*)\)", re.S)
+QUOTED_PATTERN = re.compile(r"'([^']*)'")
+# [pin_id, 'name', mode, state]
+DIGITAL_PIN_PATTERN = re.compile(r"\[(\d+), ?'(\w+)', ?([0-1]), (\d+)\]")
+# brackets of the calibration matrices, replaced by spaces before reading the numbers
+MATRIX_CHARACTERS = str.maketrans("[]", "  ")
+
+
+def split_numbers(text, cast):
+    """'1, 2, 3' -> (1, 2, 3)"""
+    if not text.strip():
+        return ()
+    return tuple(map(cast, text.split(',')))
+
+
+def parse_hardware_status(data):
+    match = HARDWARE_STATUS_PATTERN.match(data)
+    if match is None:
+        raise ValueError("Invalid hardware status: {}".format(data))
+    (rpi_temperature, hardware_version, connection_up, error_message, calibration_needed,
+     calibration_in_progress, motor_names, motor_types, temperatures, voltages, hardware_errors) = match.groups()
+    return HardwareStatusObject(int(rpi_temperature), int(hardware_version), connection_up == "True", error_message,
+                                int(calibration_needed), calibration_in_progress == "True",
+                                QUOTED_PATTERN.findall(motor_names), QUOTED_PATTERN.findall(motor_types),
+                                split_numbers(temperatures, int), split_numbers(voltages, float),
+                                split_numbers(hardware_errors, int))
+
+
+def parse_digital_io_state(data):
+    return [DigitalPinObject(int(pin_id), name, int(mode), int(state))
+            for pin_id, name, mode, state in DIGITAL_PIN_PATTERN.findall(data)]
+
+
+def parse_calibration_object(data):
+    """'True,[[3x3 matrix]],[distortion coefficients]' -> (status, mtx (3, 3), dist (1, n))"""
+    status, _, matrices = data.partition(',')
+    if status != "True":
+        return False, None, None
+    values = np.array(matrices.translate(MATRIX_CHARACTERS).split(','), dtype=np.float64)
+    mtx = values[:9].reshape(3, 3)
+    dist = values[9:].reshape(1, -1)
+    return True, mtx, dist
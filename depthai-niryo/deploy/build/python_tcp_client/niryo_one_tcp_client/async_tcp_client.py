@@ -0,0 +1,427 @@
+#!/usr/bin/env python
+
+# async_tcp_client.py
+# Copyright (C) 2019 Niryo
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+from collections import deque
+from .pose_object import PoseObject
+from .packet_builder import PacketBuilder
+from .enums import Command, RobotTool, Shape, Color, ConveyorDirection
+from .tcp_client import NiryoOneClient
+from .answer_framing import ShortAnswerFrame, OPEN, CLOSED
+
+
+class AsyncNiryoOneClient:
+    """Asyncio version of NiryoOneClient
+
+    Every method of NiryoOneClient is a coroutine here, with the same arguments and the same answers.
+    A single reader task reads the answers of the robot and resolves the pending commands in order.
+    The server handles one command at a time : a command is sent once the answer of the previous one
+    arrived, even if the caller of the previous one stopped waiting.
+
+    Each command waits at most ``command_timeout`` seconds (None waits forever), this deadline can
+    be changed per call with ``timeout``. On timeout CommandTimeoutException is raised, the robot
+    still finishes the command. Cancelling the task awaiting a command has the same effect.
+    """
+    HostNotReachableException = NiryoOneClient.HostNotReachableException
+    ClientNotConnectedException = NiryoOneClient.ClientNotConnectedException
+    InvalidAnswerException = NiryoOneClient.InvalidAnswerException
+
+    class CommandTimeoutException(Exception):
+        def __init__(self, command, timeout):
+            super(Exception, self).__init__("No answer to {} after {}s.".format(command, timeout))
+
+    LONG_ANSWER_COMMANDS = (Command.GET_IMAGE_COMPRESSED, Command.GET_WORKSPACE_LIST, Command.GET_CALIBRATION_OBJECT)
+    READ_SIZE = 4096
+    ANSWER_IDLE_TIMEOUT = NiryoOneClient.ANSWER_IDLE_TIMEOUT
+
+    def __init__(self, timeout=5, port=40001, command_timeout=None, answer_idle_timeout=ANSWER_IDLE_TIMEOUT):
+        self.__port = port
+        self.answer_idle_timeout = answer_idle_timeout
+        # short answers ended by the idle timeout rather than by their fields
+        self.drained_answers = 0
+        self.__timeout = timeout
+        self.command_timeout = command_timeout
+        self.__is_connected = False
+        self.__reader = None
+        self.__writer = None
+        self.__reader_task = None
+        self.__pending = deque()
+        self.__lock = None
+        self.__packet_builder = PacketBuilder()
+
+    @property
+    def is_connected(self):
+        return self.__is_connected
+
+    async def connect(self, ip_address):
+        try:
+            self.__reader, self.__writer = await asyncio.wait_for(
+                asyncio.open_connection(ip_address, self.__port), self.__timeout)
+        except asyncio.TimeoutError:
+            print("Unable to connect to the robot.")
+        except OSError as e:
+            print("An error occurred while attempting to connect: {}".format(e))
+        else:
+            print("Connected to server ({}) on port: {}".format(ip_address, self.__port))
+            self.__is_connected = True
+            self.__lock = asyncio.Lock()
+            self.__reader_task = asyncio.ensure_future(self.__read_answers())
+        return self.__is_connected
+
+    async def quit(self):
+        if self.__writer is not None:
+            self.__writer.close()
+            try:
+                await self.__writer.wait_closed()
+            except OSError:
+                pass
+            self.__writer = None
+        if self.__reader_task is not None:
+            self.__reader_task.cancel()
+            try:
+                await self.__reader_task
+            except asyncio.CancelledError:
+                pass
+            self.__reader_task = None
+        self.__fail_pending(self.HostNotReachableException())
+        self.__is_connected = False
+
+    async def send_command(self, command_type, parameter_list=None, timeout=None):
+        """Send a command and wait for its answer
+
+        Returns:
+            (status, data) for short answers, (status, payload) for long answers
+        """
+        if self.__is_connected is False:
+            raise self.ClientNotConnectedException()
+        timeout = self.command_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self.__request(command_type, parameter_list), timeout)
+        except asyncio.TimeoutError:
+            raise self.CommandTimeoutException(command_type.name, timeout)
+
+    async def __request(self, command_type, parameter_list):
+        packet = self.__packet_builder.build_command_packet(command_type, parameter_list)
+        await self.__lock.acquire()
+        # the lock is released by the reader task once the answer arrived
+        future = asyncio.get_running_loop().create_future()
+        pending = (future, command_type)
+        self.__pending.append(pending)
+        try:
+            self.__writer.write(packet)
+            await self.__writer.drain()
+        except OSError as e:
+            print(e)
+            # the exception is raised to the caller, its future is never awaited
+            self.__pending.remove(pending)
+            self.__fail_pending(self.HostNotReachableException())
+            raise self.HostNotReachableException()
+        return await future
+
+    async def __read_answers(self):
+        try:
+            while True:
+                await self.__reader.readuntil(b":")
+                future, command_type = self.__pending.popleft() if self.__pending else (None, None)
+                try:
+                    answer = await self.__read_answer(command_type)
+                except self.InvalidAnswerException as e:
+                    answer = e
+                if future is not None and not future.done():
+                    if isinstance(answer, Exception):
+                        future.set_exception(answer)
+                    else:
+                        future.set_result(answer)
+                if self.__lock.locked():
+                    self.__lock.release()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, OSError):
+            self.__is_connected = False
+            self.__fail_pending(self.HostNotReachableException())
+
+    async def __read_answer(self, command_type):
+        if command_type in self.LONG_ANSWER_COMMANDS:
+            status = (await self.__reader.readuntil(b','))[:-1].decode()
+            if status == "OK":
+                payload_size = (await self.__reader.readuntil(b','))[:-1].decode()
+                try:
+                    payload_size = int(payload_size)
+                except ValueError:
+                    raise self.InvalidAnswerException("PAYLOAD_SIZE needs to be integer. " \
+                                                      "But '{}' cannot be converted to integer".format(payload_size))
+                payload = await self.__reader.readexactly(payload_size)
+                try:
+                    payload = payload.decode()
+                except UnicodeDecodeError:
+                    pass
+                return True, payload
+            frame = ShortAnswerFrame()
+            frame.feed(status.encode() + b",")
+            return (await self.__read_short_answer(frame)).result()
+        return (await self.__read_short_answer(ShortAnswerFrame(command_type))).result()
+
+    async def __read_short_answer(self, frame):
+        # same framing as NiryoOneClient : the missing bytes are waited for, the rest until the socket stays idle
+        while frame.state != CLOSED:
+            if frame.state == OPEN:
+                try:
+                    data = await asyncio.wait_for(self.__reader.read(self.READ_SIZE), self.answer_idle_timeout)
+                except asyncio.TimeoutError:
+                    self.drained_answers += 1
+                    break
+            else:
+                data = await self.__reader.read(self.READ_SIZE)
+            if not data:
+                raise asyncio.IncompleteReadError(frame.answer, None)
+            frame.feed(data)
+        return frame
+
+    def __fail_pending(self, exception):
+        while self.__pending:
+            future, _ = self.__pending.popleft()
+            if not future.done():
+                future.set_exception(exception)
+        if self.__lock is not None and self.__lock.locked():
+            self.__lock.release()
+
+    async def calibrate(self, calibrate_mode, timeout=None):
+        return await self.send_command(Command.CALIBRATE, [calibrate_mode], timeout)
+
+    async def need_calibration(self, timeout=None):
+        res, obj_data = await self.get_hardware_status(timeout)
+        return obj_data.calibration_needed
+
+    async def set_learning_mode(self, enabled, timeout=None):
+        return await self.send_command(Command.SET_LEARNING_MODE, [enabled], timeout)
+
+    async def move_joints(self, j1, j2, j3, j4, j5, j6, timeout=None):
+        return await self.send_command(Command.MOVE_JOINTS, [j1, j2, j3, j4, j5, j6], timeout)
+
+    async def move_pose(self, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot, timeout=None):
+        return await self.send_command(Command.MOVE_POSE, [x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot], timeout)
+
+    async def shift_pose(self, axis, shift_value, timeout=None):
+        return await self.send_command(Command.SHIFT_POSE, [axis, shift_value], timeout)
+
+    async def set_arm_max_velocity(self, percentage_speed, timeout=None):
+        return await self.send_command(Command.SET_ARM_MAX_VELOCITY, [percentage_speed], timeout)
+
+    async def enable_joystick(self, enabled, timeout=None):
+        return await self.send_command(Command.ENABLE_JOYSTICK, [enabled], timeout)
+
+    async def set_pin_mode(self, pin, pin_mode, timeout=None):
+        return await self.send_command(Command.SET_PIN_MODE, [pin, pin_mode], timeout)
+
+    async def digital_write(self, pin, digital_state, timeout=None):
+        return await self.send_command(Command.DIGITAL_WRITE, [pin, digital_state], timeout)
+
+    async def digital_read(self, pin, timeout=None):
+        status, data = await self.send_command(Command.DIGITAL_READ, [pin], timeout)
+        if status is True:
+            return status, int(data)
+        return status, data
+
+    async def change_tool(self, tool, timeout=None):
+        return await self.send_command(Command.CHANGE_TOOL, [tool], timeout)
+
+    async def open_gripper(self, gripper, speed, timeout=None):
+        return await self.send_command(Command.OPEN_GRIPPER, [gripper, speed], timeout)
+
+    async def close_gripper(self, gripper, speed, timeout=None):
+        return await self.send_command(Command.CLOSE_GRIPPER, [gripper, speed], timeout)
+
+    async def pull_air_vacuum_pump(self, vacuum_pump, timeout=None):
+        return await self.send_command(Command.PULL_AIR_VACUUM_PUMP, [vacuum_pump], timeout)
+
+    async def push_air_vacuum_pump(self, vacuum_pump, timeout=None):
+        return await self.send_command(Command.PUSH_AIR_VACUUM_PUMP, [vacuum_pump], timeout)
+
+    async def setup_electromagnet(self, electromagnet, pin, timeout=None):
+        return await self.send_command(Command.SETUP_ELECTROMAGNET, [electromagnet, pin], timeout)
+
+    async def activate_electromagnet(self, electromagnet, pin, timeout=None):
+        return await self.send_command(Command.ACTIVATE_ELECTROMAGNET, [electromagnet, pin], timeout)
+
+    async def deactivate_electromagnet(self, electromagnet, pin, timeout=None):
+        return await self.send_command(Command.DEACTIVATE_ELECTROMAGNET, [electromagnet, pin], timeout)
+
+    async def get_saved_position_list(self, timeout=None):
+        return await self.send_command(Command.GET_SAVED_POSITION_LIST, None, timeout)
+
+    async def wait(self, duration):
+        await asyncio.sleep(duration)
+
+    pose_to_list = staticmethod(NiryoOneClient.pose_to_list)
+
+    async def get_joints(self, timeout=None):
+        status, data = await self.send_command(Command.GET_JOINTS, None, timeout)
+        if status is True:
+            joint_array = list(map(float, data.split(',')))
+            return status, joint_array
+        return status, data
+
+    async def get_pose(self, timeout=None):
+        status, data = await self.send_command(Command.GET_POSE, None, timeout)
+        if status is True:
+            pose_array = list(map(float, data.split(',')))
+            pose_object = PoseObject(*pose_array)
+            return status, pose_object
+        return status, data
+
+    async def get_hardware_status(self, timeout=None):
+        status, data = await self.send_command(Command.GET_HARDWARE_STATUS, None, timeout)
+        if status is True:
+            return status, NiryoOneClient.parse_hardware_status(data)
+        return status, data
+
+    async def get_learning_mode(self, timeout=None):
+        status, data = await self.send_command(Command.GET_LEARNING_MODE, None, timeout)
+        if status is True:
+            return status, bool(data)
+        return status, data
+
+    async def get_digital_io_state(self, timeout=None):
+        status, data = await self.send_command(Command.GET_DIGITAL_IO_STATE, None, timeout)
+        if status is True:
+            return status, NiryoOneClient.parse_digital_io_state(data)
+        return status, data
+
+    async def create_workspace(self, name, pose_origin, pose_1, pose_2, pose_3, timeout=None):
+        param_list = [name]
+        param_list.extend(self.pose_to_list(pose_origin))
+        param_list.extend(self.pose_to_list(pose_1))
+        param_list.extend(self.pose_to_list(pose_2))
+        param_list.extend(self.pose_to_list(pose_3))
+        return await self.send_command(Command.CREATE_WORKSPACE, param_list, timeout)
+
+    async def remove_workspace(self, name, timeout=None):
+        return await self.send_command(Command.REMOVE_WORKSPACE, [name], timeout)
+
+    async def get_workspace_ratio(self, workspace_name, timeout=None):
+        status, data = await self.send_command(Command.GET_WORKSPACE_RATIO, [workspace_name], timeout)
+        if status is True:
+            return status, float(data)
+        return status, data
+
+    async def get_workspace_list(self, timeout=None):
+        status, data = await self.send_command(Command.GET_WORKSPACE_LIST, None, timeout)
+        if status is True:
+            workspace_list = data.split(',')
+            return status, workspace_list
+        return status, data
+
+    async def get_img_compressed(self, timeout=None):
+        return await self.send_command(Command.GET_IMAGE_COMPRESSED, None, timeout)
+
+    async def get_target_pose_from_rel(self, workspace, height_offset, x_rel, y_rel, yaw_rel, timeout=None):
+        param_list = [workspace, height_offset, x_rel, y_rel, yaw_rel]
+        status, data = await self.send_command(Command.GET_TARGET_POSE_FROM_REL, param_list, timeout)
+        if status is True:
+            pose_array = list(map(float, data.split(',')))
+            pose_object = PoseObject(*pose_array)
+            return status, pose_object
+        return status, data
+
+    async def get_target_pose_from_cam(self, workspace, height_offset, shape, color, timeout=None):
+        param_list = [workspace, height_offset, shape, color]
+        status, data = await self.send_command(Command.GET_TARGET_POSE_FROM_CAM, param_list, timeout)
+
+        if status is True:
+            parameters_string_array = data.split(',')
+            obj_found = parameters_string_array[0] == "True"
+            if obj_found is True:
+                pose_array = list(map(float, parameters_string_array[1:7]))
+                pose_object = PoseObject(*pose_array)
+                shape_ret = parameters_string_array[7]
+                color_ret = parameters_string_array[8]
+                return status, obj_found, pose_object, Shape[shape_ret], Color[color_ret]
+        return status, False, None, "", ""
+
+    async def detect_object(self, workspace, shape, color, timeout=None):
+        param_list = [workspace, shape, color]
+        status, data = await self.send_command(Command.DETECT_OBJECT, param_list, timeout)
+
+        if not status:
+            return False, False, [], "", ""
+
+        parameters_string_array = data.split(',')
+        obj_found = parameters_string_array[0] == "True"
+        if not obj_found:
+            return True, False, [], "", ""
+        rel_pose_array = list(map(float, parameters_string_array[1:4]))
+        shape = parameters_string_array[4]
+        color = parameters_string_array[5]
+
+        return status, obj_found, rel_pose_array, Shape[shape], Color[color]
+
+    async def __move_with_vision(self, workspace, height_offset, shape, color, command, timeout):
+        param_list = [workspace, height_offset, shape, color]
+        status, data = await self.send_command(command, param_list, timeout)
+
+        if status is True:
+            parameters_string_array = data.split(',')
+            obj_found = parameters_string_array[0] == "True"
+            if obj_found is True:
+                shape_ret = parameters_string_array[1]
+                color_ret = parameters_string_array[2]
+                return status, obj_found, Shape[shape_ret], Color[color_ret]
+        return status, False, "", ""
+
+    async def vision_pick(self, workspace, height_offset, shape, color, timeout=None):
+        return await self.__move_with_vision(workspace, height_offset, shape, color, Command.VISION_PICK, timeout)
+
+    async def move_to_object(self, workspace, height_offset, shape, color, timeout=None):
+        return await self.__move_with_vision(workspace, height_offset, shape, color, Command.MOVE_TO_OBJECT, timeout)
+
+    async def activate_conveyor(self, conveyor_id, timeout=None):
+        return await self.set_conveyor(conveyor_id, activate=True, timeout=timeout)
+
+    async def deactivate_conveyor(self, conveyor_id, timeout=None):
+        return await self.set_conveyor(conveyor_id, activate=False, timeout=timeout)
+
+    async def set_conveyor(self, conveyor_id, activate, timeout=None):
+        return await self.send_command(Command.SET_CONVEYOR, [conveyor_id, activate], timeout)
+
+    async def stop_conveyor(self, conveyor_id, timeout=None):
+        return await self.control_conveyor(conveyor_id, control_on=False, speed=50,
+                                           direction=ConveyorDirection.FORWARD, timeout=timeout)
+
+    async def control_conveyor(self, conveyor_id, control_on, speed, direction, timeout=None):
+        param_list = [conveyor_id, control_on, speed, direction]
+        return await self.send_command(Command.CONTROL_CONVEYOR, param_list, timeout)
+
+    async def update_conveyor_id(self, old_id, new_id, timeout=None):
+        return await self.send_command(Command.UPDATE_CONVEYOR_ID, [old_id, new_id], timeout)
+
+    async def get_current_tool_id(self, timeout=None):
+        status, data = await self.send_command(Command.GET_CURRENT_TOOL_ID, None, timeout)
+        if status is True:
+            return status, RobotTool[data]
+        return status, data
+
+    async def pick_from_pose(self, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot, timeout=None):
+        return await self.send_command(Command.PICK_FROM_POSE, [x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot], timeout)
+
+    async def place_from_pose(self, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot, timeout=None):
+        return await self.send_command(Command.PLACE_FROM_POSE, [x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot], timeout)
+
+    async def get_calibration_object(self, timeout=None):
+        status, data = await self.send_command(Command.GET_CALIBRATION_OBJECT, [], timeout)
+        if status is not True:
+            return False, None, None
+        return NiryoOneClient.parse_calibration_object(data)
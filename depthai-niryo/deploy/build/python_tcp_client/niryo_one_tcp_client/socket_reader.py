@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+# socket_reader.py
+# Copyright (C) 2019 Niryo
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import select
+
+
+class SocketReader:
+    """Buffered reader on a connected socket
+
+    Data is received with recv_into in a reusable bytearray, only the unread part is kept between
+    two reads. Payloads larger than the buffer are received directly in their own bytearray so a
+    long answer is read in O(n) without intermediate copies.
+    """
+    class ConnectionClosedException(Exception):
+        pass
+
+    def __init__(self, sock, buffer_size=4096):
+        self.__socket = sock
+        self.__buffer = bytearray(buffer_size)
+        self.__view = memoryview(self.__buffer)
+        self.__start = 0
+        self.__end = 0
+
+    @property
+    def buffered(self):
+        return self.__end - self.__start
+
+    def __fill(self):
+        if self.__start == self.__end:
+            self.__start = self.__end = 0
+        elif self.__end == len(self.__buffer):
+            if self.__start > 0:
+                # move the unread data to the beginning of the buffer
+                size = self.__end - self.__start
+                self.__view[:size] = self.__view[self.__start:self.__end]
+                self.__start, self.__end = 0, size
+            else:
+                self.__grow(2 * len(self.__buffer))
+        received = self.__socket.recv_into(self.__view[self.__end:])
+        if received == 0:
+            raise self.ConnectionClosedException()
+        self.__end += received
+
+    def __grow(self, size):
+        self.__view.release()
+        self.__buffer.extend(bytes(size - len(self.__buffer)))
+        self.__view = memoryview(self.__buffer)
+
+    def read_until(self, delimiter):
+        """Read up to the delimiter (one byte), the delimiter is consumed but not returned"""
+        # bytes already searched, relative to the start (the unread data can be moved by __fill)
+        searched = 0
+        while True:
+            index = self.__buffer.find(delimiter, self.__start + searched, self.__end)
+            if index >= 0:
+                data = bytes(self.__view[self.__start:index])
+                self.__start = index + 1
+                return data
+            searched = self.__end - self.__start
+            self.__fill()
+
+    def read_exactly(self, size):
+        """Read exactly size bytes"""
+        if size <= self.buffered:
+            data = bytes(self.__view[self.__start:self.__start + size])
+            self.__start += size
+            return data
+        payload = bytearray(size)
+        with memoryview(payload) as view:
+            self.read_exactly_into(view)
+        return payload
+
+    def read_exactly_into(self, view):
+        """Fill a writable memoryview, the payload is received directly in the memory of the caller"""
+        size = len(view)
+        filled = min(size, self.buffered)
+        view[:filled] = self.__view[self.__start:self.__start + filled]
+        self.__start += filled
+        while filled < size:
+            received = self.__socket.recv_into(view[filled:])
+            if received == 0:
+                raise self.ConnectionClosedException()
+            filled += received
+        return view
+
+    def wait_readable(self, timeout):
+        """True if data is buffered or arrives within timeout seconds"""
+        if self.buffered:
+            return True
+        readable, _, _ = select.select([self.__socket], [], [], timeout)
+        return bool(readable)
+
+    def read_available(self):
+        """Read everything received so far, waiting for data if nothing is buffered"""
+        if self.buffered == 0:
+            self.__fill()
+        data = bytes(self.__view[self.__start:self.__end])
+        self.__start = self.__end = 0
+        return data
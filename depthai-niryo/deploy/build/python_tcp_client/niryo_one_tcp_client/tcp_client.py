@@ -18,16 +18,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import socket
-import sys
 import numpy as np
 from .pose_object import PoseObject
-from .hardware_status_object import HardwareStatusObject
 from .packet_builder import PacketBuilder
 from .enums import Command, RobotTool, Shape, Color, ConveyorDirection
-from .digital_pin_object import DigitalPinObject
-import re
-import ast
+from .socket_reader import SocketReader
+from .answer_framing import ShortAnswerFrame, OPEN, CLOSED
+from . import answer_parsers
 import time
+import threading
 
 
 class NiryoOneClient:
@@ -45,19 +44,32 @@ class NiryoOneClient:
                 "An invalid answer has been received. Format expected: COMMAND:[OK[, data_answer]] / [KO, reason].\n"
                 + "A problem occurred with: '" + answer + "'")
 
-    def __init__(self, timeout=5):
-        self.__port = 40001
+    # time the end of a short answer is waited for once its known fields arrived (seconds)
+    ANSWER_IDLE_TIMEOUT = 0.002
+
+    def __init__(self, timeout=5, port=40001, answer_idle_timeout=ANSWER_IDLE_TIMEOUT):
+        self.__port = port
+        self.answer_idle_timeout = answer_idle_timeout
+        # short answers ended by the idle timeout rather than by their fields
+        self.drained_answers = 0
         self.__is_running = True
         self.__is_connected = False
         self.__timeout = timeout
         self.__client_socket = None
+        self.__reader = None
         self.__packet_builder = PacketBuilder()
+        # held by __request from the command to the end of its answer, several threads can share the client
+        self.__lock = threading.Lock()
+        self.__image_poller = None
+        self.__poller_stop = threading.Event()
+        self.__latest_image = (None, None)
 
     def __del__(self):
         self.quit()
 
     def quit(self):
         self.__is_running = False
+        self.stop_image_polling()
         self.__shutdown_connection()
         self.__client_socket = None
 
@@ -87,91 +99,73 @@ class NiryoOneClient:
             print("Connected to server ({}) on port: {}".format(ip_address, self.__port))
             self.__is_connected = True
             self.__client_socket.settimeout(None)
+            self.__reader = SocketReader(self.__client_socket)
 
         return self.__is_connected
 
     def calibrate(self, calibrate_mode):
-        self.send_command(Command.CALIBRATE, [calibrate_mode])
-        return self.receive_answer()
+        return self.__request(Command.CALIBRATE, [calibrate_mode])
 
     def need_calibration(self):
         res, obj_data = self.get_hardware_status()
         return obj_data.calibration_needed
 
     def set_learning_mode(self, enabled):
-        self.send_command(Command.SET_LEARNING_MODE, [enabled])
-        return self.receive_answer()
+        return self.__request(Command.SET_LEARNING_MODE, [enabled])
 
     def move_joints(self, j1, j2, j3, j4, j5, j6):
-        self.send_command(Command.MOVE_JOINTS, [j1, j2, j3, j4, j5, j6])
-        return self.receive_answer()
+        return self.__request(Command.MOVE_JOINTS, [j1, j2, j3, j4, j5, j6])
 
     def move_pose(self, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot):
-        self.send_command(Command.MOVE_POSE, [x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot])
-        return self.receive_answer()
+        return self.__request(Command.MOVE_POSE, [x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot])
 
     def shift_pose(self, axis, shift_value):
-        self.send_command(Command.SHIFT_POSE, [axis, shift_value])
-        return self.receive_answer()
+        return self.__request(Command.SHIFT_POSE, [axis, shift_value])
 
     def set_arm_max_velocity(self, percentage_speed):
-        self.send_command(Command.SET_ARM_MAX_VELOCITY, [percentage_speed])
-        return self.receive_answer()
+        return self.__request(Command.SET_ARM_MAX_VELOCITY, [percentage_speed])
 
     def enable_joystick(self, enabled):
-        self.send_command(Command.ENABLE_JOYSTICK, [enabled])
-        return self.receive_answer()
+        return self.__request(Command.ENABLE_JOYSTICK, [enabled])
 
     def set_pin_mode(self, pin, pin_mode):
-        self.send_command(Command.SET_PIN_MODE, [pin, pin_mode])
-        return self.receive_answer()
+        return self.__request(Command.SET_PIN_MODE, [pin, pin_mode])
 
     def digital_write(self, pin, digital_state):
-        self.send_command(Command.DIGITAL_WRITE, [pin, digital_state])
-        return self.receive_answer()
+        return self.__request(Command.DIGITAL_WRITE, [pin, digital_state])
 
     def digital_read(self, pin):
-        self.send_command(Command.DIGITAL_READ, [pin])
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.DIGITAL_READ, [pin])
         if status is True:
             return status, int(data)
         return status, data
 
     def change_tool(self, tool):
-        self.send_command(Command.CHANGE_TOOL, [tool])
-        return self.receive_answer()
+        return self.__request(Command.CHANGE_TOOL, [tool])
 
     def open_gripper(self, gripper, speed):
-        self.send_command(Command.OPEN_GRIPPER, [gripper, speed])
-        return self.receive_answer()
+        return self.__request(Command.OPEN_GRIPPER, [gripper, speed])
 
     def close_gripper(self, gripper, speed):
-        self.send_command(Command.CLOSE_GRIPPER, [gripper, speed])
-        return self.receive_answer()
+        return self.__request(Command.CLOSE_GRIPPER, [gripper, speed])
 
     def pull_air_vacuum_pump(self, vacuum_pump):
-        self.send_command(Command.PULL_AIR_VACUUM_PUMP, [vacuum_pump])
-        return self.receive_answer()
+        return self.__request(Command.PULL_AIR_VACUUM_PUMP, [vacuum_pump])
 
     def push_air_vacuum_pump(self, vacuum_pump):
-        self.send_command(Command.PUSH_AIR_VACUUM_PUMP, [vacuum_pump])
-        return self.receive_answer()
+        return self.__request(Command.PUSH_AIR_VACUUM_PUMP, [vacuum_pump])
 
     def setup_electromagnet(self, electromagnet, pin):
-        self.send_command(Command.SETUP_ELECTROMAGNET, [electromagnet, pin])
-        return self.receive_answer()
+        return self.__request(Command.SETUP_ELECTROMAGNET, [electromagnet, pin])
 
     def activate_electromagnet(self, electromagnet, pin):
-        self.send_command(Command.ACTIVATE_ELECTROMAGNET, [electromagnet, pin])
-        return self.receive_answer()
+        return self.__request(Command.ACTIVATE_ELECTROMAGNET, [electromagnet, pin])
 
     def deactivate_electromagnet(self, electromagnet, pin):
-        self.send_command(Command.DEACTIVATE_ELECTROMAGNET, [electromagnet, pin])
-        return self.receive_answer()
+        return self.__request(Command.DEACTIVATE_ELECTROMAGNET, [electromagnet, pin])
 
     def get_saved_position_list(self):
-        self.send_command(Command.GET_SAVED_POSITION_LIST)
-        return self.receive_answer()
+        return self.__request(Command.GET_SAVED_POSITION_LIST)
 
     def wait(self, duration):
         # self.send_command(Command.WAIT, [duration])
@@ -184,16 +178,14 @@ class NiryoOneClient:
         return list(map(float, list_pos))
 
     def get_joints(self):
-        self.send_command(Command.GET_JOINTS)
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.GET_JOINTS)
         if status is True:
             joint_array = list(map(float, data.split(',')))
             return status, joint_array
         return status, data
 
     def get_pose(self):
-        self.send_command(Command.GET_POSE)
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.GET_POSE)
         if status is True:
             pose_array = list(map(float, data.split(',')))
             pose_object = PoseObject(*pose_array)
@@ -201,93 +193,117 @@ class NiryoOneClient:
         return status, data
 
     def get_hardware_status(self):
-        self.send_command(Command.GET_HARDWARE_STATUS)
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.GET_HARDWARE_STATUS)
         # print status
         if status is True:
-            first_infos = data[0:data.index(",[")].split(",")
-            rpi_temperature = int(first_infos[0])
-            hardware_version = int(first_infos[1])
-            connection_up = bool(first_infos[2])
-            error_message = first_infos[3].strip('\'')
-            calibration_needed = int(first_infos[4])
-            calibration_in_progress = bool(first_infos[5])
-            motor_names = ast.literal_eval(data[data.index("["):data.index("]") + 1])
-            motor_types = ast.literal_eval(data[data.index("],[") + 2:data.index("],(") + 1])
-
-            last_infos = data[data.index("],(") + 2:].split("),(")
-            temperatures = ast.literal_eval(last_infos[0] + ")")
-            voltages = ast.literal_eval("(" + last_infos[1] + ")")
-            hardware_errors = ast.literal_eval("(" + last_infos[2])
-
-            hardware_status = HardwareStatusObject(rpi_temperature, hardware_version, connection_up, error_message,
-                                                   calibration_needed, calibration_in_progress,
-                                                   motor_names, motor_types,
-                                                   temperatures, voltages, hardware_errors)
-            return status, hardware_status
+            return status, self.parse_hardware_status(data)
         return status, data
 
+    parse_hardware_status = staticmethod(answer_parsers.parse_hardware_status)
+
     def get_learning_mode(self):
-        self.send_command(Command.GET_LEARNING_MODE)
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.GET_LEARNING_MODE)
         if status is True:
             return status, bool(data)
         return status, data
 
     def get_digital_io_state(self):
-        self.send_command(Command.GET_DIGITAL_IO_STATE)
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.GET_DIGITAL_IO_STATE)
         if status is True:
-            matches = re.findall('(\[\d+, ?\'\w+\', ?[0-1], \d+\])+', data)
-            digital_pin_array = []
-            for match in matches:
-                elements = match.split(', ')
-                pin_id = elements[0].lstrip('[')
-                name = elements[1]
-                mode = int(elements[2])
-                state = int(elements[3].rstrip(']'))
-                digital_pin_array.append(DigitalPinObject(pin_id, name, mode, state))
-            return status, digital_pin_array
+            return status, self.parse_digital_io_state(data)
         return status, data
 
+    parse_digital_io_state = staticmethod(answer_parsers.parse_digital_io_state)
+
     def create_workspace(self, name, pose_origin, pose_1, pose_2, pose_3):
         param_list = [name]
         param_list.extend(self.pose_to_list(pose_origin))
         param_list.extend(self.pose_to_list(pose_1))
         param_list.extend(self.pose_to_list(pose_2))
         param_list.extend(self.pose_to_list(pose_3))
-        self.send_command(Command.CREATE_WORKSPACE, param_list)
-        return self.receive_answer()
+        return self.__request(Command.CREATE_WORKSPACE, param_list)
 
     def remove_workspace(self, name):
-        self.send_command(Command.REMOVE_WORKSPACE, [name])
-        return self.receive_answer()
+        return self.__request(Command.REMOVE_WORKSPACE, [name])
 
     def get_workspace_ratio(self, workspace_name):
         param_list = [workspace_name]
-        self.send_command(Command.GET_WORKSPACE_RATIO, param_list)
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.GET_WORKSPACE_RATIO, param_list)
         if status is True:
             return status, float(data)
         return status, data
 
     def get_workspace_list(self):
-        self.send_command(Command.GET_WORKSPACE_LIST)
-        status, data = self.receive_answer_long()
+        status, data = self.__request(Command.GET_WORKSPACE_LIST, None, self.receive_answer_long)
         if status is True:
             workspace_list = data.split(',')
             return status, workspace_list
         return status, data
 
     def get_img_compressed(self):
-        self.send_command(Command.GET_IMAGE_COMPRESSED)
-        status, data = self.receive_answer_long()
+        status, data = self.__request(Command.GET_IMAGE_COMPRESSED, None, self.receive_answer_long)
         return status, data
 
+    def get_img(self, buffer=None):
+        """Get the image of the robot camera decoded in a BGR numpy array
+
+        The compressed image is received in buffer (a bytearray grown if needed, reuse it between
+        calls to avoid allocations) and decoded by OpenCV from a view on this buffer.
+        """
+        import cv2
+        buffer = bytearray() if buffer is None else buffer
+        status, payload = self.__request(Command.GET_IMAGE_COMPRESSED, None, lambda: self.receive_answer_long_into(buffer))
+        if status is not True:
+            return status, payload
+        encoded = np.frombuffer(payload, dtype=np.uint8)
+        frame = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+        del encoded
+        payload.release()
+        return frame is not None, frame
+
+    def start_image_polling(self, period=0.1):
+        """Poll the robot camera in a background thread, the last frame is in latest_image
+
+        Args:
+            period: minimal time between two images (seconds)
+        """
+        if self.__image_poller is not None:
+            return
+        self.__poller_stop.clear()
+        self.__image_poller = threading.Thread(target=self.__poll_images, args=(period,),
+                                               name="niryo-image-poller", daemon=True)
+        self.__image_poller.start()
+
+    def stop_image_polling(self):
+        poller = self.__image_poller
+        if poller is None:
+            return
+        self.__poller_stop.set()
+        if poller is not threading.current_thread():
+            poller.join()
+        self.__image_poller = None
+
+    @property
+    def latest_image(self):
+        """(frame, timestamp) of the last image received by the poller, (None, None) before"""
+        return self.__latest_image
+
+    def __poll_images(self, period):
+        buffer = bytearray()
+        while not self.__poller_stop.is_set():
+            start = time.monotonic()
+            try:
+                status, frame = self.get_img(buffer)
+            except (self.HostNotReachableException, self.ClientNotConnectedException) as e:
+                print("Image polling stopped: {}".format(e))
+                break
+            if status is True:
+                self.__latest_image = (frame, time.time())
+            self.__poller_stop.wait(max(0., period - (time.monotonic() - start)))
+
     def get_target_pose_from_rel(self, workspace, height_offset, x_rel, y_rel, yaw_rel):
         param_list = [workspace, height_offset, x_rel, y_rel, yaw_rel]
-        self.send_command(Command.GET_TARGET_POSE_FROM_REL, param_list)
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.GET_TARGET_POSE_FROM_REL, param_list)
         if status is True:
             pose_array = list(map(float, data.split(',')))
             pose_object = PoseObject(*pose_array)
@@ -296,8 +312,7 @@ class NiryoOneClient:
 
     def get_target_pose_from_cam(self, workspace, height_offset, shape, color):
         param_list = [workspace, height_offset, shape, color]
-        self.send_command(Command.GET_TARGET_POSE_FROM_CAM, param_list)
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.GET_TARGET_POSE_FROM_CAM, param_list)
 
         if status is True:
             parameters_string_array = data.split(',')
@@ -313,8 +328,7 @@ class NiryoOneClient:
 
     def detect_object(self, workspace, shape, color):
         param_list = [workspace, shape, color]
-        self.send_command(Command.DETECT_OBJECT, param_list)
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.DETECT_OBJECT, param_list)
 
         if not status:
             return False, False, [], "", ""
@@ -331,8 +345,7 @@ class NiryoOneClient:
 
     def __move_with_vision(self, workspace, height_offset, shape, color, command):
         param_list = [workspace, height_offset, shape, color]
-        self.send_command(command, param_list)
-        status, data = self.receive_answer()
+        status, data = self.__request(command, param_list)
 
         if status is True:
             parameters_string_array = data.split(',')
@@ -356,8 +369,7 @@ class NiryoOneClient:
         return self.set_conveyor(conveyor_id, activate=False)
 
     def set_conveyor(self, conveyor_id, activate):
-        self.send_command(Command.SET_CONVEYOR, [conveyor_id, activate])
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.SET_CONVEYOR, [conveyor_id, activate])
         return status, data
 
     def stop_conveyor(self, conveyor_id):
@@ -366,42 +378,41 @@ class NiryoOneClient:
     def control_conveyor(self, conveyor_id, control_on, speed, direction):
         param_list = [conveyor_id, control_on, speed, direction]
 
-        self.send_command(Command.CONTROL_CONVEYOR, param_list)
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.CONTROL_CONVEYOR, param_list)
         return status, data
 
     def update_conveyor_id(self, old_id, new_id):
-        self.send_command(Command.UPDATE_CONVEYOR_ID, [old_id, new_id])
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.UPDATE_CONVEYOR_ID, [old_id, new_id])
         return status, data
 
     def get_current_tool_id(self):
-        self.send_command(Command.GET_CURRENT_TOOL_ID)
-        status, data = self.receive_answer()
+        status, data = self.__request(Command.GET_CURRENT_TOOL_ID)
         if status is True:
             return status, RobotTool[data]
         return status, data
 
     def pick_from_pose(self, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot):
-        self.send_command(Command.PICK_FROM_POSE, [x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot])
-        return self.receive_answer()
+        return self.__request(Command.PICK_FROM_POSE, [x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot])
 
     def place_from_pose(self, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot):
-        self.send_command(Command.PLACE_FROM_POSE, [x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot])
-        return self.receive_answer()
+        return self.__request(Command.PLACE_FROM_POSE, [x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot])
 
     def get_calibration_object(self):
-        self.send_command(Command.GET_CALIBRATION_OBJECT, [])
-        _, data_raw = self.receive_answer_long()
+        status, data = self.__request(Command.GET_CALIBRATION_OBJECT, [], self.receive_answer_long)
+        if status is not True:
+            return False, None, None
+        return self.parse_calibration_object(data)
 
-        status, data = data_raw.split(",", 1)
-        if not status:
-            return status, None, None, None
-        list_data = ast.literal_eval(data)
+    parse_calibration_object = staticmethod(answer_parsers.parse_calibration_object)
+
+    def __request(self, command_type, parameter_list=None, receive=None):
+        """Send a command and receive its answer (receive_answer by default) as one exchange
 
-        mtx = np.reshape(list_data[0], (3, 3))
-        dist = np.expand_dims(list_data[1], axis=0)
-        return status, mtx, dist
+        The exchange holds the lock of the client, several threads can share it.
+        """
+        with self.__lock:
+            self.send_command(command_type, parameter_list)
+            return receive() if receive is not None else self.receive_answer(command_type)
 
     def send_command(self, command_type, parameter_list=None):
         if self.__is_connected is False:
@@ -409,104 +420,74 @@ class NiryoOneClient:
         send_success = False
         if self.__client_socket is not None:
             try:
-                packet = self.__packet_builder.build_command_packet(command_type, parameter_list)
-                if sys.version_info[0] == 3:
-                    packet = packet.encode()
-                self.__client_socket.send(packet)
+                self.__client_socket.send(self.__packet_builder.build_command_packet(command_type, parameter_list))
             except socket.error as e:
                 print(e)
                 raise self.HostNotReachableException()
         return send_success
 
-    def receive_answer(self):
-        READ_SIZE = 512
+    def receive_answer(self, command_type=None):
+        """Receive a short answer, framed by the fields the command answers (see answer_framing)"""
         try:
-            received = self.__client_socket.recv(READ_SIZE)
-        except socket.error as e:
+            self.__reader.read_until(b':')
+            frame = self.__read_short_answer(ShortAnswerFrame(command_type))
+        except (socket.error, SocketReader.ConnectionClosedException) as e:
             print(e)
             raise self.HostNotReachableException()
-        if not received:
-            raise self.HostNotReachableException()
-        if sys.version_info[0] == 3:
-            received = received.decode()
-        received_split_list = received.split(':', 1)
-        if len(received_split_list) != 2:
-            raise self.InvalidAnswerException(received)
-        command_answer = received_split_list[1]
-
-        # If 'OK' with data or 'KO' with reason
-        if ',' in command_answer:
-            command_answer_split_list = command_answer.split(',', 1)
-            if len(command_answer_split_list) != 2:
-                raise self.InvalidAnswerException(command_answer)
-            answer_status = command_answer_split_list[0]
-            if answer_status == "OK" and answer_status == "KO":
-                raise self.InvalidAnswerException(answer_status)
-            answer_data = command_answer_split_list[1]
-            return answer_status == "OK", answer_data
-
-        if command_answer == "OK" and command_answer == "KO":
-            raise self.InvalidAnswerException(command_answer)
-        return command_answer == "OK", None
+        return frame.result()
+
+    def __read_short_answer(self, frame):
+        # the missing bytes are waited for, the rest until the socket stays idle
+        while frame.state != CLOSED:
+            if frame.state == OPEN and not self.__reader.wait_readable(self.answer_idle_timeout):
+                self.drained_answers += 1
+                break
+            frame.feed(self.__reader.read_available())
+        return frame
+
+    def __receive_long_header(self):
+        # format: COMMAND:OK,PAYLOAD_SIZE,PAYLOAD or COMMAND:KO,reason
+        self.__reader.read_until(b':')
+        answer_status = self.__reader.read_until(b',').decode()
+        if answer_status != "OK":
+            frame = ShortAnswerFrame()
+            frame.feed(answer_status.encode() + b",")
+            return self.__read_short_answer(frame).result()
+        payload_size_str = self.__reader.read_until(b',').decode()
+        try:
+            return True, int(payload_size_str)
+        except ValueError:
+            raise self.InvalidAnswerException("PAYLOAD_SIZE needs to be integer. " \
+                                              "But '{}' cannot be converted to integer".format(payload_size_str))
 
     def receive_answer_long(self):
-        READ_SIZE = 512  # Should be enough to read cmd string, status and size
         try:
-            received = self.__client_socket.recv(READ_SIZE)
-        except socket.error as e:
+            status, payload_size = self.__receive_long_header()
+            if status is False:
+                return status, payload_size
+            payload = self.__reader.read_exactly(payload_size)
+        except (socket.error, SocketReader.ConnectionClosedException) as e:
             raise self.HostNotReachableException()
-        if not received:
+        try:
+            payload = payload.decode()
+        except UnicodeDecodeError:
+            pass
+        return True, payload
+
+    def receive_answer_long_into(self, buffer):
+        """Same as receive_answer_long, the payload is received in buffer and returned as a memoryview
+
+        Args:
+            buffer: bytearray, grown if the payload is larger. It must not be exported (no living
+                memoryview or numpy view on it) when it has to grow.
+        """
+        try:
+            status, payload_size = self.__receive_long_header()
+            if status is False:
+                return status, payload_size
+            if len(buffer) < payload_size:
+                buffer.extend(bytes(payload_size - len(buffer)))
+            payload = self.__reader.read_exactly_into(memoryview(buffer)[:payload_size])
+        except (socket.error, SocketReader.ConnectionClosedException) as e:
             raise self.HostNotReachableException()
-        if sys.version_info[0] == 2:
-            received_split_list = received.split(':', 1)
-            if len(received_split_list) != 2:
-                raise self.InvalidAnswerException(received)
-            command_answer = received_split_list[1]
-            command_answer_split_list = command_answer.split(',', 2)
-            if len(command_answer_split_list) < 3:
-                raise self.InvalidAnswerException("long answer needs to have format: " \
-                                                  "STATUS,PAYLOAD_SIZE,PAYLOAD. Got: {}".format(command_answer))
-            answer_status = command_answer_split_list[0]
-            try:
-                payload_size = int(command_answer_split_list[1])
-            except ValueError:
-                raise self.InvalidAnswerException("PAYLOAD_SIZE needs to be integer. " \
-                                                  "But '{}' cannot be converted to integer".format(
-                    command_answer_split_list[1]))
-            payload = command_answer_split_list[2]
-            while len(payload) < payload_size:
-                try:
-                    received = self.__client_socket.recv(READ_SIZE)
-                except socket.error as e:
-                    raise self.HostNotReachableException()
-                if not received:
-                    raise self.HostNotReachableException()
-                payload += received
-        else:
-            index_double_point = received.find(b':')
-            received_split_list = [received[:index_double_point].decode(), received[index_double_point + 1:]]
-            rest = received_split_list[1]
-            index_first_comma = rest.find(b',')
-            first_split = [rest[:index_first_comma].decode(), rest[index_first_comma + 1:]]
-            answer_status, rest = first_split
-            index_second_comma = rest.find(b',')
-            second_split = [rest[:index_second_comma].decode(), rest[index_second_comma + 1:]]
-            payload_size_str, payload = second_split
-            try:
-                payload_size = int(payload_size_str)
-            except ValueError:
-                raise self.InvalidAnswerException("PAYLOAD_SIZE needs to be integer. " \
-                                                  "But '{}' cannot be converted to integer".format(payload_size_str))
-            while len(payload) < payload_size:
-                try:
-                    received = self.__client_socket.recv(READ_SIZE)
-                except socket.error as e:
-                    raise self.HostNotReachableException()
-                if not received:
-                    raise self.HostNotReachableException()
-                payload += received
-            try:
-                payload = payload.decode()
-            except UnicodeDecodeError:
-                pass
-        return answer_status == "OK", payload
+        return True, payload
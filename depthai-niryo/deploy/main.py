@@ -19,10 +19,25 @@ Attributes:
     MQTT_PORT        (str): Port of the MQTT Broker
     MQTT_CAM_TOPIC   (str): MQTT Topic where the camera's results will be send (objects position ..)
     MQTT_NIRYO_TOPIC (str): MQTT Topic where the niryo's results will be send (position ..)
-    MODEL            (str): Depthai blob model located directly in /depthai-niryo/deploy/models
-    CONFIG           (str): Depthai json config is mandatory to run blob model, located in /depthai-niryo/deploy/config
-    THRESHOLD_UP     (str): Provide maximum depth for the sensor (mm)
-    THRESHOLD_DOWN   (str): Provide minimum depth for the sensor (mm)
+    MQTT_PAYLOAD     (str): Format of the detections published on <MQTT_CAM_TOPIC>/frame, "binary" (default) or "json"
+    MQTT_KEYFRAME_INTERVAL  (str): Seconds between two frames published even if the detections did not change (default 1)
+    MQTT_MAX_RATE           (str): Maximum frames published per second, 0 for no limit (default)
+    MQTT_POSITION_TOLERANCE (str): Motion in mm below which a detection is not published again (default 5)
+    MQTT_QUEUE_SIZE         (str): Messages waiting for the broker before dropping (default 256)
+    MQTT_DROP_POLICY        (str): "drop_oldest" (default) or "drop_newest" when the queue is full
+    MQTT_QOS                (str): QoS of the published messages (default 0)
+    MODEL            (str): Depthai blob model of /depthai-niryo/deploy/models, by name or by hash "sha256:<hash>" (see GET /models)
+    CONFIG           (str): Depthai json config is mandatory to run blob model, located in /depthai-niryo/deploy/config (default the config linked to the model, else yolov5.json)
+    THRESHOLD_UP     (int): Provide maximum depth for the sensor (mm)
+    THRESHOLD_DOWN   (int): Provide minimum depth for the sensor (mm)
+    INTERCEPT        (str): "True" (default) grabs at the predicted position of the object in one move, "False" uses the roi loop
+    ROBOT_LATENCY    (str): First guess of the seconds the arm needs to reach an object, then measured (default 1)
+    HOST_DEPTH       (str): "True" receives the depth frames to position the detections the device failed to, "False" (default)
+    STREAMS          (str): Frames sent to the host besides the detections, comma separated "rgb", "depth" (default none, headless)
+    VIDEO            (str): "True" serves the annotated rgb frames on /video/stream and /video/snapshot, "False" (default)
+    VIDEO_QUALITY    (str): JPEG quality of the video endpoints (default 80)
+    OVERLAY_DETAIL   (str): Annotation of the frames, "box", "label" (class and confidence) or "full" (default, with the coordinates)
+    OVERLAY_BUDGET_MS (str): Drawing time of a frame (ms) after which the remaining detections only get their box, 0 for no limit (default 2)
 
 Examples:
     Docker:
@@ -39,8 +54,9 @@ path.append("/app/config/")
 """Import source code"""
 import uvicorn, os, threading
 from fastapi import *
-from src.api.routers import models, niryo
+from src.api.routers import models, niryo, video
 from src.app import App
+from src.runtime.model_registry import ModelRegistry
 from src.utils import global_var
 
 """API"""
@@ -52,6 +68,7 @@ app = FastAPI(
 """Router """
 app.include_router(models.router)
 app.include_router(niryo.router)
+app.include_router(video.router)
 
 """Primary endpoints """
 @app.get("/")
@@ -78,6 +95,9 @@ def start():
 @app.on_event("startup")
 async def startup():
     """Code here will run on startup """
+    # index of the models, the blobs copied without the api are hashed once
+    global_var.REGISTRY = ModelRegistry("models").load()
+    print("[API] {} models in the registry".format(len(global_var.REGISTRY)))
     os.environ["MustStop"] = "False"
     global_var.app_thread = threading.Thread(target=loop, args=())
     global_var.app_thread.start()
@@ -1,2 +1,3 @@
 from . import models
-from . import niryo
\ No newline at end of file
+from . import niryo
+from . import video
@@ -1,22 +1,56 @@
 # -*- coding: utf-8 -*-
-"""FastAPI models endpoints"""
+"""FastAPI models endpoints
+
+The models are read from the content-addressed registry of the models folder (see
+:mod:`src.runtime.model_registry`), a model is referred to by its SHA-256 or by one of its names.
+"""
 
 from fastapi import UploadFile, APIRouter
-from ..utils import write_file
-import os
+from ..utils import write_model
+from src.utils import global_var
+from src.runtime.model_registry import ModelRegistry
 
 router = APIRouter()
 
+def registry() -> ModelRegistry:
+    """Registry loaded at startup, loaded on the first call otherwise"""
+    if global_var.REGISTRY is None:
+        global_var.REGISTRY = ModelRegistry("models").load()
+    return global_var.REGISTRY
+
 @router.get("/models", tags=["models"])
 async def models():
-    """List all the models located in /models folder"""
-    return {"message": os.listdir("models")}
+    """List the models of the registry with their metadata"""
+    return {"message": [entry.to_dict() for entry in registry().entries()]}
+
+@router.get("/models/{key}", tags=["models"])
+async def model(key: str):
+    """Metadata of a model, by SHA-256 (``sha256:<hash>`` or bare) or by name"""
+    entry = registry().lookup(key)
+    if entry is None:
+        return {"message": "unknown model {}".format(key)}
+    return {"message": entry.to_dict()}
 
 @router.post("/models/upload", tags=["models"])
-async def upload_model(file: UploadFile):
-    """Upload desired model to /models folder"""
+async def upload_model(file: UploadFile, config: str=None):
+    """Upload a blob to the registry, optionally linked to a JSON config of /config
+
+    The same blob uploaded twice is stored once.
+    """
     if not file:
         return {"message": "no file sent"}
-    else:
-        await write_file(file)
-        return {"Uploaded filename": file.filename}
+    try:
+        entry, created = await write_model(file, registry(), config)
+    except ValueError as error:
+        return {"message": str(error)}
+    return {"message": "model uploaded" if created else "model already registered",
+        "Uploaded filename": file.filename, "sha256": entry.sha256, "created": created}
+
+@router.post("/models/{key}/config/{config}", tags=["models"])
+async def link_config(key: str, config: str):
+    """Link a model to the JSON config it runs with"""
+    try:
+        entry = registry().link_config(key, config)
+    except ValueError as error:
+        return {"message": str(error)}
+    return {"message": entry.to_dict()}
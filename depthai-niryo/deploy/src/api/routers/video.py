@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""FastAPI video endpoints
+
+The frames are drawn and encoded once by the :obj:`VideoStreamer` of the app, every client
+gets the same JPEG. Nothing is encoded while no client is connected. The clients wait for the
+frames on the event loop, none of them holds a thread of the pool.
+"""
+
+from fastapi import APIRouter, Request
+from fastapi.responses import Response, StreamingResponse
+from src.utils import global_var
+from src.runtime.video import BOUNDARY
+
+router = APIRouter()
+
+DISABLED = {"message": "video not enabled, run the app with VIDEO=True"}
+
+@router.get("/video/stream", tags=["video"])
+async def stream(request: Request):
+    """MJPEG stream of the annotated rgb frames, to open in a browser or an <img> tag"""
+    streamer = global_var.VIDEO
+    if streamer is None:
+        return DISABLED
+    return StreamingResponse(streamer.async_frames(request.is_disconnected),
+        media_type="multipart/x-mixed-replace; boundary={}".format(BOUNDARY))
+
+@router.get("/video/snapshot", tags=["video"])
+async def snapshot():
+    """JPEG of the latest annotated rgb frame"""
+    streamer = global_var.VIDEO
+    if streamer is None:
+        return DISABLED
+    jpeg = await streamer.async_snapshot()
+    if jpeg is None:
+        return {"message": "no frame received"}
+    return Response(content=jpeg, media_type="image/jpeg")
@@ -1 +1 @@
-from .files import write_file
\ No newline at end of file
+from .files import write_file, write_model
@@ -1,4 +1,5 @@
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 import os
 
 async def write_file(file: UploadFile):
@@ -9,3 +10,21 @@ async def write_file(file: UploadFile):
     with open(filename, 'wb') as out:
         out.write(content)
     print("[*] Done !")
+
+async def write_model(file: UploadFile, registry, config: str=None):
+    """Stream an uploaded blob in the model registry, hashed while it is written
+
+    Returns:
+        tuple: Its :obj:`ModelEntry` and False if the same blob was already registered
+    """
+    print("[*] Saving {} ..".format(file.filename))
+    # hashing and writing the blob would block the event loop (and the video streams)
+    with await run_in_threadpool(registry.upload) as writer:
+        while True:
+            chunk = await file.read(1 << 20)
+            if not chunk:
+                break
+            await run_in_threadpool(writer.write, chunk)
+        entry, created = await run_in_threadpool(writer.commit, file.filename, config)
+    print("[*] Done ! sha256 {}{}".format(entry.sha256, "" if created else " (already registered)"))
+    return entry, created
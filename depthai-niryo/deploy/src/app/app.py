@@ -3,11 +3,13 @@
 
 This module link all the services (niryo, object detection, mqtt, api)"""
 
-from ..runtime import ObjectDetection
-from ..mqtt import MqttClient
+import os
+from ..runtime import ObjectDetection, InterceptPredictor, LatencyEstimator, VideoStreamer, load_model_config, ModelRegistry
+from ..mqtt import MqttClient, PublishPolicy
 from ..niryo import Niryo
 from ..utils import global_var
-from .args import Args
+from .args import Args, FALLBACK_CONFIG
+from .commands import register_commands
 
 class App(object):
     """App class managing Niryo, ObjectDetection and MQTT client
@@ -16,14 +18,34 @@ class App(object):
         _args              (Dict): Dictionnary of all arguments passed via ``docker run``command
         _mqtt_client (MqttClient): MQTT Client publishing and subscribing to different topics
         _od     (ObjectDetection): ObjectDetection class to use depthai camera and perform object detection on video stream
+        _predictor (InterceptPredictor): Conveyor velocity estimation for the grabs, None to use the roi loop
+        _video        (VideoStreamer): Annotated frames served by the api, None when disabled
     """
     def __init__(self) -> None:
         """Start Niryo robot, MQTT client and object detection models"""
 
         self._args = Args.get_args()
-        self._mqtt_client = MqttClient(self._args["mqtt_broker"], self._args["mqtt_cam_topic"], self._args["mqtt_niryo_topic"], int(self._args["mqtt_broker_port"]), verbose=self._args["mqtt_verbose"])
+        registry = global_var.REGISTRY if global_var.REGISTRY is not None else ModelRegistry("models").load()
+        if not self._args["config"]:
+            entry = registry.lookup(self._args["model"])
+            self._args["config"] = entry.config if entry is not None and entry.config else FALLBACK_CONFIG
+        # a bad model config fails here, before connecting to the broker and the robot (the result is cached)
+        load_model_config(os.path.join("config", self._args["config"]))
+        policy = PublishPolicy(position_tolerance=float(self._args["mqtt_position_tolerance"]),
+            keyframe_interval=float(self._args["mqtt_keyframe_interval"]), max_rate=float(self._args["mqtt_max_rate"]))
+        self._mqtt_client = MqttClient(self._args["mqtt_broker"], self._args["mqtt_cam_topic"], self._args["mqtt_niryo_topic"], int(self._args["mqtt_broker_port"]), verbose=self._args["mqtt_verbose"], payload_format=self._args["mqtt_payload"], policy=policy, queue_size=int(self._args["mqtt_queue_size"]), drop_policy=self._args["mqtt_drop_policy"], default_qos=int(self._args["mqtt_qos"]))
         global_var.NIRYO = Niryo()
-        self._od = ObjectDetection(self._args, mqtt_client=self._mqtt_client)
+        self._od = ObjectDetection(self._args, mqtt_client=self._mqtt_client, registry=registry)
+        register_commands(self._mqtt_client.commands, self._od)
+        self._predictor = None
+        if str(self._args["intercept"]).lower() in ("1", "true"):
+            self._predictor = InterceptPredictor(latency=LatencyEstimator(float(self._args["robot_latency"])))
+        self._video = None
+        if str(self._args["video"]).lower() in ("1", "true"):
+            self._video = VideoStreamer(quality=int(self._args["video_quality"]), renderer=self._od.overlay)
+            self._od.attach_video(self._video)
+            self._video.start()
+            global_var.VIDEO = self._video
 
     def configure(self) -> None:
         """Configure object detection properties and its pipeline"""
@@ -39,7 +61,7 @@ class App(object):
             This will run until a environment variable MUST_STOP is set to True by the API
 
         """
-        self._od.run()
+        self._od.run(predictor=self._predictor)
 
     def __del__(self):
         self.exit()
@@ -50,4 +72,8 @@ class App(object):
         print("[APP] Quitting ..")
         if global_var.NIRYO != None : global_var.NIRYO.quit()        
         if self._mqtt_client != None: self._mqtt_client.quit()
+        if getattr(self, "_video", None) != None:
+            self._video.stop()
+            print("[APP] Video overlay {}".format(self._video.renderer.report()))
+            if global_var.VIDEO is self._video: global_var.VIDEO = None
         
\ No newline at end of file
@@ -4,11 +4,28 @@ from os import environ
 """ DEFAULT ARGS """
 DEFAULT_MQTT_VERBOSE = False
 DEFAULT_MODEL = "yolov5m_default_openvino_2021.4_6shave.blob"
-DEFAULT_CONFIG = "yolov5.json"
+# empty : the config linked to the model in the registry, else FALLBACK_CONFIG
+DEFAULT_CONFIG = ""
+FALLBACK_CONFIG = "yolov5.json"
 DEFAULT_MQTT_BROKER = "test.fr"
 DEFAULT_MQTT_NIRYO_TOPIC = "mqtt/niryo/"
 DEFAULT_MQTT_CAM_TOPIC = "mqtt/cam/"
 DEFAULT_MQTT_BROKER_PORT = "1883"
+DEFAULT_MQTT_PAYLOAD = "binary"
+DEFAULT_MQTT_KEYFRAME_INTERVAL = 1.0
+DEFAULT_MQTT_MAX_RATE = 0
+DEFAULT_MQTT_POSITION_TOLERANCE = 5.0
+DEFAULT_MQTT_QUEUE_SIZE = 256
+DEFAULT_MQTT_DROP_POLICY = "drop_oldest"
+DEFAULT_MQTT_QOS = 0
+DEFAULT_INTERCEPT = True
+DEFAULT_ROBOT_LATENCY = 1.0
+DEFAULT_HOST_DEPTH = False
+DEFAULT_STREAMS = ""
+DEFAULT_VIDEO = False
+DEFAULT_VIDEO_QUALITY = 80
+DEFAULT_OVERLAY_DETAIL = "full"
+DEFAULT_OVERLAY_BUDGET_MS = 2.0
 DEFAULT_THRESH_UP = 500
 DEFAULT_THRESH_DOWN = 100
 
@@ -37,7 +54,22 @@ class Args:
         _args["mqtt_niryo_topic"] = environ.get("MQTT_NIRYO_TOPIC", DEFAULT_MQTT_NIRYO_TOPIC)
         _args["mqtt_cam_topic"] = environ.get("MQTT_CAM_TOPIC", DEFAULT_MQTT_CAM_TOPIC)
         _args["mqtt_broker_port"] = environ.get("MQTT_BROKER_PORT", DEFAULT_MQTT_BROKER_PORT)
-        _args["threshold_up"] = environ.get("THRESHOLD_UP", DEFAULT_THRESH_UP)
-        _args["threshold_down"] = environ.get("THRESHOLD_DOWN", DEFAULT_THRESH_DOWN)
+        _args["threshold_up"] = int(environ.get("THRESHOLD_UP", DEFAULT_THRESH_UP))
+        _args["threshold_down"] = int(environ.get("THRESHOLD_DOWN", DEFAULT_THRESH_DOWN))
         _args["mqtt_verbose"] = environ.get("MQTT_VERBOSE", DEFAULT_MQTT_VERBOSE)
+        _args["mqtt_payload"] = environ.get("MQTT_PAYLOAD", DEFAULT_MQTT_PAYLOAD)
+        _args["mqtt_keyframe_interval"] = environ.get("MQTT_KEYFRAME_INTERVAL", DEFAULT_MQTT_KEYFRAME_INTERVAL)
+        _args["mqtt_max_rate"] = environ.get("MQTT_MAX_RATE", DEFAULT_MQTT_MAX_RATE)
+        _args["mqtt_position_tolerance"] = environ.get("MQTT_POSITION_TOLERANCE", DEFAULT_MQTT_POSITION_TOLERANCE)
+        _args["mqtt_queue_size"] = environ.get("MQTT_QUEUE_SIZE", DEFAULT_MQTT_QUEUE_SIZE)
+        _args["mqtt_drop_policy"] = environ.get("MQTT_DROP_POLICY", DEFAULT_MQTT_DROP_POLICY)
+        _args["mqtt_qos"] = environ.get("MQTT_QOS", DEFAULT_MQTT_QOS)
+        _args["intercept"] = environ.get("INTERCEPT", DEFAULT_INTERCEPT)
+        _args["robot_latency"] = environ.get("ROBOT_LATENCY", DEFAULT_ROBOT_LATENCY)
+        _args["host_depth"] = environ.get("HOST_DEPTH", DEFAULT_HOST_DEPTH)
+        _args["streams"] = environ.get("STREAMS", DEFAULT_STREAMS)
+        _args["video"] = environ.get("VIDEO", DEFAULT_VIDEO)
+        _args["video_quality"] = environ.get("VIDEO_QUALITY", DEFAULT_VIDEO_QUALITY)
+        _args["overlay_detail"] = environ.get("OVERLAY_DETAIL", DEFAULT_OVERLAY_DETAIL)
+        _args["overlay_budget_ms"] = environ.get("OVERLAY_BUDGET_MS", DEFAULT_OVERLAY_BUDGET_MS)
         return _args
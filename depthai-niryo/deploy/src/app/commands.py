@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""MQTT commands of the app
+
+This module registers the handlers driving the cell from the mqtt command channel :
+
+    * ``move`` : ``{"axis": "x", "value": 0.05}`` increments an axis (meters, radians),
+      ``{"pose": [x, y, z, roll, pitch, yaw]}`` moves to an absolute pose
+    * ``stand_by`` : goes back to the stand by position
+    * ``grab_label`` : ``{"label": "not_good"}`` selects the objects to grab
+    * ``pause`` / ``resume`` : stops or restarts the grabing sequence
+    * ``thresholds`` : ``{"down": 100, "up": 500}`` depth range (mm) of the objects to grab
+    * ``conveyor_speed`` : ``{"speed": 50, "conveyor": 1}`` speed in %, negative runs backward
+
+Pause the grabing sequence before moving the arm, otherwise both move the robot in turn.
+"""
+
+from niryo_one_tcp_client import ConveyorID
+from ..mqtt import CommandDispatcher, CommandError
+from ..niryo import Niryo
+from ..runtime import ObjectDetection
+from ..utils import global_var
+
+AXES = ("x", "y", "z", "roll", "pitch", "yaw")
+
+def niryo() -> Niryo:
+    if global_var.NIRYO is None:
+        raise CommandError("niryo not currently alive")
+    return global_var.NIRYO
+
+def move(axis: str=None, value: float=None, pose: list=None) -> list:
+    """Move the arm, return the new pose"""
+    robot = niryo()
+    if pose is not None:
+        if len(pose) != 6:
+            raise CommandError("Expected pose [x, y, z, roll, pitch, yaw], given {}".format(pose))
+        status, data = robot.move_pose(*map(float, pose))
+        if not status:
+            raise CommandError(data)
+    elif axis in AXES and value is not None:
+        robot.increment_pos(axis, float(value))
+    else:
+        raise CommandError("Expected a pose or an axis in {} with a value".format(AXES))
+    return robot.position.to_list()
+
+def stand_by() -> list:
+    robot = niryo()
+    robot.position = robot.stand_by
+    return robot.position.to_list()
+
+def conveyor_speed(speed: int, conveyor: int=1) -> int:
+    conveyor_ids = {1: ConveyorID.ID_1, 2: ConveyorID.ID_2}
+    if conveyor not in conveyor_ids:
+        raise CommandError("Expected conveyor 1 or 2, given {}".format(conveyor))
+    if not -100 <= int(speed) <= 100:
+        raise CommandError("Expected a speed in [-100, 100], given {}".format(speed))
+    if not niryo().conveyor_speed(int(speed), conveyor_ids[conveyor]):
+        raise CommandError("conveyor {} refused speed {}".format(conveyor, speed))
+    return int(speed)
+
+def register_commands(commands: CommandDispatcher, od: ObjectDetection) -> None:
+    """Register the commands of the app on a dispatcher"""
+    commands.register("move", move)
+    commands.register("stand_by", stand_by)
+    commands.register("conveyor_speed", conveyor_speed)
+    commands.register("grab_label", od.set_label_to_grab)
+    commands.register("pause", od.pause_robot)
+    commands.register("resume", od.resume_robot)
+    commands.register("thresholds", od.set_thresholds)
@@ -1 +1,4 @@
-from .client import MqttClient
\ No newline at end of file
+from .client import MqttClient, PublishPolicy
+from .payload import DetectionRecord, DETECTION_DTYPE
+from .outbound import OutboundQueue
+from .commands import CommandDispatcher, CommandError
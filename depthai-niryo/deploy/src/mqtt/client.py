@@ -4,10 +4,109 @@
 This module demonstrates the mqtt client relative to depthai and niryo
 It is used to publish the detections results to a remote broker provided by 
 environments variables *MQTT_BROKER*
+
+The detections of a frame are published in a single message on ``<cam_topic>/frame``,
+see :mod:`src.mqtt.payload` for its binary and JSON formats. A :obj:`PublishPolicy` only lets
+through the frames whose detections changed, a keyframe at a fixed interval and no more
+messages per topic than the configured rate.
+
+Messages are never sent from the caller thread : they go through a bounded :obj:`OutboundQueue`
+drained by a background thread, and the connection to the broker is retried with an exponential
+backoff, so a slow or unreachable broker never blocks the camera loop.
+
+Commands received on ``<niryo_topic>/cmd`` are executed by a :obj:`CommandDispatcher`, see
+:mod:`src.mqtt.commands`.
 """
 
+import json, threading
 import paho.mqtt.client as mqtt #import the client1
+from typing import Dict, List, Sequence, Tuple
+from . import payload
+from .payload import DetectionRecord
+from .outbound import OutboundQueue, OutboundMessage, DROP_OLDEST
+from .commands import CommandDispatcher
 DEFAULT_CLIENT_NAME = "niryo"
+DEFAULT_KEEPALIVE = 60
+
+class PublishPolicy(object):
+    """Decide which frames are worth publishing
+
+    A frame is published when its detections moved or changed beyond the tolerances compared with
+    the last message sent on the topic, or when no message was sent for ``keyframe_interval``
+    seconds (consumers joining late or missing a message get the full state back). The rate cap
+    is applied first : a change held back by the cap is still compared with the last message sent,
+    so it goes out with the next frame allowed.
+
+    Attributes:
+        position_tolerance   (float): Distance in mm on each axis below which a detection did not move
+        box_tolerance          (int): Distance in pixels on each side of the box below which it did not move
+        confidence_tolerance (float): Confidence variation ignored
+        keyframe_interval    (float): Seconds between two keyframes, 0 disables them
+        max_rate             (float): Messages per second per topic, 0 for no limit
+        rates                 (dict): Rate of specific topics, overriding ``max_rate``
+        published              (int): Frames published
+        suppressed             (int): Frames dropped because nothing changed
+        rate_limited           (int): Frames dropped by the rate cap
+    """
+    def __init__(self, position_tolerance: float=5., box_tolerance: int=4, confidence_tolerance: float=0.1,
+        keyframe_interval: float=1., max_rate: float=0., rates: Dict[str, float]=None) -> None:
+        self.position_tolerance = position_tolerance
+        self.box_tolerance = box_tolerance
+        self.confidence_tolerance = confidence_tolerance
+        self.keyframe_interval = keyframe_interval
+        self.max_rate = max_rate
+        self.rates = dict(rates or {})
+        self.published = 0
+        self.suppressed = 0
+        self.rate_limited = 0
+        # topic -> (time, detections) of the last message sent
+        self._last = {}
+
+    def same_detection(self, a: DetectionRecord, b: DetectionRecord) -> bool:
+        return a.label == b.label \
+            and abs(a.confidence - b.confidence) <= self.confidence_tolerance \
+            and abs(a.x - b.x) <= self.position_tolerance \
+            and abs(a.y - b.y) <= self.position_tolerance \
+            and abs(a.z - b.z) <= self.position_tolerance \
+            and abs(a.x1 - b.x1) <= self.box_tolerance and abs(a.x2 - b.x2) <= self.box_tolerance \
+            and abs(a.y1 - b.y1) <= self.box_tolerance and abs(a.y2 - b.y2) <= self.box_tolerance
+
+    def changed(self, previous: Sequence[DetectionRecord], detections: Sequence[DetectionRecord]) -> bool:
+        """Check if the detections differ from the previous ones, whatever their order"""
+        if len(previous) != len(detections):
+            return True
+        unmatched = list(previous)
+        for detection in detections:
+            for i, candidate in enumerate(unmatched):
+                if self.same_detection(candidate, detection):
+                    del unmatched[i]
+                    break
+            else:
+                return True
+        return False
+
+    def should_publish(self, topic: str, now: float, detections: Sequence[DetectionRecord]) -> bool:
+        """Check if the detections seen at ``now`` (s) must be published, the decision is recorded"""
+        last = self._last.get(topic)
+        if last is not None:
+            elapsed = now - last[0]
+            # a clock going backwards (replayed session) starts over
+            if elapsed >= 0:
+                rate = self.rates.get(topic, self.max_rate)
+                if rate > 0 and elapsed < 1. / rate:
+                    self.rate_limited += 1
+                    return False
+                keyframe = self.keyframe_interval > 0 and elapsed >= self.keyframe_interval
+                if not keyframe and not self.changed(last[1], detections):
+                    self.suppressed += 1
+                    return False
+        self._last[topic] = (now, tuple(detections))
+        self.published += 1
+        return True
+
+    def reset(self) -> None:
+        """Publish the next frame of every topic"""
+        self._last.clear()
 
 class MqttClient(mqtt.Client):
     """Custom mqtt.Client class
@@ -18,40 +117,116 @@ class MqttClient(mqtt.Client):
         _cam_topic     (str): mqtt topic where camera results will be published (positions, classifications ..)
         _niryo_topic   (str): mqtt topic where niryo results will be published (last moves, positions ..)
         _verbose      (bool): print or not published results
+        _payload_format (str): format of the frame messages, "binary" or "json"
+        frame_topic    (str): mqtt topic where the detections of each frame are published
+        policy (:obj:`PublishPolicy`): frames published on ``frame_topic``, None publishes every frame
+        outbound (:obj:`OutboundQueue`): messages waiting to be sent to the broker
+        commands (:obj:`CommandDispatcher`): handlers of the commands received on ``command_topic``
         niryo_last_msg (str): last message sent in niryo topic
         cam_last_msg   (str): last message sent in camera topic
     """
-    def __init__(self, broker_addr: str, cam_topic: str, niryo_topic: str, broker_port: int, client_name: str=DEFAULT_CLIENT_NAME, verbose: bool=True) -> None:
-        """Initialize an mqtt client for the niryo"""
+    def __init__(self, broker_addr: str, cam_topic: str, niryo_topic: str, broker_port: int, client_name: str=DEFAULT_CLIENT_NAME, verbose: bool=True, payload_format: str=payload.BINARY, policy: PublishPolicy=None,
+        queue_size: int=256, drop_policy: str=DROP_OLDEST, qos: Dict[str, int]=None, default_qos: int=0,
+        reconnect_delay: Tuple[int, int]=(1, 30), keepalive: int=DEFAULT_KEEPALIVE, command_workers: int=1) -> None:
+        """Initialize an mqtt client for the niryo
+
+        The connection is made in the background and retried until the broker answers.
+
+        Arguments:
+            queue_size                   (:obj:`int`, optional): Maximum number of messages waiting to be sent
+            drop_policy                  (:obj:`str`, optional): "drop_oldest" or "drop_newest" when the queue is full
+            qos                         (:obj:`dict`, optional): QoS per topic
+            default_qos                  (:obj:`int`, optional): QoS of the other topics
+            reconnect_delay            (:obj:`tuple`, optional): Minimum and maximum seconds between two connection attempts
+            keepalive                    (:obj:`int`, optional): Seconds between two pings, detects a lost broker
+            command_workers              (:obj:`int`, optional): Threads executing the read-only commands, the
+                                                                 others are executed one at a time in arrival order
+        """
         super().__init__(client_name)
+        if payload_format not in payload.FORMATS:
+            raise ValueError("Unknown payload format {}, expected one of {}".format(payload_format, payload.FORMATS))
         self._cam_topic = cam_topic
         self._niryo_topic = niryo_topic
         self._verbose = verbose
+        self._payload_format = payload_format
+        self.policy = policy
+        self._connected = threading.Event()
+        self.outbound = OutboundQueue(self.__send, self._connected, queue_size, drop_policy, qos, default_qos)
+        self.outbound.start()
+        self.commands = CommandDispatcher(self.__reply, command_workers)
         print("[MQTT] Verbose {}".format(self._verbose))
         print("[MQTT] Connecting to broker {} with port {} ..".format(broker_addr, broker_port))
+        self.reconnect_delay_set(*reconnect_delay)
         try:
-            self.connect(broker_addr, broker_port, keepalive=0, bind_address="")    
+            self.connect_async(broker_addr, broker_port, keepalive=keepalive, bind_address="")
             self.loop_start()
-            print("[MQTT] Done")
-            print("[MQTT] Subscribing to topics {} and {} ..".format(self._cam_topic, self._niryo_topic))
-            self.subscribe(cam_topic)
-            self.subscribe(niryo_topic)
-            print("[MQTT] Done")
         except:
-            print("[MQTT] Unable to connect to broker {} at port {}".format(broker_addr, broker_port))
-        
+            print("[MQTT] Unable to connect to broker {} at port {}".format(broker_addr, broker_port))
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def on_connect(self, client, userdata, flags, rc):
+        """on_connect callback, topics are subscribed again after every reconnection"""
+        if rc != mqtt.CONNACK_ACCEPTED:
+            print("[MQTT] Connection refused : {}".format(mqtt.connack_string(rc)))
+            return
+        print("[MQTT] Connected, subscribing to topics {}, {} and {}".format(self._cam_topic, self._niryo_topic, self.command_topic))
+        self.subscribe(self._cam_topic)
+        self.subscribe(self._niryo_topic)
+        self.subscribe(self.command_topic)
+        self._connected.set()
+
+    def on_disconnect(self, client, userdata, rc):
+        self._connected.clear()
+        if rc != mqtt.MQTT_ERR_SUCCESS:
+            print("[MQTT] Connection lost, reconnecting ..")
+
+    def __send(self, message: OutboundMessage) -> bool:
+        """Hand a message to paho, called by the outbound queue thread"""
+        info = super().publish(message.topic, message.payload, message.qos, message.retain)
+        return info.rc == mqtt.MQTT_ERR_SUCCESS
+
     def on_message(self, client, userdata, message: str):
-        """on_message callback for the mqtt client """
+        """on_message callback for the mqtt client, runs on the paho network thread"""
+        if message.topic == self.command_topic:
+            self.commands.submit(message.payload)
+            return
         msg = str(message.payload.decode("utf-8"))
         if self._verbose:
             print("[MQTT] MSG [ {} ] FROM TOPIC [ {} ] QOS {} FLAG {}".format(msg, message.topic, message.qos, message.retain))
         self.__filter_msg(msg, message.topic)
 
-    def publish(self, topic: str, msg: str) -> None:
-        """Publish a message on a desired subscribed topic"""
+    def __reply(self, reply: dict) -> None:
+        self.publish(self.reply_topic, json.dumps(reply, default=str))
+
+    def publish(self, topic: str, msg, retain: bool=False) -> bool:
+        """Queue a message for a desired subscribed topic, False if it was dropped"""
         if self._verbose:
             print("[MQTT] Message {} published to broker".format(msg))
-        #self.publish(topic, msg)
+        return self.outbound.put(topic, msg, retain)
+
+    def publish_frame(self, seq: int, timestamp: float, detections: Sequence[DetectionRecord], labels: List[str]=()) -> bool:
+        """Publish every detection of a frame in one message on ``frame_topic``
+
+        The frame is skipped when the ``policy`` rejects it.
+
+        Arguments:
+            seq                     (int): Sequence number of the frame
+            timestamp             (float): Capture time of the frame (s)
+            detections             (list): :obj:`DetectionRecord` of the frame, or an array of ``DETECTION_DTYPE``
+            labels (:obj:`list`, optional): Label names, only sent in the JSON format
+
+        Returns:
+            bool: False if the frame was not published
+        """
+        if self.policy is not None and not self.policy.should_publish(self.frame_topic, timestamp, payload.as_records(detections)):
+            return False
+        message = payload.encode(seq, timestamp, detections, labels, self._payload_format)
+        if self._verbose:
+            print("[MQTT] Frame {} : {} detections ({} bytes) published to broker".format(seq, len(detections), len(message)))
+        return self.outbound.put(self.frame_topic, message)
     
     def __filter_msg(self, msg, topic):
         if topic == self._cam_topic:
@@ -63,6 +238,22 @@ class MqttClient(mqtt.Client):
     def client(self):
         return self
 
+    @property
+    def frame_topic(self):
+        return self._cam_topic + "/frame"
+
+    @property
+    def command_topic(self):
+        return self._niryo_topic + "/cmd"
+
+    @property
+    def reply_topic(self):
+        return self._niryo_topic + "/reply"
+
+    @property
+    def payload_format(self):
+        return self._payload_format
+
     @property
     def cam_topic(self):
         return self._cam_topic
@@ -95,7 +286,11 @@ class MqttClient(mqtt.Client):
     def cam_last_msg(self, value):
         self._cam_last_msg = value
     
-    def quit(self):
+    def quit(self, timeout: float=1.):
+        """Send the queued messages for at most ``timeout`` seconds and disconnect"""
+        self.commands.shutdown(wait=False)
+        self.outbound.stop(timeout)
+        print("[MQTT] {} messages queued, {} sent, {} dropped".format(self.outbound.enqueued, self.outbound.sent, self.outbound.dropped))
         self.disconnect()
         self.loop_stop()
         print("[MQTT] Disconnected")
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""MQTT command channel
+
+This module demonstrates remote control of the cell over mqtt. Commands are JSON objects
+published on ``<niryo_topic>/cmd`` :
+
+    {"command": "move", "id": 12, "axis": "x", "value": 0.05}
+
+The name selects a handler of the registry, the other fields are its keyword arguments
+(``id`` is only echoed in the reply). The paho network thread only parses the message to pick
+its worker : robot I/O and the reply on ``<niryo_topic>/reply`` happen on the workers, so a slow
+robot never delays the mqtt keepalive or the other messages.
+
+The commands are executed one at a time, in the order they arrived : a ``stand_by`` sent after a
+``move`` runs after it. Handlers registered as read-only (they do not drive the cell) can run
+concurrently on their own workers, when the dispatcher is created with more than one.
+"""
+
+import inspect, json, threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict
+
+class CommandError(Exception):
+    """Error of a command, sent back in the reply"""
+    pass
+
+class CommandDispatcher(object):
+    """Registry of command handlers executed in arrival order
+
+    Attributes:
+        handlers  (dict): Handler of each command name
+        read_only  (set): Names of the commands that may run concurrently
+        received   (int): Commands received
+        executed   (int): Commands executed successfully
+        failed     (int): Commands rejected (invalid message, unknown command, invalid arguments) or raising an error
+    """
+    def __init__(self, reply: Callable[[Dict], Any]=None, workers: int=1) -> None:
+        """Create the dispatcher
+
+        Arguments:
+            reply (:obj:`callable`, optional): Called with the reply of each command, from a worker
+            workers    (:obj:`int`, optional): Workers of the read-only commands, they run with the
+                                               other commands on the single worker when 1
+        """
+        self.handlers = {}
+        self.read_only = set()
+        self.received = 0
+        self.executed = 0
+        self.failed = 0
+        self._reply = reply
+        self._signatures = {}
+        self._lock = threading.Lock()
+        self._serial = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mqtt-command")
+        self._concurrent = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mqtt-query") if workers > 1 else None
+
+    def register(self, name: str, handler: Callable=None, read_only: bool=False):
+        """Register the handler of a command, can be used as a decorator
+
+        Arguments:
+            read_only (:obj:`bool`, optional): The handler does not drive the cell, it may run
+                                               concurrently with the other commands
+        """
+        if handler is None:
+            return lambda function: self.register(name, function, read_only)
+        self.handlers[name] = handler
+        self._signatures[name] = inspect.signature(handler)
+        if read_only:
+            self.read_only.add(name)
+        else:
+            self.read_only.discard(name)
+        return handler
+
+    def unregister(self, name: str) -> None:
+        self.handlers.pop(name, None)
+        self._signatures.pop(name, None)
+        self.read_only.discard(name)
+
+    def submit(self, payload: bytes) -> Future:
+        """Queue a raw command for the workers, never blocks (called from the network thread)"""
+        with self._lock:
+            self.received += 1
+        command = self.__parse(payload)
+        pool = self._concurrent if self._concurrent is not None and command[0] in self.read_only else self._serial
+        return pool.submit(self.__run, *command)
+
+    def execute(self, payload: bytes) -> Dict:
+        """Parse and run a command in the calling thread, return (and send) its reply"""
+        return self.__run(*self.__parse(payload))
+
+    def __parse(self, payload: bytes) -> tuple:
+        """Name, id and arguments of a command, or the error that rejects it"""
+        command_id, name = None, None
+        try:
+            try:
+                message = json.loads(payload)
+            except ValueError as e:
+                raise CommandError("Invalid JSON : {}".format(e))
+            if not isinstance(message, dict) or not isinstance(message.get("command"), str):
+                raise CommandError("Expected an object with a \"command\" field")
+            name = message.pop("command")
+            command_id = message.pop("id", None)
+            signature = self._signatures.get(name)
+            if signature is None:
+                raise CommandError("Unknown command {}, expected one of {}".format(name, sorted(self.handlers)))
+            try:
+                signature.bind(**message)
+            except TypeError as e:
+                raise CommandError("Invalid arguments for {} : {}".format(name, e))
+        except CommandError as e:
+            return name, command_id, None, e
+        return name, command_id, message, None
+
+    def __run(self, name: str, command_id, message: Dict, error: Exception=None) -> Dict:
+        try:
+            if error is not None:
+                raise error
+            # the arguments match the signature, any error comes from the handler itself
+            result = self.handlers[name](**message)
+            reply = {"command": name, "id": command_id, "ok": True, "result": result}
+            with self._lock:
+                self.executed += 1
+        except Exception as e:
+            print("[MQTT] Command {} failed : {}".format(name, e))
+            reply = {"command": name, "id": command_id, "ok": False, "error": str(e)}
+            with self._lock:
+                self.failed += 1
+        if self._reply is not None:
+            self._reply(reply)
+        return reply
+
+    def shutdown(self, wait: bool=True) -> None:
+        """Stop the workers once the queued commands are executed"""
+        self._serial.shutdown(wait=wait)
+        if self._concurrent is not None:
+            self._concurrent.shutdown(wait=wait)
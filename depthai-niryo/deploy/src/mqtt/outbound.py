@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""MQTT outbound queue
+
+This module demonstrates a bounded queue between the camera loop and the broker. The camera
+loop only appends messages, a background thread hands them to the mqtt client once it is
+connected. When the broker is slow or unreachable the queue fills up and messages are dropped
+following the configured policy instead of blocking the frames.
+"""
+
+import threading, time
+from collections import deque
+from typing import Callable, Dict, NamedTuple
+
+DROP_OLDEST, DROP_NEWEST = "drop_oldest", "drop_newest"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+class OutboundMessage(NamedTuple):
+    topic: str
+    payload: bytes
+    qos: int
+    retain: bool
+
+class OutboundQueue(threading.Thread):
+    """Thread sending the queued messages
+
+    Attributes:
+        capacity      (int): Maximum number of messages waiting to be sent
+        drop_policy   (str): "drop_oldest" makes room for the new message, "drop_newest" rejects it
+        qos          (dict): QoS of specific topics
+        default_qos   (int): QoS of the other topics
+        enqueued      (int): Messages accepted in the queue
+        sent          (int): Messages handed to the mqtt client
+        dropped       (int): Messages lost (queue full, or still queued when stopped)
+        closed       (bool): True once ``stop`` was called
+    """
+    def __init__(self, send: Callable[[OutboundMessage], bool], connected: threading.Event, capacity: int=256,
+        drop_policy: str=DROP_OLDEST, qos: Dict[str, int]=None, default_qos: int=0, retry_period: float=0.1) -> None:
+        """Create the queue, ``start`` runs the sender
+
+        Arguments:
+            send                            (callable): Send a message, return False if it must be retried
+            connected            (:obj:`threading.Event`): Set while the client is connected to the broker
+            capacity                (:obj:`int`, optional): Maximum number of queued messages
+            drop_policy             (:obj:`str`, optional): "drop_oldest" or "drop_newest"
+            qos                    (:obj:`dict`, optional): QoS per topic
+            default_qos             (:obj:`int`, optional): QoS of the topics missing in ``qos``
+            retry_period          (:obj:`float`, optional): Seconds between two checks of the connection
+        """
+        super().__init__(name="mqtt-outbound", daemon=True)
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError("Unknown drop policy {}, expected one of {}".format(drop_policy, DROP_POLICIES))
+        self.capacity = capacity
+        self.drop_policy = drop_policy
+        self.qos = dict(qos or {})
+        self.default_qos = default_qos
+        self.retry_period = retry_period
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        self._send = send
+        self._connected = connected
+        self._messages = deque()
+        self._condition = threading.Condition()
+        self._deadline = None
+
+    def put(self, topic: str, payload: bytes, retain: bool=False) -> bool:
+        """Queue a message without blocking
+
+        Returns:
+            bool: False if the message was dropped
+        """
+        message = OutboundMessage(topic, payload, self.qos.get(topic, self.default_qos), retain)
+        with self._condition:
+            if self.closed:
+                self.dropped += 1
+                return False
+            if len(self._messages) >= self.capacity:
+                self.dropped += 1
+                if self.drop_policy == DROP_NEWEST:
+                    return False
+                self._messages.popleft()
+            self._messages.append(message)
+            self.enqueued += 1
+            self._condition.notify()
+        return True
+
+    def __expired(self) -> bool:
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def __next(self):
+        """Wait for a message, None once stopped"""
+        with self._condition:
+            while not self._messages and not self.closed:
+                self._condition.wait()
+            if not self._messages or self.__expired():
+                return None
+            return self._messages.popleft()
+
+    def run(self) -> None:
+        while True:
+            message = self.__next()
+            if message is None:
+                break
+            sent = False
+            while not self.__expired():
+                if self._connected.wait(self.retry_period):
+                    if self._send(message):
+                        sent = True
+                        break
+                    # refused by the client (connection lost in between), retry shortly
+                    time.sleep(self.retry_period)
+            with self._condition:
+                if sent:
+                    self.sent += 1
+                else:
+                    self.dropped += 1
+        with self._condition:
+            self.dropped += len(self._messages)
+            self._messages.clear()
+
+    def stop(self, timeout: float=1.) -> None:
+        """Send what is queued for at most ``timeout`` seconds, then drop the rest"""
+        with self._condition:
+            self.closed = True
+            self._deadline = time.monotonic() + timeout
+            self._condition.notify_all()
+        if self.is_alive():
+            self.join(timeout + self.retry_period + 1.)
+
+    def __len__(self) -> int:
+        return len(self._messages)
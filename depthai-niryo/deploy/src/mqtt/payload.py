@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""MQTT payloads
+
+This module encodes the detections of one frame in a single MQTT message.
+
+The binary format (little endian, version 1) is a header followed by one fixed-size record per detection:
+
+    header    : version (uint8), flags (uint8), seq (uint32), timestamp (float64 seconds), count (uint16)
+    detection : label (uint16), confidence (float32), x1, x2, y1, y2 (int16 pixels), x, y, z (float32 mm)
+
+The JSON format carries the same fields plus the label names, it is meant for debugging
+with any mqtt client (``mosquitto_sub``). Both formats are told apart by their first byte.
+"""
+
+import json, struct
+import numpy as np
+from typing import Dict, List, NamedTuple, Sequence
+
+PAYLOAD_VERSION = 1
+BINARY, JSON = "binary", "json"
+FORMATS = (BINARY, JSON)
+
+HEADER = struct.Struct("<BBIdH")
+DETECTION = struct.Struct("<Hf4h3f")
+# same layout as DETECTION, an array of this dtype is a ready to send sequence of records
+DETECTION_DTYPE = np.dtype([("label", "<u2"), ("confidence", "<f4"), ("x1", "<i2"), ("x2", "<i2"),
+    ("y1", "<i2"), ("y2", "<i2"), ("x", "<f4"), ("y", "<f4"), ("z", "<f4")])
+assert DETECTION_DTYPE.itemsize == DETECTION.size
+
+class DetectionRecord(NamedTuple):
+    """Detection as published on mqtt
+
+    Attributes:
+        label          (int): Index of the label in the model config
+        confidence   (float): Confidence of the network, between 0 and 1
+        x1, x2, y1, y2 (int): Bounding box in pixels of the rgb frame
+        x, y, z      (float): Position in the camera base (mm)
+    """
+    label: int
+    confidence: float
+    x1: int
+    x2: int
+    y1: int
+    y2: int
+    x: float
+    y: float
+    z: float
+
+def encode_binary(seq: int, timestamp: float, detections: Sequence[DetectionRecord]) -> bytes:
+    """Pack a frame in the binary format, with a single allocation
+
+    ``detections`` may also be an array of ``DETECTION_DTYPE``, its buffer is copied as is.
+    """
+    if isinstance(detections, np.ndarray):
+        return HEADER.pack(PAYLOAD_VERSION, 0, seq & 0xFFFFFFFF, timestamp, len(detections)) \
+            + detections.astype(DETECTION_DTYPE, copy=False).tobytes()
+    payload = bytearray(HEADER.size + DETECTION.size * len(detections))
+    HEADER.pack_into(payload, 0, PAYLOAD_VERSION, 0, seq & 0xFFFFFFFF, timestamp, len(detections))
+    offset = HEADER.size
+    for detection in detections:
+        DETECTION.pack_into(payload, offset, *detection)
+        offset += DETECTION.size
+    return bytes(payload)
+
+def as_records(detections: Sequence[DetectionRecord]) -> Sequence[DetectionRecord]:
+    """:obj:`DetectionRecord` of an array of ``DETECTION_DTYPE``, other sequences are returned as is"""
+    if isinstance(detections, np.ndarray):
+        return [DetectionRecord._make(detection) for detection in detections.tolist()]
+    return detections
+
+def encode_json(seq: int, timestamp: float, detections: Sequence[DetectionRecord], labels: List[str]=()) -> bytes:
+    """Frame in the JSON format, label names are resolved with ``labels``"""
+    detections = as_records(detections)
+    return json.dumps({
+        "version": PAYLOAD_VERSION,
+        "seq": seq,
+        "timestamp": timestamp,
+        "detections": [dict(detection._asdict(),
+            name=labels[detection.label] if detection.label < len(labels) else str(detection.label))
+            for detection in detections]
+    }, separators=(",", ":")).encode()
+
+def encode(seq: int, timestamp: float, detections: Sequence[DetectionRecord], labels: List[str]=(), payload_format: str=BINARY) -> bytes:
+    if payload_format == JSON:
+        return encode_json(seq, timestamp, detections, labels)
+    return encode_binary(seq, timestamp, detections)
+
+def decode(payload: bytes) -> Dict:
+    """Read a payload of any format
+
+    Returns:
+        dict: version, seq, timestamp and the list of :obj:`DetectionRecord` in ``detections``
+
+    Raises:
+        ValueError: Unknown version or truncated payload
+    """
+    if payload[:1] == b"{":
+        document = json.loads(payload)
+        fields = DetectionRecord._fields
+        document["detections"] = [DetectionRecord(*(d[f] for f in fields)) for d in document["detections"]]
+        return document
+    if len(payload) < HEADER.size:
+        raise ValueError("Truncated payload of {} bytes".format(len(payload)))
+    version, _, seq, timestamp, count = HEADER.unpack_from(payload)
+    if version != PAYLOAD_VERSION:
+        raise ValueError("Unknown payload version {}".format(version))
+    if len(payload) != HEADER.size + count * DETECTION.size:
+        raise ValueError("Payload of {} bytes for {} detections".format(len(payload), count))
+    detections = [DetectionRecord._make(values) for values in DETECTION.iter_unpack(payload[HEADER.size:])]
+    return {"version": version, "seq": seq, "timestamp": timestamp, "detections": detections}
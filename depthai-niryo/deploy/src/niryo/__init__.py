@@ -1,2 +1,2 @@
 from .niryo import Niryo
-
+from .motion import Motion
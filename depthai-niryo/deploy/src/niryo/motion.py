@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Motion composition
+
+This module demonstrates how several moves of the Niryo are gathered into a single one.
+Every SHIFT_POSE is a blocking motion with its own planning time, a step of the grabing
+sequence shifting two or three axis is sent as one MOVE_POSE on the absolute target
+computed locally from the pose cache. The pose lock of the Niryo is held from the read of
+the cache to the answer of the move, no move of another thread can make the target stale.
+"""
+
+from typing import List, Tuple
+from niryo_one_tcp_client import RobotAxis, PoseObject
+
+class Motion(object):
+    """Shifts and absolute values gathered for one move of the Niryo
+
+    Example:
+        >>> with niryo.compose() as motion:
+        ...     motion.shift(RobotAxis.X, 0.1).shift(RobotAxis.Y, -0.05)
+        ...     motion.set(RobotAxis.PITCH, 1.5)
+
+    The move is sent when leaving the block (not if an exception was raised) or with :meth:`execute`.
+
+    Attributes:
+        status (bool): Status of the last execution, None before
+        data         : Reason given by the robot when the move failed
+    """
+    def __init__(self, niryo) -> None:
+        self._niryo = niryo
+        self._shifts = [0.] * 6
+        self._absolute = [None] * 6
+        self.status = None
+        self.data = None
+
+    def shift(self, axis: RobotAxis, value: float) -> "Motion":
+        """Add a relative move on an axis, in meters or radians"""
+        if self._absolute[axis.value] is not None:
+            self._absolute[axis.value] += value
+        else:
+            self._shifts[axis.value] += value
+        return self
+
+    def set(self, axis: RobotAxis, value: float) -> "Motion":
+        """Set the absolute value of an axis, previous shifts on this axis are discarded"""
+        self._absolute[axis.value] = value
+        self._shifts[axis.value] = 0.
+        return self
+
+    @property
+    def empty(self) -> bool:
+        """bool: True if nothing has to be sent"""
+        return all(shift == 0. for shift in self._shifts) and all(value is None for value in self._absolute)
+
+    def target(self, pose: PoseObject) -> List[float]:
+        """Absolute pose reached from ``pose``"""
+        return [shift + start if absolute is None else absolute
+            for start, shift, absolute in zip(pose.to_list(), self._shifts, self._absolute)]
+
+    def clear(self) -> None:
+        self._shifts = [0.] * 6
+        self._absolute = [None] * 6
+
+    def execute(self) -> Tuple[bool, str]:
+        """Send the composed move as a single MOVE_POSE
+
+        Returns:
+            status, data as answered by the robot, (True, None) if there is nothing to send
+        """
+        if self.empty:
+            self.status, self.data = True, None
+            return self.status, self.data
+        with self._niryo.pose_lock:
+            pose = self._niryo.position
+            if not isinstance(pose, PoseObject):
+                self.status, self.data = False, "Unknown pose of the robot"
+            else:
+                self.status, self.data = self._niryo.move_pose(*self.target(pose))
+        self.clear()
+        if self.status is False:
+            print("Error: " + str(self.data))
+        return self.status, self.data
+
+    def __enter__(self) -> "Motion":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.execute()
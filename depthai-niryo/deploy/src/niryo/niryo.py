@@ -7,8 +7,9 @@ incrementing axis, rotating.
 """
 
 from niryo_one_tcp_client import *
-import math, time
+import math, threading, time
 from typing import Dict, Tuple
+from .motion import Motion
 
 # medium gripper
 CONFIG_TOOL_2 = {
@@ -41,14 +42,27 @@ class Niryo(NiryoOneClient):
         y_offset_cam      (:obj:`float`, optional): Offset in y between the depthai camera and the robot's end effector, in meter (useful to precisely calcul object relative position from the Niryo)    
         _do_roi_counter   (int): Counter for the grabing sequence
         stand_by        (Tuple): Stand by position before starting the grabing sequence
+        _pose_cache (PoseObject): Last known pose, None when it has to be asked to the robot
+        pose_lock      (RLock): Held from the read of the pose cache, through the command, to the write of its result
+
+    Note:
+        The pose is cached on the client : commanded moves (MOVE_POSE, SHIFT_POSE) update it with
+        their target once the robot answered OK. Failures, exceptions (timeouts, lost connection) and
+        moves we can't predict (joints, vision, learning mode, joystick) invalidate it so the next
+        read sends a GET_POSE. Use :meth:`refresh` when the real pose is needed.
+
+        The robot executor, the mqtt commands and the api share the same client : a move computed
+        from the cache (shift, composed motion) holds ``pose_lock`` until its result is cached, so
+        a move from another thread can't run in between.
     """
 
     def __init__(self, 
         ip: str="localhost", 
         grip: RobotTool=RobotTool.GRIPPER_3, 
         arm_velocity: int=30, 
+        port: int=40001,
       ) -> None:
-        super(Niryo, self).__init__()
+        super(Niryo, self).__init__(port=port)
         """Initialize the Niryo state
 
         Niryo will sequentialy set 
@@ -61,9 +75,14 @@ class Niryo(NiryoOneClient):
             ip                     (:str:`str`, optional): Ip address of the niryo server 
             grip       (:RobotTool:`RobotTool`, optional): Selected grip to use with the Niryo
             arm_velocity           (:int:`int`, optional): Arm velocity in %
+            port                   (:int:`int`, optional): Port of the niryo tcp server
       """
         self._is_quit = False
         self.grip = grip
+        self._pose_cache = None
+        self.pose_lock = threading.RLock()
+        self._manual_mode = False
+        self._conveyors = set()
 
         if grip == RobotTool.GRIPPER_2:
             self.config = CONFIG_TOOL_2
@@ -76,11 +95,7 @@ class Niryo(NiryoOneClient):
         self.set_arm_max_velocity(arm_velocity)
         self.change_tool(self.grip)
         self._do_roi_counter = 1
-        status, data = self.get_pose()
-        if status is True:
-            self.initial_pose = data
-        else:
-            print("[NIRYO] Error: " + data)
+        self.initial_pose = self.refresh()
 
         self._stand_by = (0.10, 0.0, 0.4, 0., 1.2, 0.0)
         self.position = self.stand_by
@@ -103,22 +118,111 @@ class Niryo(NiryoOneClient):
 
     @property
     def position(self) -> Tuple:
-        """Tuple: Get the current position of the Niryo Robot (6 axis)"""
-        status, data = self.get_pose()
-        if status is True:
-            return data
-        else:
-            return "Error"
+        """Tuple: Get the current position of the Niryo Robot (6 axis), from the pose cache when it is valid"""
+        with self.pose_lock:
+            if self._pose_cache is None or self._manual_mode:
+                self.refresh()
+            if self._pose_cache is not None:
+                return self._pose_cache
+            else:
+                return "Error"
     
     @position.setter
     def position(self, value):
         x, y, z, roll, pitch, yaw = value
-        status, data = self.move_pose(x, y, z, roll, pitch, yaw)
+        with self.pose_lock:
+            status, data = self.move_pose(x, y, z, roll, pitch, yaw)
         if status is False:
             print("Error: " + data)
         else:
             print("[*] Moved successfully")
 
+    @property
+    def pose_cached(self) -> bool:
+        """bool: True if the next read of the position won't send a GET_POSE"""
+        return self._pose_cache is not None and not self._manual_mode
+
+    def refresh(self) -> PoseObject:
+        """Ask the real pose to the robot and update the pose cache
+
+            Returns:
+                The pose of the robot, None if the robot answered an error
+        """
+        status, data = self.get_pose()
+        if status is True:
+            return data
+        print("[NIRYO] Error: " + str(data))
+        return None
+
+    def invalidate_pose(self) -> None:
+        """Forget the cached pose, the next read of the position asks the robot"""
+        with self.pose_lock:
+            self._pose_cache = None
+
+    def __track_pose(self, target, command, *params):
+        """Run a command moving the arm and update the pose cache with its target
+
+            Args:
+                target (PoseObject): Pose reached if the command succeeds, None if it can't be predicted
+                command  (Callable): Method of NiryoOneClient sending the command
+        """
+        with self.pose_lock:
+            # stays invalid if the command raises (timeout, lost connection), the arm may have moved anyway
+            self._pose_cache = None
+            answer = command(*params)
+            if answer[0] is True:
+                self._pose_cache = target
+            return answer
+
+    def get_pose(self):
+        with self.pose_lock:
+            status, data = super().get_pose()
+            self._pose_cache = data if status is True else None
+            return status, data
+
+    def move_pose(self, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot):
+        target = PoseObject(x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot)
+        return self.__track_pose(target, super().move_pose, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot)
+
+    def shift_pose(self, axis, shift_value):
+        with self.pose_lock:
+            target = None
+            if self._pose_cache is not None:
+                # the shift is applied on the pose in the base frame of the robot
+                pose = self._pose_cache.to_list()
+                pose[axis.value] += shift_value
+                target = PoseObject(*pose)
+            return self.__track_pose(target, super().shift_pose, axis, shift_value)
+
+    def move_joints(self, j1, j2, j3, j4, j5, j6):
+        return self.__track_pose(None, super().move_joints, j1, j2, j3, j4, j5, j6)
+
+    def pick_from_pose(self, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot):
+        return self.__track_pose(None, super().pick_from_pose, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot)
+
+    def place_from_pose(self, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot):
+        return self.__track_pose(None, super().place_from_pose, x_pos, y_pos, z_pos, roll_rot, pitch_rot, yaw_rot)
+
+    def vision_pick(self, workspace, height_offset, shape, color):
+        self.invalidate_pose()
+        return super().vision_pick(workspace, height_offset, shape, color)
+
+    def move_to_object(self, workspace, height_offset, shape, color):
+        self.invalidate_pose()
+        return super().move_to_object(workspace, height_offset, shape, color)
+
+    def calibrate(self, calibrate_mode):
+        return self.__track_pose(None, super().calibrate, calibrate_mode)
+
+    def set_learning_mode(self, enabled):
+        # the arm can be moved by hand, the cache is bypassed until learning mode is disabled
+        self._manual_mode = bool(enabled)
+        return self.__track_pose(None, super().set_learning_mode, enabled)
+
+    def enable_joystick(self, enabled):
+        self._manual_mode = bool(enabled)
+        return self.__track_pose(None, super().enable_joystick, enabled)
+
     @property
     def stand_by(self):
         return self._stand_by
@@ -164,6 +268,36 @@ class Niryo(NiryoOneClient):
             self._is_quit = True
             super().quit()
 
+    def conveyor_speed(self, speed: int, conveyor_id: ConveyorID=ConveyorID.ID_1) -> bool:
+        """Run a conveyor, it is set up the first time it is used
+
+            Args:
+                speed                     (:obj:`int`): Speed in %, negative values run it backward, 0 stops it
+                conveyor_id (:obj:`ConveyorID`, optional): Conveyor to control
+
+            Returns:
+                bool: True if the robot accepted the command
+        """
+        if conveyor_id not in self._conveyors:
+            status, data = self.set_conveyor(conveyor_id, True)
+            if not status:
+                print("[NIRYO] Unable to set conveyor {} : {}".format(conveyor_id.name, data))
+                return False
+            self._conveyors.add(conveyor_id)
+        direction = ConveyorDirection.FORWARD if speed >= 0 else ConveyorDirection.BACKWARD
+        status, data = self.control_conveyor(conveyor_id, speed != 0, abs(int(speed)), direction)
+        if not status:
+            print("[NIRYO] Unable to control conveyor {} : {}".format(conveyor_id.name, data))
+        return status
+
+    def compose(self) -> Motion:
+        """Gather several shifts into a single MOVE_POSE
+
+            Returns:
+                A :obj:`Motion` sent when leaving the ``with`` block
+        """
+        return Motion(self)
+
     def increment_pos_x(self, value: float=0.10):
         """Increment axis x by float value
 
@@ -318,15 +452,12 @@ class Niryo(NiryoOneClient):
             # we substract the offset cam so that the cam can see in center the objects
             x = x - self.x_offset_cam
             y = x_ia
-            if x != None:
-                print(f"X object calculted {x} Y calculated object calculated {y}")
-                self.increment_pos_x(x)
-                self.increment_pos_y(y)
-            # now we turn the head (roll) and we again move until we reach satisfaying position
-            pos = self.position.to_list()
-            # x y z roll pitch yaw
-            pos[4] = 1.5
-            self.position = tuple(pos)
+            with self.compose() as motion:
+                if x != None:
+                    print(f"X object calculted {x} Y calculated object calculated {y}")
+                    motion.shift(RobotAxis.X, x).shift(RobotAxis.Y, y)
+                # now we turn the head (roll) and we again move until we reach satisfaying position
+                motion.set(RobotAxis.PITCH, 1.5)
             print("[NIRYO] Head turned to the ground")
             return True
         else:
@@ -387,8 +518,8 @@ class Niryo(NiryoOneClient):
             else:
                 # do both
                 print("[NIRYO] Moving both\n")
-                self.increment_pos_x(x_real)
-                self.increment_pos_y(y_real)
+                with self.compose() as motion:
+                    motion.shift(RobotAxis.X, x_real).shift(RobotAxis.Y, y_real)
                 
             self._do_roi_counter+=1
             return False
@@ -412,8 +543,8 @@ class Niryo(NiryoOneClient):
         # We use the shift between niryo z pos and the ground (otherwise we hit the ground with the niryo)
         # normaly we just want to use z provided by car but z niryo is also consistent and the same
         # add the cam x offset 
-        self.increment_pos_x(self.x_offset_cam+0.02)
-        self.increment_pos_y(self.y_offset_cam)
+        with self.compose() as motion:
+            motion.shift(RobotAxis.X, self.x_offset_cam+0.02).shift(RobotAxis.Y, self.y_offset_cam)
         self.set_arm_max_velocity(100)
         print(f"[DO GRAB] offset_cam {self.x_offset_cam} z_real {round(z_real, 3)} z_ia {round(z_ia, 3)} x_i {round(x_ia,2)} y_ia {round(y_ia, 2)} z_niryo {pos[2]} y_niryo {pos[1]} x_niryo {pos[0]}")
         self.open_gripper(self.grip, 1000)
@@ -425,6 +556,43 @@ class Niryo(NiryoOneClient):
         """TODO plonger en z en fonction de la profondeur pas du offset conveyor"""
 
         self.increment_pos_z(z_real)
+        self.seq_leave()
+
+    def camera_to_robot(self, x_ia: float, y_ia: float) -> Tuple[float, float]:
+        """Position in the robot base where the gripper grabs an object seen by the camera
+
+            Only valid with the camera looking down at the conveyor (after :obj:`seq_first_move_to_roi`),
+            the axis x of the camera is the axis y of the robot and the axis y of the camera is -x.
+
+            Args:
+                x_ia (float): x coordonates from the camera base (millimeters)
+                y_ia (float): y coordonates from the camera base (millimeters)
+            Returns:
+                x, y of the gripper in the robot base (meters)
+        """
+        pos = self.position.to_list()
+        return pos[0] - y_ia/1000 + self.x_offset_cam + 0.02, pos[1] + x_ia/1000 + self.y_offset_cam
+
+    def seq_intercept(self, x: float, y: float) -> None:
+        """Move the gripper above (x, y) in one move and dive, instead of the roi loop
+
+            The gripper is left open on the object, :obj:`seq_leave` grabs it.
+
+            Args:
+                x (float): x of the object in the robot base (meters), from :obj:`camera_to_robot`
+                y (float): y of the object in the robot base (meters)
+        """
+        self.set_arm_max_velocity(100)
+        pos = self.position.to_list()
+        z_real = - (pos[2] - self.z_offset_vanilla - self.z_offset_conveyor)
+        print(f"[INTERCEPT] x {round(x, 3)} y {round(y, 3)} z_real {round(z_real, 3)} y_niryo {pos[1]} x_niryo {pos[0]}")
+        self.open_gripper(self.grip, 1000)
+        with self.compose() as motion:
+            motion.set(RobotAxis.X, x).set(RobotAxis.Y, y)
+        self.increment_pos_z(z_real)
+
+    def seq_leave(self) -> None:
+        """Close the gripper on the object and bring it back to the stand by position"""
         self.close_gripper(self.grip, 200)
         self.set_arm_max_velocity(100)
         self.position = self.stand_by
@@ -1 +1,12 @@
 from .object_detection import ObjectDetection
+from .frame_source import Frame, FrameSource, DeviceFrameSource, SyntheticFrameSource, ReplayFrameSource, SessionRecorder
+from .channel import LatestChannel
+from .robot_executor import RobotExecutor, Target
+from .tracker import Tracker
+from .detections import LabelIndex
+from .sync import SequenceSynchronizer
+from .predictor import InterceptPredictor, LatencyEstimator, Intercept
+from .video import VideoStreamer
+from .overlay import OverlayRenderer
+from .model_config import ModelConfig, load_model_config
+from .model_registry import ModelRegistry, ModelEntry
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Latest-wins channel
+
+This module demonstrates a bounded channel between a fast producer (the camera loop) and a
+slow consumer (the robot). The producer never blocks : when the channel is full the oldest
+item is dropped. The consumer always receives the newest item and can ignore items older
+than a given timestamp, so it never acts on stale detections.
+"""
+
+import threading, time
+from collections import deque
+from typing import Any, Optional
+
+class LatestChannel(object):
+    """Bounded channel where the newest item wins
+
+    Items must have a ``timestamp`` attribute when ``get`` is called with ``newer_than``.
+
+    Attributes:
+        capacity   (int): Maximum number of items kept, the oldest is dropped when full
+        put_count  (int): Number of items put in the channel
+        dropped    (int): Number of items dropped without being consumed
+        closed    (bool): True once ``close`` was called, ``get`` returns None
+    """
+    def __init__(self, capacity: int=1) -> None:
+        self.capacity = capacity
+        self.put_count = 0
+        self.dropped = 0
+        self.closed = False
+        self._items = deque(maxlen=capacity)
+        self._condition = threading.Condition()
+
+    def put(self, item: Any) -> None:
+        """Add an item without blocking, drop the oldest one if the channel is full"""
+        with self._condition:
+            if len(self._items) == self.capacity:
+                self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._condition.notify()
+
+    def get(self, timeout: float=None, newer_than: float=None) -> Optional[Any]:
+        """Wait for the newest item and empty the channel
+
+        Arguments:
+            timeout    (:obj:`float`, optional): Maximum wait in seconds, None waits forever
+            newer_than (:obj:`float`, optional): Ignore (and drop) items with an older timestamp
+
+        Returns:
+            The newest item, None on timeout or when the channel is closed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self.closed:
+                if newer_than is not None:
+                    while self._items and self._items[0].timestamp <= newer_than:
+                        self._items.popleft()
+                        self.dropped += 1
+                if self._items:
+                    item = self._items.pop()
+                    self.dropped += len(self._items)
+                    self._items.clear()
+                    return item
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return None
+
+    def clear(self) -> None:
+        with self._condition:
+            self.dropped += len(self._items)
+            self._items.clear()
+
+    def close(self) -> None:
+        """Wake up the consumer, every following ``get`` returns None"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Depth statistics of the detections
+
+This module demonstrates the host-side computation of the depth of the detections from the
+uint16 depth frame (millimeters, aligned on the rgb camera). When the spatial calculation of
+the device fails the detection comes with (0, 0, 0) : the robust depth of its box (median of
+the valid pixels) and a pinhole model give it a fallback position instead of discarding it.
+
+The boxes of the network are normalized on its preview, the center of the 1080p sensor cropped
+to the aspect ratio of the network input (416x416 keeps the 1080 x 1080 middle of the 1920 x 1080
+sensor), while the depth frame is aligned on the whole sensor : the boxes are mapped through
+the crop before reading the depth, and the field of view of the preview is the one of the crop.
+
+Two modes :
+
+    * per box : median, trimmed mean, percentiles and ratio of valid pixels, from one sort of
+      the (subsampled) valid pixels of each box
+    * summed-area table : mean and ratio of valid pixels of any number of boxes with four
+      lookups each, once the tables of the frame are built
+"""
+
+import math
+import cv2
+import numpy as np
+from typing import Tuple
+
+# THE_1080_P resolution of the rgb camera
+RGB_SENSOR_SIZE = (1920, 1080)
+
+DEPTH_STATS_DTYPE = np.dtype([("median", np.float32), ("trimmed_mean", np.float32), ("mean", np.float32),
+    ("valid_ratio", np.float32), ("p_low", np.float32), ("p_high", np.float32)])
+
+def center_crop(size: Tuple[int, int], sensor_size: Tuple[int, int]=RGB_SENSOR_SIZE) -> Tuple[float, float, float, float]:
+    """Normalized x1, y1, x2, y2 of the preview of ``size`` (width, height) in the sensor frame
+
+    The preview keeps its aspect ratio (``setKeepAspectRatio``) : the sensor is cropped around its center.
+    """
+    width, height = size
+    sensor_width, sensor_height = sensor_size
+    scale_x = min(sensor_height * width / height / sensor_width, 1.)
+    scale_y = min(sensor_width * height / width / sensor_height, 1.)
+    return ((1. - scale_x) / 2, (1. - scale_y) / 2, (1. + scale_x) / 2, (1. + scale_y) / 2)
+
+def crop_hfov(hfov: float, crop: Tuple[float, float, float, float]) -> float:
+    """Horizontal field of view (degrees) of a centered crop of a camera of ``hfov``"""
+    return math.degrees(2 * math.atan((crop[2] - crop[0]) * math.tan(math.radians(hfov) / 2)))
+
+def uncrop(boxes: np.ndarray, crop: Tuple[float, float, float, float]) -> np.ndarray:
+    """(N, 4) boxes normalized on a crop, normalized on the whole frame"""
+    x1, y1, x2, y2 = crop
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4) * (x2 - x1, y2 - y1, x2 - x1, y2 - y1) + (x1, y1, x1, y1)
+
+def summed_area_tables(depth: np.ndarray, valid: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Summed-area tables of the valid depth and of the number of valid pixels
+
+    Both have a leading row and column of zeros : the sum of ``[y1:y2, x1:x2]`` is
+    ``t[y2, x2] - t[y1, x2] - t[y2, x1] + t[y1, x1]``.
+    """
+    sums = cv2.integral(depth * valid, sdepth=cv2.CV_64F)
+    counts = cv2.integral(valid.view(np.uint8), sdepth=cv2.CV_32S)
+    return sums, counts
+
+def box_sums(table: np.ndarray, rois: np.ndarray) -> np.ndarray:
+    """Sums of a summed-area table over (N, 4) rois x1, y1, x2, y2 in pixels"""
+    x1, y1, x2, y2 = rois.T
+    return table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1]
+
+class DepthRoiStats(object):
+    """Robust depth of bounding boxes
+
+    Attributes:
+        depth_range     (tuple): Valid depth (mm), pixels out of the range are ignored (0 is no depth)
+        scale           (float): Part of the box used, around its center (``setBoundingBoxScaleFactor``)
+        trim            (float): Part of the pixels removed on each side for the trimmed mean
+        percentiles     (tuple): Low and high percentiles
+        min_valid_ratio (float): Minimum part of valid pixels for a depth to be trusted
+        stride            (int): Subsampling of the boxes in the per box mode
+        sat_threshold     (int): Number of boxes from which the summed-area tables are used
+        hfov            (float): Horizontal field of view of the rgb sensor (degrees)
+        crop            (tuple): Normalized x1, y1, x2, y2 of the frame of the boxes in the depth frame, see :obj:`center_crop`
+    """
+    def __init__(self, depth_range: Tuple[int, int]=(100, 10000), scale: float=0.5, trim: float=0.1,
+        percentiles: Tuple[float, float]=(10., 90.), min_valid_ratio: float=0.1, stride: int=2,
+        sat_threshold: int=20, hfov: float=68.8, crop: Tuple[float, float, float, float]=(0., 0., 1., 1.)) -> None:
+        self.depth_range = depth_range
+        self.scale = scale
+        self.trim = trim
+        self.percentiles = percentiles
+        self.min_valid_ratio = min_valid_ratio
+        self.stride = stride
+        self.sat_threshold = sat_threshold
+        self.hfov = hfov
+        self.crop = crop
+
+    def rois(self, boxes: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+        """Pixels x1, y1, x2, y2 of normalized boxes in a frame of ``shape``, at least one pixel wide"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        height, width = shape[:2]
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        halves = (boxes[:, 2:] - boxes[:, :2]) * self.scale / 2
+        size = np.array((width, height), dtype=np.float64)
+        top_left = np.floor((centers - halves) * size)
+        bottom_right = np.ceil((centers + halves) * size)
+        top_left = np.clip(top_left, 0, size - 1)
+        bottom_right = np.clip(np.maximum(bottom_right, top_left + 1), 1, size)
+        return np.concatenate([top_left, bottom_right], axis=1).astype(np.int64)
+
+    def __valid(self, depth: np.ndarray) -> np.ndarray:
+        low, high = self.depth_range
+        return (depth >= max(low, 1)) & (depth <= high)
+
+    def __box_stats(self, depth: np.ndarray, roi: np.ndarray) -> tuple:
+        """Statistics of one box, in the order of ``DEPTH_STATS_DTYPE``"""
+        x1, y1, x2, y2 = roi
+        pixels = depth[y1:y2:self.stride, x1:x2:self.stride]
+        values = np.sort(pixels[self.__valid(pixels)], axis=None).astype(np.float64)
+        n = len(values)
+        if n == 0:
+            return (np.nan, np.nan, np.nan, 0., np.nan, np.nan)
+        # linear interpolation between the closest ranks, as np.percentile
+        ranks = np.array((self.percentiles[0], 50., self.percentiles[1])) / 100. * (n - 1)
+        below = ranks.astype(np.int64)
+        above = np.minimum(below + 1, n - 1)
+        p_low, median, p_high = (values[below] + (ranks - below) * (values[above] - values[below])).tolist()
+        k = int(self.trim * n)
+        trimmed_mean = values[k:n - k].mean() if n - 2 * k > 0 else median
+        return (median, trimmed_mean, values.mean(), n / pixels.size, p_low, p_high)
+
+    def compute(self, depth: np.ndarray, boxes: np.ndarray, summed_area: bool=None) -> np.ndarray:
+        """Depth statistics of normalized boxes
+
+        Arguments:
+            depth         (:obj:`numpy.ndarray`): uint16 depth frame (mm)
+            boxes         (:obj:`numpy.ndarray`): (N, 4) boxes xmin, ymin, xmax, ymax normalized on the crop
+            summed_area (:obj:`bool`, optional): Use the summed-area tables (only mean and valid ratio),
+                defaults to True from ``sat_threshold`` boxes
+
+        Returns:
+            (N,) array of ``DEPTH_STATS_DTYPE``, NaN where no pixel is valid
+        """
+        rois = self.rois(uncrop(boxes, self.crop), depth.shape)
+        stats = np.full(len(rois), np.nan, dtype=DEPTH_STATS_DTYPE)
+        stats["valid_ratio"] = 0.
+        if summed_area is None:
+            summed_area = len(rois) >= self.sat_threshold
+        if summed_area:
+            sums, counts = summed_area_tables(depth, self.__valid(depth))
+            n = box_sums(counts, rois)
+            areas = np.prod(rois[:, 2:] - rois[:, :2], axis=1)
+            stats["valid_ratio"] = n / areas
+            stats["mean"] = np.divide(box_sums(sums, rois), n, out=np.full(len(n), np.nan), where=n > 0)
+        else:
+            for i, roi in enumerate(rois.tolist()):
+                stats[i] = self.__box_stats(depth, roi)
+        return stats
+
+    def positions(self, depth: np.ndarray, boxes: np.ndarray, aspect: float=1., summed_area: bool=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Fallback spatial coordinates of normalized boxes
+
+        The depth is the median of the box (the mean with the summed-area tables), x and y
+        follow from the center of the box in the sensor frame with a pinhole model.
+
+        Arguments:
+            depth   (:obj:`numpy.ndarray`): uint16 depth frame (mm)
+            boxes   (:obj:`numpy.ndarray`): (N, 4) boxes xmin, ymin, xmax, ymax normalized on the crop
+            aspect               (float): Height / width of the sensor, the whole frame around the crop
+
+        Returns:
+            (N, 3) positions (mm) and the (N,) mask of the trusted ones, the others are zeros
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        stats = self.compute(depth, boxes, summed_area)
+        z = np.where(np.isnan(stats["median"]), stats["mean"], stats["median"]).astype(np.float64)
+        valid = ~np.isnan(z) & (stats["valid_ratio"] >= self.min_valid_ratio)
+        z = np.where(valid, z, 0.)
+        # width of the field of view of the sensor at 1 mm
+        tangent = 2 * math.tan(math.radians(self.hfov) / 2)
+        sensor_boxes = uncrop(boxes, self.crop)
+        centers = (sensor_boxes[:, :2] + sensor_boxes[:, 2:]) / 2
+        x = (centers[:, 0] - 0.5) * tangent * z
+        y = (0.5 - centers[:, 1]) * tangent * aspect * z
+        return np.stack([x, y, z], axis=1), valid
@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+"""Frame sources
+
+This module demonstrates the different backends able to feed the object detection loop.
+Every source yields :obj:`Frame` tuples (rgb, depth, detections, timestamp, seq) so the
+host side of the loop can run either from the OAK-D camera, from a synthetic generator
+or from a recorded session, without any hardware attached.
+
+Examples:
+    Run the detection loop on a synthetic conveyor as fast as possible:
+
+        >>> source = SyntheticFrameSource(416, 416, labels=["good", "not_good"], n_frames=1000)
+        >>> od.run(frame_source=source)
+"""
+
+import math, time
+import numpy as np
+import depthai as dai
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from .sync import SequenceSynchronizer, StreamMeter
+from .depth import RGB_SENSOR_SIZE, center_crop, crop_hfov, uncrop
+
+STREAM_DETECTIONS, STREAM_RGB, STREAM_DEPTH = "detections", "rgb", "depth"
+STREAMS = (STREAM_DETECTIONS, STREAM_RGB, STREAM_DEPTH)
+
+class Frame(NamedTuple):
+    """One synchronized output of the camera
+
+    Attributes:
+        rgb        (:obj:`numpy.ndarray`): BGR frame the detections were computed on (can be None)
+        depth      (:obj:`numpy.ndarray`): uint16 depth frame in millimeters (can be None)
+        detections               (list): Spatial detections (depthai SpatialImgDetection like objects)
+        timestamp               (float): Capture time in seconds, in the clock of the source
+        seq                       (int): Sequence number of the frame
+    """
+    rgb: Optional[np.ndarray]
+    depth: Optional[np.ndarray]
+    detections: list
+    timestamp: float
+    seq: int
+
+class SpatialCoordinates(object):
+    """Point in the camera base (millimeters), same fields as ``dai.Point3f``"""
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x: float=0., y: float=0., z: float=0.) -> None:
+        self.x = x
+        self.y = y
+        self.z = z
+
+class SpatialDetection(object):
+    """Host-side detection exposing the same fields as ``dai.SpatialImgDetection``"""
+    __slots__ = ("label", "confidence", "xmin", "ymin", "xmax", "ymax", "spatialCoordinates")
+
+    def __init__(self, label: int, confidence: float, xmin: float, ymin: float, xmax: float, ymax: float, x: float, y: float, z: float) -> None:
+        self.label = label
+        self.confidence = confidence
+        self.xmin = xmin
+        self.ymin = ymin
+        self.xmax = xmax
+        self.ymax = ymax
+        self.spatialCoordinates = SpatialCoordinates(x, y, z)
+
+class SimulatedClock(object):
+    """Injectable clock only moving forward when the source advances it
+
+    It lets a synthetic or recorded session run faster than real time while keeping
+    coherent timestamps for everything reading the clock (executor, predictors ..)
+    """
+    def __init__(self, start: float=0.) -> None:
+        self._now = start
+
+    def __call__(self) -> float:
+        return self._now
+
+    def advance(self, dt: float) -> None:
+        self._now += dt
+
+class FrameSource(object):
+    """Base class of the frame sources
+
+    A source is a context manager: ``open`` is called when entering, ``close`` when leaving.
+    ``read`` returns the next :obj:`Frame` or None when the source is exhausted.
+
+    Attributes:
+        clock    (Callable): Clock used to timestamp the frames (seconds)
+        interactive  (bool): True if the loop may poll an opencv window for key events
+    """
+    interactive = False
+
+    def __init__(self, clock: Callable[[], float]=None) -> None:
+        self.clock = clock if clock is not None else time.monotonic
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def read(self) -> Optional[Frame]:
+        raise NotImplementedError
+
+    def counters(self) -> Dict[str, int]:
+        """Event counters of the source (frames dropped ..), reported by the profiler"""
+        return {}
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+class DeviceFrameSource(FrameSource):
+    """Frames coming from the OAK-D camera through the depthai output queues
+
+    Only the queues of ``streams`` are opened, they must have an XLinkOut in the pipeline
+    (see :obj:`ObjectDetection.require_stream`). The queues are drained by a
+    :obj:`SequenceSynchronizer` : the rgb frame and the detections are matched by sequence
+    number, the depth frame by timestamp, and only the newest complete frame is returned.
+
+    Attributes:
+        pipeline (dai.Pipeline): Configured pipeline uploaded to the device
+        usb2_mode        (bool): Force usb2 otherwise OAK-D crash on the Raspberry Pi
+        streams         (tuple): Streams read from the device, "detections" and optionally "rgb", "depth"
+        synchronizer (:obj:`SequenceSynchronizer`): Messages waiting for the rest of their frame
+        meter    (:obj:`StreamMeter`): Messages and bytes received per stream
+        poll_timeout    (float): Seconds waiting for a message before polling the queues again
+    """
+    interactive = True
+
+    def __init__(self, pipeline, usb2_mode: bool=True, queue_size: int=4, streams: tuple=STREAMS,
+        depth_tolerance: float=0.02, sync_capacity: int=8, poll_timeout: float=0.1) -> None:
+        super().__init__()
+        unknown = set(streams) - set(STREAMS)
+        if unknown or STREAM_DETECTIONS not in streams:
+            raise ValueError("Expected {} and optionally {}, given {}".format(STREAM_DETECTIONS, STREAMS[1:], streams))
+        self.pipeline = pipeline
+        self.usb2_mode = usb2_mode
+        self.queue_size = queue_size
+        self.streams = tuple(name for name in STREAMS if name in streams)
+        self.poll_timeout = poll_timeout
+        self.synchronizer = SequenceSynchronizer([name for name in self.streams if name != STREAM_DEPTH],
+            [STREAM_DEPTH] if STREAM_DEPTH in self.streams else [], depth_tolerance, sync_capacity)
+        self.meter = StreamMeter()
+        self._device = None
+        self._queues = {}
+
+    def open(self) -> None:
+        # Connect to device and start pipeline
+        self._device = dai.Device(self.pipeline, usb2Mode=self.usb2_mode)
+        # Output queues of the streams someone consumes, the others are not even sent by the device
+        self._queues = {name: self._device.getOutputQueue(name=name, maxSize=self.queue_size, blocking=False)
+            for name in self.streams}
+        self.meter.reset()
+
+    def close(self) -> None:
+        if self._device is not None:
+            self._device.close()
+            self._device = None
+            print("[CAM] {} frames synchronized, {} dropped, {} mismatched".format(
+                self.synchronizer.emitted, self.synchronizer.dropped, self.synchronizer.mismatched))
+            for name, rates in self.meter.report().items():
+                print("[CAM] Stream {} : {} messages/s, {:.1f} kB/s".format(name, rates["messages_per_s"], rates["bytes_per_s"] / 1000))
+
+    def read(self) -> Optional[Frame]:
+        while True:
+            self.synchronizer.poll(self._queues, self.meter)
+            synced = self.synchronizer.get()
+            if synced is not None:
+                break
+            # sleep until one of the queues receives a message
+            self._device.getQueueEvent(list(self._queues), timedelta(seconds=self.poll_timeout))
+        # frames are only converted when their stream is consumed, depth frame values are in millimeters
+        rgb = synced[STREAM_RGB].getCvFrame() if STREAM_RGB in synced else None
+        depth = synced[STREAM_DEPTH].getFrame() if STREAM_DEPTH in synced else None
+        return Frame(rgb, depth, synced[STREAM_DETECTIONS].detections, synced["timestamp"], synced["seq"])
+
+    def counters(self) -> Dict[str, int]:
+        counters = self.synchronizer.counters()
+        for name in self.meter.messages:
+            counters["{}_messages".format(name)] = self.meter.messages[name]
+            counters["{}_bytes".format(name)] = self.meter.bytes[name]
+        return counters
+
+class SyntheticFrameSource(FrameSource):
+    """Synthetic conveyor generating objects crossing the field of view
+
+    Objects spawn on one side of the frame, cross it at a constant speed and leave.
+    Their spatial coordinates are computed with a pinhole model from their depth so that
+    they look like the output of the YoloSpatialDetectionNetwork. As on the device, the rgb
+    frame is the center crop of the sensor at the aspect ratio of the network input and the
+    depth frame covers the whole sensor.
+
+    Attributes:
+        width, height      (int): Size of the rgb frame (the nn input size)
+        labels            (list): Labels of the model, objects pick a random label index
+        n_frames           (int): Number of frames to generate, None for an endless source
+        fps              (float): Frame rate of the simulated camera
+        realtime          (bool): Pace the frames on the clock instead of returning them immediately
+        n_objects          (int): Maximum number of objects visible at the same time
+        speed            (float): Conveyor speed in frame width per second
+        depth_range      (tuple): Min and max depth of the objects (mm)
+        hfov             (float): Horizontal field of view of the sensor (degrees)
+        sensor_size      (tuple): (width, height) of the sensor the rgb frame is cropped from
+        depth_size       (tuple): (width, height) of the depth frame aligned on the sensor, None to skip it
+        with_rgb          (bool): Generate an rgb frame
+        depth_failure_rate (float): Part of the detections coming with (0, 0, 0) as when the spatial
+                                    calculation of the device fails, the depth frame stays right
+        seed               (int): Seed of the random generator, runs are reproducible
+    """
+    def __init__(self, width: int, height: int, labels: List[str]=None,
+        n_frames: int=None, fps: float=30., realtime: bool=False,
+        n_objects: int=3, speed: float=0.15, depth_range: tuple=(300, 450),
+        hfov: float=68.8, sensor_size: tuple=RGB_SENSOR_SIZE, depth_size: tuple=(640, 400), with_rgb: bool=True, depth_failure_rate: float=0.,
+        clock: Callable[[], float]=None, seed: int=0) -> None:
+        if clock is None:
+            clock = time.monotonic if realtime else SimulatedClock()
+        super().__init__(clock)
+        self.width = width
+        self.height = height
+        self.n_labels = max(len(labels), 1) if labels else 1
+        self.n_frames = n_frames
+        self.fps = fps
+        self.realtime = realtime
+        self.n_objects = n_objects
+        self.speed = speed
+        self.depth_range = depth_range
+        self.depth_size = depth_size
+        self.with_rgb = with_rgb
+        self.depth_failure_rate = depth_failure_rate
+        self._crop = center_crop((width, height), sensor_size)
+        self._focal = (width / 2) / math.tan(math.radians(crop_hfov(hfov, self._crop)) / 2)
+        self._rng = np.random.default_rng(seed)
+        self._objects = []
+        self._seq = 0
+        self._next_deadline = None
+        # frames are allocated once, the loop only reads them
+        self._rgb = np.zeros((height, width, 3), dtype=np.uint8) if with_rgb else None
+        self._depth = np.zeros((depth_size[1], depth_size[0]), dtype=np.uint16) if depth_size else None
+
+    def __spawn(self, cx: float) -> list:
+        # [label, confidence, cx, cy, w, h, z]
+        size = self._rng.uniform(0.12, 0.2)
+        return [int(self._rng.integers(self.n_labels)), float(self._rng.uniform(0.55, 0.95)),
+            cx, float(self._rng.uniform(0.3, 0.7)), size, size, float(self._rng.uniform(*self.depth_range))]
+
+    def __step(self, dt: float) -> None:
+        for obj in self._objects:
+            obj[2] += self.speed * dt
+        self._objects = [obj for obj in self._objects if obj[2] - obj[4] / 2 < 1.]
+        if len(self._objects) < self.n_objects:
+            # keep a gap between two objects on the conveyor
+            if not self._objects or min(obj[2] for obj in self._objects) > 1. / self.n_objects:
+                self._objects.append(self.__spawn(-0.1))
+
+    def __detection(self, obj: list) -> SpatialDetection:
+        label, confidence, cx, cy, w, h, z = obj
+        x = (cx - 0.5) * self.width * z / self._focal
+        y = (0.5 - cy) * self.height * z / self._focal
+        return SpatialDetection(label, confidence, max(cx - w / 2, 0.), max(cy - h / 2, 0.),
+            min(cx + w / 2, 1.), min(cy + h / 2, 1.), x, y, z)
+
+    def __fill_depth(self, detections: list) -> None:
+        depth_w, depth_h = self.depth_size
+        self._depth.fill(int(self.depth_range[1] + 150))
+        for detection in detections:
+            # boxes of the rgb frame, in the part of the sensor it was cropped from
+            xmin, ymin, xmax, ymax = uncrop((detection.xmin, detection.ymin, detection.xmax, detection.ymax), self._crop)[0]
+            x1, x2 = int(xmin * depth_w), int(xmax * depth_w)
+            y1, y2 = int(ymin * depth_h), int(ymax * depth_h)
+            self._depth[y1:y2, x1:x2] = int(detection.spatialCoordinates.z)
+
+    def read(self) -> Optional[Frame]:
+        if self.n_frames is not None and self._seq >= self.n_frames:
+            return None
+        dt = 1. / self.fps
+        if self.realtime:
+            now = self.clock()
+            if self._next_deadline is None:
+                self._next_deadline = now
+            if self._next_deadline > now:
+                time.sleep(self._next_deadline - now)
+            self._next_deadline += dt
+        elif self._seq > 0 and hasattr(self.clock, "advance"):
+            self.clock.advance(dt)
+        if self._seq == 0:
+            # start with a conveyor already populated
+            self._objects = [self.__spawn(cx) for cx in np.linspace(0.15, 0.85, self.n_objects)]
+        else:
+            self.__step(dt)
+
+        detections = [self.__detection(obj) for obj in self._objects]
+        if self._depth is not None:
+            self.__fill_depth(detections)
+        if self.depth_failure_rate > 0:
+            for detection in detections:
+                if self._rng.random() < self.depth_failure_rate:
+                    detection.spatialCoordinates = SpatialCoordinates()
+        frame = Frame(self._rgb, self._depth, detections, self.clock(), self._seq)
+        self._seq += 1
+        return frame
+
+class ReplayFrameSource(FrameSource):
+    """Replay a session recorded with :obj:`SessionRecorder`
+
+    The session is a ``.npz`` archive with the timestamps, the sequence numbers, the
+    detections of every frame and optionally the rgb and depth frames, with the index of the
+    frame each of them belongs to (a frame can come without rgb or depth).
+
+    Attributes:
+        path        (str): Path of the recorded session
+        realtime   (bool): Replay with the recorded timing (scaled by ``speed``), otherwise as fast as possible
+        speed     (float): Replay speed factor when realtime is set
+        loop       (bool): Start again from the first frame when the session ends
+    """
+    def __init__(self, path: str, realtime: bool=False, speed: float=1., loop: bool=False, clock: Callable[[], float]=None) -> None:
+        if clock is None:
+            clock = time.monotonic if realtime else SimulatedClock()
+        super().__init__(clock)
+        self.path = Path(path)
+        self.realtime = realtime
+        self.speed = speed
+        self.loop = loop
+        if not self.path.exists():
+            raise ValueError("Path {} does not exist!".format(self.path))
+
+    def open(self) -> None:
+        with np.load(self.path) as session:
+            self._timestamps = session["timestamps"]
+            self._seqs = session["seqs"]
+            self._offsets = session["offsets"]
+            self._detections = session["detections"]
+            self._rgb, self._rgb_slots = self.__images(session, "rgb")
+            self._depth, self._depth_slots = self.__images(session, "depth")
+        self._index = 0
+        self._lap = 0
+        self._start = self.clock()
+        self._duration = float(self._timestamps[-1] - self._timestamps[0]) + 1e-3 if len(self._timestamps) else 0.
+
+    def __images(self, session, name: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Images of a stream and the slot of every frame in them, -1 for the frames without image"""
+        if name not in session:
+            return None, None
+        images = session[name]
+        # sessions recorded before the frame indexes had one image per frame
+        frames = session[name + "_frames"] if name + "_frames" in session else np.arange(len(images))
+        slots = np.full(len(self._timestamps), -1, dtype=np.int64)
+        slots[frames] = np.arange(len(frames))
+        return images, slots
+
+    def read(self) -> Optional[Frame]:
+        if self._index >= len(self._timestamps):
+            if not self.loop or len(self._timestamps) == 0:
+                return None
+            self._index = 0
+            self._lap += 1
+        i = self._index
+        self._index += 1
+        # elapsed time since the first frame of the session
+        elapsed = float(self._timestamps[i] - self._timestamps[0]) + self._lap * self._duration
+        if self.realtime:
+            delay = self._start + elapsed / self.speed - self.clock()
+            if delay > 0:
+                time.sleep(delay)
+        elif hasattr(self.clock, "advance"):
+            self.clock.advance(self._start + elapsed - self.clock())
+
+        detections = [SpatialDetection(int(d[0]), *map(float, d[1:]))
+            for d in self._detections[self._offsets[i]:self._offsets[i + 1]]]
+        rgb = self._rgb[self._rgb_slots[i]] if self._rgb is not None and self._rgb_slots[i] >= 0 else None
+        depth = self._depth[self._depth_slots[i]] if self._depth is not None and self._depth_slots[i] >= 0 else None
+        return Frame(rgb, depth, detections, self.clock(), int(self._seqs[i]))
+
+class SessionRecorder(object):
+    """Record the frames of any source to replay them later with :obj:`ReplayFrameSource`
+
+    Attributes:
+        path        (str): Path of the ``.npz`` session to write
+        with_rgb   (bool): Store the rgb frames (heavy)
+        with_depth (bool): Store the depth frames (heavy)
+    """
+    def __init__(self, path: str, with_rgb: bool=False, with_depth: bool=False) -> None:
+        self.path = path
+        self.with_rgb = with_rgb
+        self.with_depth = with_depth
+        self._timestamps, self._seqs, self._offsets, self._detections = [], [], [0], []
+        # images and the index of the frame of each of them
+        self._rgb, self._depth = [], []
+        self._rgb_frames, self._depth_frames = [], []
+
+    def add(self, frame: Frame) -> None:
+        """Append a frame to the session"""
+        self._timestamps.append(frame.timestamp)
+        self._seqs.append(frame.seq)
+        for d in frame.detections:
+            c = d.spatialCoordinates
+            self._detections.append((d.label, d.confidence, d.xmin, d.ymin, d.xmax, d.ymax, c.x, c.y, c.z))
+        self._offsets.append(len(self._detections))
+        if self.with_rgb and frame.rgb is not None:
+            self._rgb.append(frame.rgb.copy())
+            self._rgb_frames.append(len(self._timestamps) - 1)
+        if self.with_depth and frame.depth is not None:
+            self._depth.append(frame.depth.copy())
+            self._depth_frames.append(len(self._timestamps) - 1)
+
+    def save(self) -> None:
+        """Write the session to disk"""
+        arrays = {
+            "timestamps": np.asarray(self._timestamps, dtype=np.float64),
+            "seqs": np.asarray(self._seqs, dtype=np.int64),
+            "offsets": np.asarray(self._offsets, dtype=np.int64),
+            "detections": np.asarray(self._detections, dtype=np.float64).reshape(-1, 9)
+        }
+        if self._rgb:
+            arrays["rgb"] = np.stack(self._rgb)
+            arrays["rgb_frames"] = np.asarray(self._rgb_frames, dtype=np.int64)
+        if self._depth:
+            arrays["depth"] = np.stack(self._depth)
+            arrays["depth_frames"] = np.asarray(self._depth_frames, dtype=np.int64)
+        np.savez_compressed(self.path, **arrays)
+        print("[*] Session of {} frames saved to {}".format(len(self._timestamps), self.path))
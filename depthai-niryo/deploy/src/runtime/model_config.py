@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Model configuration
+
+This module demonstrates how to load the JSON config of a model once. The config is parsed
+into a typed :obj:`ModelConfig` (input size, anchors and masks as arrays, thresholds, labels
+with their reverse index) and validated before anything else starts, a bad config fails
+right away instead of in the middle of the pipeline. The configs are cached by path and
+modification time : a restart or a swap back to a known model does not parse it again, an
+edited file is parsed again.
+"""
+
+import json, os, threading
+import numpy as np
+from pathlib import Path
+from typing import Dict, NamedTuple, Tuple, Union
+from .detections import LabelIndex
+
+class ModelConfig(NamedTuple):
+    """Validated config of a model
+
+    Attributes:
+        path                  (str): Path of the JSON file
+        family                (str): ``NN_family``, "YOLO"
+        input_size          (tuple): Width and height of the input of the network
+        classes               (int): Number of classes of the network
+        coordinates           (int): Number of coordinates of a box
+        anchors     (numpy.ndarray): (N, 2) float32 anchors, width and height
+        anchor_masks         (dict): int32 indices of the anchors of each output side
+        iou_threshold       (float): Non-maximum suppression threshold
+        confidence_threshold (float): Minimum confidence of a detection
+        labels         (LabelIndex): Label names and their ids
+    """
+    path: str
+    family: str
+    input_size: Tuple[int, int]
+    classes: int
+    coordinates: int
+    anchors: np.ndarray
+    anchor_masks: Dict[str, np.ndarray]
+    iou_threshold: float
+    confidence_threshold: float
+    labels: LabelIndex
+
+    @property
+    def width(self) -> int:
+        return self.input_size[0]
+
+    @property
+    def height(self) -> int:
+        return self.input_size[1]
+
+    def depthai_anchors(self) -> list:
+        """Anchors flattened as ``setAnchors`` expects them"""
+        return self.anchors.ravel().tolist()
+
+    def depthai_anchor_masks(self) -> Dict[str, list]:
+        """Anchor masks as ``setAnchorMasks`` expects them"""
+        return {side: mask.tolist() for side, mask in self.anchor_masks.items()}
+
+def _require(section: dict, key: str, kind, where: str):
+    if key not in section:
+        raise ValueError("missing {} in {}".format(key, where))
+    value = section[key]
+    # bool is an int, it is never a valid number here
+    if isinstance(value, bool) or not isinstance(value, kind):
+        raise ValueError("{} in {} should be {}, got {!r}".format(key, where, getattr(kind, "__name__", kind), value))
+    return value
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    # the arrays are shared by every user of the cached config
+    array.flags.writeable = False
+    return array
+
+def parse_model_config(config: dict, path: str="<config>") -> ModelConfig:
+    """Validate the content of a JSON config
+
+    Raises:
+        ValueError: The config is incomplete or inconsistent
+    """
+    try:
+        if not isinstance(config, dict):
+            raise ValueError("the config should be an object")
+        nn_config = _require(config, "nn_config", dict, "the config")
+        family = nn_config.get("NN_family", "YOLO")
+        size = _require(nn_config, "input_size", str, "nn_config")
+        try:
+            width, height = (int(side) for side in size.lower().split("x"))
+        except ValueError:
+            raise ValueError("input_size should be <width>x<height>, got {!r}".format(size))
+        if width <= 0 or height <= 0:
+            raise ValueError("input_size should be positive, got {!r}".format(size))
+
+        metadata = _require(nn_config, "NN_specific_metadata", dict, "nn_config")
+        classes = _require(metadata, "classes", int, "NN_specific_metadata")
+        coordinates = _require(metadata, "coordinates", int, "NN_specific_metadata")
+        if classes <= 0 or coordinates <= 0:
+            raise ValueError("classes and coordinates should be positive")
+        thresholds = {}
+        for key in ("iou_threshold", "confidence_threshold"):
+            thresholds[key] = float(_require(metadata, key, (int, float), "NN_specific_metadata"))
+            if not 0. <= thresholds[key] <= 1.:
+                raise ValueError("{} should be in [0, 1], got {}".format(key, thresholds[key]))
+
+        anchors = np.zeros((0, 2), dtype=np.float32)
+        masks = {}
+        if family == "YOLO":
+            values = _require(metadata, "anchors", list, "NN_specific_metadata")
+            if not values or len(values) % 2 or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                raise ValueError("anchors should be pairs of numbers")
+            anchors = np.asarray(values, dtype=np.float32).reshape(-1, 2)
+            for side, mask in _require(metadata, "anchor_masks", dict, "NN_specific_metadata").items():
+                if not isinstance(mask, list) or not all(isinstance(i, int) and 0 <= i < len(anchors) for i in mask):
+                    raise ValueError("anchor_masks {} should be indices of the {} anchors, got {!r}".format(side, len(anchors), mask))
+                masks[side] = _read_only(np.asarray(mask, dtype=np.int32))
+            if not masks:
+                raise ValueError("anchor_masks is empty")
+
+        mappings = config.get("mappings", {})
+        labels = mappings.get("labels", []) if isinstance(mappings, dict) else None
+        if not isinstance(labels, list) or not all(isinstance(label, str) for label in labels):
+            raise ValueError("mappings labels should be a list of names")
+    except ValueError as error:
+        raise ValueError("Invalid model config {} : {}".format(path, error))
+
+    if labels and len(labels) != classes:
+        # the ids without a name are published as their number
+        print("[!] Model config {} : {} classes but {} labels".format(os.path.basename(str(path)), classes, len(labels)))
+    return ModelConfig(str(path), family, (width, height), classes, coordinates, _read_only(anchors), masks,
+        thresholds["iou_threshold"], thresholds["confidence_threshold"], LabelIndex(labels))
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def load_model_config(path: Union[str, Path]) -> ModelConfig:
+    """Parsed config of a JSON file, cached by path and modification time
+
+    Raises:
+        ValueError: The file does not exist or is not a valid config
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise ValueError("Path {} does not exist!".format(path))
+    key = os.path.abspath(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    try:
+        with open(path) as f:
+            content = json.load(f)
+    except ValueError as error:
+        raise ValueError("Invalid model config {} : {}".format(path, error))
+    config = parse_model_config(content, str(path))
+    with _cache_lock:
+        _cache[key] = (stamp, config)
+    return config
+
+def clear_model_config_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed registry of the model blobs
+
+This module demonstrates how to keep track of the models uploaded to the device. Every blob is
+identified by the SHA-256 of its content, its metadata (size, OpenVINO version, number of
+shaves, linked JSON config, upload time) is kept in an index file loaded once at startup, so
+listing and looking up a model never touch the blobs themselves.
+
+Uploads are hashed while they are written and stored as ``<sha256>.blob`` : uploading the same
+blob twice only records its new name, uploading another blob under a known name keeps the
+previous one reachable by its hash. The runtime can refer to a model by its hash
+(``MODEL=sha256:<hash>``) for reproducible deployments, or by any of its names. The other
+files of the folder with the content of a registered blob are recorded as copies, with their
+size and modification time, so they are not hashed again at the next startup. A corrupt index
+is moved aside and rebuilt from the blobs.
+
+Index file (``index.json`` in the models folder)::
+
+    {"version": 1,
+     "models": {"<sha256>": {"file": ..., "size": ..., "openvino_version": ..., "shaves": ...,
+                             "config": ..., "uploaded_at": ..., "names": [...], "mtime": ...}},
+     "aliases": {"<name>": "<sha256>"},
+     "copies": {"<file>": {"sha256": ..., "size": ..., "mtime": ...}}}
+"""
+
+import hashlib, json, os, re, tempfile, threading, time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+HASH_PREFIX = "sha256:"
+INDEX_VERSION = 1
+CHUNK_SIZE = 1 << 20
+ENTRY_KEYS = ("file", "size", "openvino_version", "shaves", "config", "uploaded_at", "names")
+
+class ModelEntry(NamedTuple):
+    """Metadata of a registered blob
+
+    Attributes:
+        sha256            (str): Hash of the content
+        file              (str): File in the models folder
+        size              (int): Bytes
+        openvino_version  (str): OpenVINO version the blob was compiled with, None if unknown
+        shaves            (int): Number of shaves the blob was compiled for, None if unknown
+        config            (str): Linked JSON config in the config folder, None if not linked
+        uploaded_at       (str): UTC time of the upload (or of the first scan), ISO 8601
+        names           (tuple): Names the blob was uploaded as
+    """
+    sha256: str
+    file: str
+    size: int
+    openvino_version: Optional[str]
+    shaves: Optional[int]
+    config: Optional[str]
+    uploaded_at: str
+    names: Tuple[str, ...]
+
+    def to_dict(self) -> Dict:
+        entry = self._asdict()
+        entry["names"] = list(self.names)
+        return entry
+
+def blob_metadata(path: str, name: str=None) -> Tuple[Optional[str], Optional[int]]:
+    """OpenVINO version and number of shaves of a blob
+
+    Read from the header of the blob with depthai, from its name otherwise
+    (``<model>_openvino_2021.4_6shave.blob``, the naming of blobconverter).
+
+    Arguments:
+        path (str): Blob file
+        name (str): Name the blob was uploaded as, defaults to the name of the file
+    """
+    try:
+        import depthai as dai
+        blob = dai.OpenVINO.Blob(Path(path))
+        return dai.OpenVINO.getVersionName(blob.version), int(blob.numShaves)
+    except Exception:
+        name = name or os.path.basename(path)
+        version = re.search(r"openvino_(\d{4}\.\d+)", name)
+        shaves = re.search(r"(\d+)_?shaves?", name)
+        return version.group(1) if version else None, int(shaves.group(1)) if shaves else None
+
+def _utc(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+def is_hash(key: str) -> bool:
+    """True for ``sha256:<hash>`` or a bare 64 hex digits hash"""
+    key = key[len(HASH_PREFIX):] if key.startswith(HASH_PREFIX) else key
+    return len(key) == 64 and all(c in "0123456789abcdef" for c in key.lower())
+
+class UploadWriter(object):
+    """Temporary file of an upload, hashed while it is written"""
+    def __init__(self, registry: "ModelRegistry") -> None:
+        self._registry = registry
+        self._hash = hashlib.sha256()
+        self.size = 0
+        fd, self.path = tempfile.mkstemp(suffix=".part", dir=str(registry.root))
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self, name: str, config: str=None) -> Tuple[ModelEntry, bool]:
+        """Register the upload, see :obj:`ModelRegistry.add_file`"""
+        self._file.close()
+        return self._registry._add(self.path, self._hash.hexdigest(), name, config, move=True)
+
+    def abort(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self) -> "UploadWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        # committed uploads were moved, anything left is a failed upload
+        self.abort()
+
+class ModelRegistry(object):
+    """Blobs of the models folder indexed by SHA-256
+
+    Attributes:
+        root        (Path): Folder of the blobs
+        config_root (Path): Folder of the JSON configs the blobs can be linked to
+        index_path  (Path): Index file
+    """
+    def __init__(self, root: str="models", config_root: str="config", index: str="index.json") -> None:
+        self.root = Path(root)
+        self.config_root = Path(config_root)
+        self.index_path = self.root / index
+        self._models = {}
+        self._aliases = {}
+        self._copies = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def __contains__(self, key: str) -> bool:
+        return self.lookup(key) is not None
+
+    def load(self, scan: bool=True) -> "ModelRegistry":
+        """Read the index file, forget the blobs removed since and register the new ones"""
+        with self._lock:
+            self._models, self._aliases, self._copies = {}, {}, {}
+            if self.index_path.exists():
+                try:
+                    self.__read_index()
+                except (ValueError, KeyError, TypeError, AttributeError) as error:
+                    # truncated or edited by hand, the blobs themselves are the reference
+                    bad = self.index_path.with_name("{}.bad-{}".format(self.index_path.name, time.strftime("%Y%m%d%H%M%S")))
+                    print("[!] Invalid model index {} ({}), moved to {} and rebuilt".format(self.index_path, error, bad.name))
+                    os.replace(str(self.index_path), str(bad))
+                    self._models, self._aliases, self._copies = {}, {}, {}
+                    scan = True
+            if scan:
+                self.scan()
+        return self
+
+    def __read_index(self) -> None:
+        with self.index_path.open() as f:
+            index = json.load(f)
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError("unsupported version {}".format(index.get("version")))
+        for sha256, entry in index.get("models", {}).items():
+            missing = [key for key in ENTRY_KEYS if key not in entry]
+            if missing:
+                raise KeyError("{} of {}".format(", ".join(missing), sha256))
+            if (self.root / entry["file"]).exists():
+                self._models[sha256] = entry
+        self._aliases = {name: sha256 for name, sha256 in index.get("aliases", {}).items() if sha256 in self._models}
+        self._copies = {file: copy for file, copy in index.get("copies", {}).items()
+            if copy["sha256"] in self._models and (self.root / file).exists()}
+
+    def scan(self) -> int:
+        """Register the blobs of the folder missing from the index (copied without the api)
+
+        Returns:
+            int: Number of blobs hashed
+        """
+        hashed = 0
+        with self._lock:
+            indexed = {entry["file"]: (sha256, entry) for sha256, entry in self._models.items()}
+            indexed.update((file, (copy["sha256"], copy)) for file, copy in self._copies.items())
+            for path in sorted(self.root.glob("*.blob")):
+                stat = path.stat()
+                known = indexed.get(path.name)
+                if known is not None and known[1]["size"] == stat.st_size and known[1].get("mtime") == stat.st_mtime:
+                    continue
+                # a copy changed in place leaves its registered blob as it is,
+                # a registered blob changed in place is gone
+                if known is not None and self._copies.pop(path.name, None) is None:
+                    self.__forget(known[0])
+                self._add(str(path), self.hash_file(str(path)), path.name, None, move=False, save=False)
+                hashed += 1
+            self.save()
+        return hashed
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def save(self) -> None:
+        """Write the index file atomically"""
+        with self._lock:
+            index = {"version": INDEX_VERSION, "models": self._models, "aliases": self._aliases, "copies": self._copies}
+            fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=str(self.root))
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f, indent=2, sort_keys=True)
+            os.replace(tmp, str(self.index_path))
+
+    def __entry(self, sha256: str) -> ModelEntry:
+        entry = self._models[sha256]
+        return ModelEntry(sha256, entry["file"], entry["size"], entry["openvino_version"], entry["shaves"],
+            entry["config"], entry["uploaded_at"], tuple(entry["names"]))
+
+    def __forget(self, sha256: str) -> None:
+        self._models.pop(sha256, None)
+        self._aliases = {name: value for name, value in self._aliases.items() if value != sha256}
+        self._copies = {file: copy for file, copy in self._copies.items() if copy["sha256"] != sha256}
+
+    def __check_config(self, config: Optional[str]) -> Optional[str]:
+        if config is None:
+            return None
+        # validated (and cached) now rather than when the model is started
+        from .model_config import load_model_config
+        load_model_config(self.config_root / config)
+        return config
+
+    def _add(self, path: str, sha256: str, name: str, config: Optional[str], move: bool, save: bool=True) -> Tuple[ModelEntry, bool]:
+        name = os.path.basename(name) if name else None
+        with self._lock:
+            config = self.__check_config(config)
+            created = sha256 not in self._models
+            if created:
+                if move:
+                    file = sha256 + ".blob"
+                    os.replace(path, str(self.root / file))
+                else:
+                    file = os.path.relpath(path, str(self.root))
+                stat = os.stat(str(self.root / file))
+                openvino_version, shaves = blob_metadata(str(self.root / file), name)
+                self._models[sha256] = {"file": file, "size": stat.st_size, "openvino_version": openvino_version,
+                    "shaves": shaves, "config": config, "uploaded_at": _utc(time.time() if move else stat.st_mtime),
+                    "names": [], "mtime": stat.st_mtime}
+            elif move:
+                # duplicate upload, the blob is already stored
+                os.remove(path)
+            else:
+                file = os.path.relpath(path, str(self.root))
+                if file != self._models[sha256]["file"]:
+                    # same content copied under another file, not hashed again while it is unchanged
+                    stat = os.stat(path)
+                    self._copies[file] = {"sha256": sha256, "size": stat.st_size, "mtime": stat.st_mtime}
+            entry = self._models[sha256]
+            if name and name not in entry["names"]:
+                entry["names"].append(name)
+            if name:
+                self._aliases[name] = sha256
+            if config is not None:
+                entry["config"] = config
+            if save:
+                self.save()
+            return self.__entry(sha256), created
+
+    def add_file(self, path: str, name: str=None, config: str=None) -> Tuple[ModelEntry, bool]:
+        """Copy a blob in the registry
+
+        Returns:
+            tuple: Its entry and False if the same content was already registered
+        """
+        with self.upload() as writer, open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                writer.write(chunk)
+            return writer.commit(name or os.path.basename(path), config)
+
+    def upload(self) -> UploadWriter:
+        """Writer of a new blob, ``commit`` registers it"""
+        return UploadWriter(self)
+
+    def lookup(self, key: str) -> Optional[ModelEntry]:
+        """Entry of a hash (``sha256:<hash>`` or bare) or of a name, None if unknown"""
+        with self._lock:
+            sha256 = key[len(HASH_PREFIX):] if key.startswith(HASH_PREFIX) else key
+            if sha256.lower() in self._models:
+                return self.__entry(sha256.lower())
+            if key in self._aliases:
+                return self.__entry(self._aliases[key])
+            return None
+
+    def resolve(self, key: str) -> Path:
+        """Path of the blob of a hash or a name
+
+        Raises:
+            ValueError: Unknown model
+        """
+        entry = self.lookup(key)
+        if entry is not None:
+            return self.root / entry.file
+        if not is_hash(key) and (self.root / key).exists():
+            # not indexed yet (copied after the startup)
+            return self.root / key
+        raise ValueError("Unknown model {} in {}".format(key, self.root))
+
+    def link_config(self, key: str, config: str) -> ModelEntry:
+        """Link a model to the JSON config it runs with
+
+        Raises:
+            ValueError: Unknown model or invalid config
+        """
+        with self._lock:
+            entry = self.lookup(key)
+            if entry is None:
+                raise ValueError("Unknown model {}".format(key))
+            self._models[entry.sha256]["config"] = self.__check_config(config)
+            self.save()
+            return self.__entry(entry.sha256)
+
+    def entries(self) -> List[ModelEntry]:
+        with self._lock:
+            return [self.__entry(sha256) for sha256 in self._models]
@@ -5,14 +5,24 @@ This module demonstrates the use of the depthai camera OAK-D
 with inference on-device
 """
 
-import os, time, json
+import os, time
 import cv2
+import numpy as np
 from pathlib import Path
 import depthai as dai
-from typing import Tuple
-from ..niryo import Niryo
 from ..mqtt import MqttClient
-from ..utils import global_var
+from .frame_source import FrameSource, DeviceFrameSource, STREAMS, STREAM_DETECTIONS, STREAM_RGB, STREAM_DEPTH
+from .profiler import NullProfiler
+from .channel import LatestChannel
+from .robot_executor import RobotExecutor, Target
+from .predictor import InterceptPredictor
+from .tracker import Tracker
+from .detections import to_array, to_boxes, to_positions, grabbable
+from .depth import DepthRoiStats, RGB_SENSOR_SIZE, center_crop
+from .model_config import load_model_config
+from .model_registry import ModelRegistry
+from .video import VideoStreamer
+from .overlay import OverlayRenderer
 
 class ObjectDetection(object):
     """Object detection class to perform detections with OAK-D opencv camera
@@ -20,7 +30,8 @@ class ObjectDetection(object):
     This class implements methods to perform inference on-device,
     send the result to niryo and then publish to mqtt
     """
-    def __init__(self, args: dict, model_basename: str="models", config_basename: str="config", mqtt_client: MqttClient=None) -> None:
+    def __init__(self, args: dict, model_basename: str="models", config_basename: str="config", mqtt_client: MqttClient=None,
+        registry: ModelRegistry=None) -> None:
         """Load model and parameter to memory 
         
         Get initial config based on given json file, load model using its path (/models) and
@@ -31,6 +42,7 @@ class ObjectDetection(object):
             model_basename         (:obj:`str`, optional): Folder where the models are located
             config_basename        (:obj:`str`, optional): Folder where the json configs are located
             mqtt_client     (:obj:`MqttClient`, optional): MQTT Client that will publish results to broker
+            registry     (:obj:`ModelRegistry`, optional): Registry resolving the model by name or hash, defaults to the file in ``model_basename``
         """
         # parse config
         self.args = args
@@ -39,43 +51,75 @@ class ObjectDetection(object):
         self.mustStop = os.environ.get("MustStop", "Error")
 
         # niryo od detection
-        self._is_satisfying_pos = False
-        self._did_i_do_first_move = False
         self._label_to_grab = "not_good"
-
-        if not self.configPath.exists():
-            raise ValueError("Path {} does not exist!".format(self.configPath))
-
-        with self.configPath.open() as f:
-            config = json.load(f)
-        self.nnConfig = config.get("nn_config", {})
-
-        # parse input shape
-        if "input_size" in self.nnConfig:
-            self.W, self.H = tuple(map(int, self.nnConfig.get("input_size").split('x')))
-
-        # extract metadata
-        self.metadata = self.nnConfig.get("NN_specific_metadata", {})
-        self.classes = self.metadata.get("classes", {})
-        self.coordinates = self.metadata.get("coordinates", {})
-        self.anchors = self.metadata.get("anchors", {})
-        self.anchorMasks = self.metadata.get("anchor_masks", {})
-        self.iouThreshold = self.metadata.get("iou_threshold", {})
-        self.confidenceThreshold = self.metadata.get("confidence_threshold", {})
-
-        print(self.metadata)
-        # parse labels
-        self.nnMappings = config.get("mappings", {})
-        self.labels = self.nnMappings.get("labels", {})
+        self._executor = None
+        self._robot_paused = False
+        # every detection gets a track id, the robot keeps grabing the same track
+        self._tracker = Tracker()
+        self._locked_track = None
+        # objects out of the depth range are not grabbed, the range can be changed while running
+        self._depth_range = (int(args["threshold_down"]), int(args["threshold_up"]))
+
+        # streams sent by the device : only the detections unless a consumer needs the frames
+        self.streams = {STREAM_DETECTIONS}
+        # annotated frames for the api, only copied while a client watches
+        self.video = None
+        self.host_depth = str(args.get("host_depth", False)).lower() in ("1", "true")
+        if self.host_depth:
+            self.require_stream(STREAM_DEPTH)
+        streams = args.get("streams") or ()
+        for name in (streams.split(",") if isinstance(streams, str) else streams):
+            if name.strip():
+                self.require_stream(name.strip())
+
+        # typed and validated once, cached by path and modification time
+        self.model_config = load_model_config(self.configPath)
+        self.W, self.H = self.model_config.input_size
+        # depth of the detections whose spatial calculation failed on the device,
+        # the boxes are normalized on the preview, a center crop of the sensor the depth is aligned on
+        self._depth_stats = DepthRoiStats(depth_range=self._depth_range, crop=center_crop((self.W, self.H)))
+        self.classes = self.model_config.classes
+        self.coordinates = self.model_config.coordinates
+        self.anchors = self.model_config.anchors
+        self.anchorMasks = self.model_config.anchor_masks
+        self.iouThreshold = self.model_config.iou_threshold
+        self.confidenceThreshold = self.model_config.confidence_threshold
+        self.label_index = self.model_config.labels
+        self.labels = self.label_index.names
+        self._label_id_to_grab = self.label_index.id_of(self._label_to_grab)
+        # annotation of the frames (viewer, video endpoints)
+        self.overlay = OverlayRenderer(self.labels, detail=args.get("overlay_detail", "full"),
+            budget_ms=float(args.get("overlay_budget_ms", 2.)))
 
         # get model path
-        self.nnPath = Path(os.path.join(model_basename, args["model"]))
+        if registry is not None:
+            self.nnPath = registry.resolve(args["model"])
+            entry = registry.lookup(args["model"])
+            if entry is not None:
+                print("[*] Model sha256 {} ({} bytes, openvino {}, {} shaves)".format(entry.sha256, entry.size, entry.openvino_version, entry.shaves))
+        else:
+            self.nnPath = Path(os.path.join(model_basename, args["model"]))
         if not Path(self.nnPath).exists():
             raise ValueError("Path {} does not exist!".format(self.nnPath))
         # sync outputs
         self.syncNN = True
         print("[*] Model {} loaded with config {}".format(os.path.basename(self.nnPath), os.path.basename(self.configPath)))
         
+    def require_stream(self, name: str) -> None:
+        """Ask the device to send a stream ("rgb" or "depth") to the host
+
+        Consumers of the frames (viewer, recorder, host depth) call it before :obj:`configure_pipeline`,
+        the streams nobody asked for are not sent on the usb link.
+        """
+        if name not in STREAMS:
+            raise ValueError("Unknown stream {}, expected one of {}".format(name, STREAMS))
+        self.streams.add(name)
+
+    def attach_video(self, streamer: VideoStreamer) -> None:
+        """Hand the rgb frames and their detections to a :obj:`VideoStreamer` (needs the rgb stream)"""
+        self.require_stream(STREAM_RGB)
+        self.video = streamer
+
     def configure_pipeline(self) -> None:
         """Configure the video pipeline """
         # Create pipeline
@@ -89,15 +133,17 @@ class ObjectDetection(object):
         self.monoRight = self.pipeline.create(dai.node.MonoCamera)
         self.stereo = self.pipeline.create(dai.node.StereoDepth)
 
-        self.xoutRgb = self.pipeline.create(dai.node.XLinkOut)
+        # outputs to the host, only for the consumed streams
         self.xoutNN = self.pipeline.create(dai.node.XLinkOut)
-        self.xoutBoundingBoxDepthMapping = self.pipeline.create(dai.node.XLinkOut)
-        self.xoutDepth = self.pipeline.create(dai.node.XLinkOut)
-
-        self.xoutRgb.setStreamName("rgb")
-        self.xoutNN.setStreamName("detections")
-        self.xoutBoundingBoxDepthMapping.setStreamName("boundingBoxDepthMapping")
-        self.xoutDepth.setStreamName("depth")
+        self.xoutNN.setStreamName(STREAM_DETECTIONS)
+        self.xoutRgb, self.xoutDepth = None, None
+        if STREAM_RGB in self.streams:
+            self.xoutRgb = self.pipeline.create(dai.node.XLinkOut)
+            self.xoutRgb.setStreamName(STREAM_RGB)
+        if STREAM_DEPTH in self.streams:
+            self.xoutDepth = self.pipeline.create(dai.node.XLinkOut)
+            self.xoutDepth.setStreamName(STREAM_DEPTH)
+        print("[CAM] Streams sent to the host : {}".format(", ".join(sorted(self.streams))))
 
         # Increase fps : splitting device-sent XLink packets, in bytes
         self.pipeline.setXLinkChunkSize(0)
@@ -140,14 +186,14 @@ class ObjectDetection(object):
         self.spatialDetectionNetwork.setConfidenceThreshold(self.confidenceThreshold)
         self.spatialDetectionNetwork.setNumClasses(self.classes)
         self.spatialDetectionNetwork.setCoordinateSize(self.coordinates)
-        self.spatialDetectionNetwork.setAnchors(self.anchors)
-        self.spatialDetectionNetwork.setAnchorMasks(self.anchorMasks)
+        self.spatialDetectionNetwork.setAnchors(self.model_config.depthai_anchors())
+        self.spatialDetectionNetwork.setAnchorMasks(self.model_config.depthai_anchor_masks())
         self.spatialDetectionNetwork.setIouThreshold(self.iouThreshold)
         self.spatialDetectionNetwork.setBlobPath(self.nnPath)
         self.spatialDetectionNetwork.setNumInferenceThreads(2)
         self.spatialDetectionNetwork.input.setBlocking(False)
-        self.spatialDetectionNetwork.setDepthLowerThreshold(int(self.args["threshold_down"]))
-        self.spatialDetectionNetwork.setDepthUpperThreshold(int(self.args["threshold_up"]))
+        self.spatialDetectionNetwork.setDepthLowerThreshold(self._depth_range[0])
+        self.spatialDetectionNetwork.setDepthUpperThreshold(self._depth_range[1])
 
         # TODO what is this parameter doing ?
         self.spatialDetectionNetwork.setBoundingBoxScaleFactor(0.5)
@@ -160,50 +206,76 @@ class ObjectDetection(object):
         self.monoLeft.out.link(self.stereo.left)
         self.monoRight.out.link(self.stereo.right)
         self.camRgb.preview.link(self.spatialDetectionNetwork.input)
-        if self.syncNN:
-            self.spatialDetectionNetwork.passthrough.link(self.xoutRgb.input)
-        else:
-            self.camRgb.preview.link(self.xoutRgb.input)
+        if self.xoutRgb is not None:
+            if self.syncNN:
+                self.spatialDetectionNetwork.passthrough.link(self.xoutRgb.input)
+            else:
+                self.camRgb.preview.link(self.xoutRgb.input)
 
         self.spatialDetectionNetwork.out.link(self.xoutNN.input)
-        self.spatialDetectionNetwork.boundingBoxMapping.link(self.xoutBoundingBoxDepthMapping.input)
         self.stereo.depth.link(self.spatialDetectionNetwork.inputDepth)
-        self.spatialDetectionNetwork.passthroughDepth.link(self.xoutDepth.input)
+        if self.xoutDepth is not None:
+            self.spatialDetectionNetwork.passthroughDepth.link(self.xoutDepth.input)
         print("[CAM] Done")
 
-    @staticmethod
-    def draw(exec_time: float, rgb_frame, depth_frame, detections, labels, fps: int=0, show: bool=False, color: tuple=(255, 255, 255)):
-        """Draw detections on frame"""
-
-        height = rgb_frame.shape[0]
-        width  = rgb_frame.shape[1]
-        print("[*] {} detections".format(len(detections)))
-        for detection in detections:
-            # Denormalize bounding box
-            x1 = int(detection.xmin * width)
-            x2 = int(detection.xmax * width)
-            y1 = int(detection.ymin * height)
-            y2 = int(detection.ymax * height)
-            try:
-                label = labels[detection.label]
-            except:
-                label = detection.label
-
-            cv2.putText(rgb_frame, str(label), (x1 + 10, y1 + 20), cv2.FONT_HERSHEY_TRIPLEX, 0.5, 255)
-            cv2.putText(rgb_frame, "{:.2f}".format(detection.confidence*100), (x1 + 10, y1 + 35), cv2.FONT_HERSHEY_TRIPLEX, 0.5, 255)
-            cv2.putText(rgb_frame, f"X: {int(detection.spatialCoordinates.x)} mm", (x1 + 10, y1 + 50), cv2.FONT_HERSHEY_TRIPLEX, 0.5, 255)
-            cv2.putText(rgb_frame, f"Y: {int(detection.spatialCoordinates.y)} mm", (x1 + 10, y1 + 65), cv2.FONT_HERSHEY_TRIPLEX, 0.5, 255)
-            cv2.putText(rgb_frame, f"Z: {int(detection.spatialCoordinates.z)} mm", (x1 + 10, y1 + 80), cv2.FONT_HERSHEY_TRIPLEX, 0.5, 255)
-
-            print("[*] Exec Time {}ms\nObject Position ( x {}mm ; y {}mm ; z {}mm )\nclass {}\n".format(exec_time, detection.spatialCoordinates.x, detection.spatialCoordinates.y, detection.spatialCoordinates.z, detection.label))
-            cv2.rectangle(rgb_frame, (x1, y1), (x2, y2), color, cv2.FONT_HERSHEY_SIMPLEX)
+    def draw(self, image, records: np.ndarray, fps: float=None, depth=None, show: bool=False) -> float:
+        """Draw the detection records of a frame on its rgb image, in place
 
-        cv2.putText(rgb_frame, "NN fps: {:.2f}".format(fps), (2, rgb_frame.shape[0] - 4), cv2.FONT_HERSHEY_TRIPLEX, 0.4, color)
-        
+        Returns:
+            float: Time spent drawing (ms), bounded by the overlay budget
+        """
+        elapsed = self.overlay.draw(image, records, fps)
         if show:
-            cv2.imshow("depth", depth_frame)
-            cv2.imshow("rgb", rgb_frame)
-    
+            if depth is not None:
+                cv2.imshow("depth", depth)
+            cv2.imshow("rgb", image)
+        return elapsed
+
+    @property
+    def label_to_grab(self) -> str:
+        return self._label_to_grab
+
+    def set_label_to_grab(self, label: str) -> str:
+        """Select the label of the objects to grab"""
+        if self.labels and label not in self.label_index:
+            raise ValueError("Unknown label {}, expected one of {}".format(label, self.labels))
+        print("[CAM] Grabing objects labelled {}".format(label))
+        self._label_to_grab = label
+        self._label_id_to_grab = self.label_index.id_of(label)
+        return label
+
+    def set_thresholds(self, down: int, up: int) -> dict:
+        """Set the depth range (mm) of the objects to grab
+
+        The range is applied on the host right away, the depth thresholds of the device are only
+        updated when the pipeline is configured again.
+        """
+        down, up = int(down), int(up)
+        if not 0 <= down < up:
+            raise ValueError("Expected 0 <= down < up, given down {} up {}".format(down, up))
+        self._depth_range = (down, up)
+        self._depth_stats.depth_range = (down, up)
+        self.args["threshold_down"], self.args["threshold_up"] = down, up
+        print("[CAM] Depth range set to [{}, {}] mm".format(down, up))
+        return {"down": down, "up": up}
+
+    @property
+    def robot_paused(self) -> bool:
+        return self._robot_paused
+
+    def pause_robot(self) -> bool:
+        """Stop grabing objects, the detections are still published"""
+        self._robot_paused = True
+        if self._executor is not None:
+            self._executor.pause()
+        return self._robot_paused
+
+    def resume_robot(self) -> bool:
+        self._robot_paused = False
+        if self._executor is not None:
+            self._executor.resume()
+        return self._robot_paused
+
     def __counter_start(self) -> None:
         self._startTime = time.monotonic()
         self._counter = 0
@@ -217,130 +289,153 @@ class ObjectDetection(object):
             self._counter = 0
             self._startTime = current_time
 
-    def __get_roi(self, detection) -> Tuple[int, int, int, int, int]:
-        """Get position from detection """
-
-        x1 = int(detection.xmin * self._frame_width)
-        x2 = int(detection.xmax * self._frame_width)
-        y1 = int(detection.ymin * self._frame_height)
-        y2 = int(detection.ymax * self._frame_height)
-        try:
-            label = self.labels[detection.label]
-        except:
-            label = detection.label
-        return x1, x2, y1, y2, label
-    
-    def __get_position(self, detection) -> Tuple[float, float, float]:
-        """Get position from tuple object"""
-        return round(detection.spatialCoordinates.x, 3), round(detection.spatialCoordinates.y, 3), round(detection.spatialCoordinates.z, 3)
-    
     def __get_frame(self):
-        """Get frame from opencv pipeline """
-        inPreview = self._previewQueue.get()
-        inDet = self._detectionNNQueue.get()
-        depth = self._depthQueue.get()
-        frame = inPreview.getCvFrame()
-        depthFrame = depth.getFrame()
-        return inDet, frame, depthFrame
+        """Get frame from the frame source, None when the source is exhausted"""
+        return self._frame_source.read()
     
-    def __publish_results(self, pos: str, roi: str):
-        """Publish results to mqtt preset topics"""
-        self._mqtt_client.publish(self._mqtt_client.cam_topic+"/pos", pos)
-        self._mqtt_client.publish(self._mqtt_client.cam_topic+"/roi", roi)
+    def __fill_depth(self, frame, records: np.ndarray) -> int:
+        """Give a position computed from the depth frame to the detections without one, return their number"""
+        missing = np.flatnonzero(records["z"].astype(int) == 0)
+        if not self.host_depth or frame.depth is None or not len(missing):
+            return 0
+        boxes = to_boxes(records[missing]) / (self._frame_width, self._frame_height, self._frame_width, self._frame_height)
+        positions, valid = self._depth_stats.positions(frame.depth, boxes, RGB_SENSOR_SIZE[1] / RGB_SENSOR_SIZE[0])
+        filled = missing[valid]
+        records["x"][filled], records["y"][filled], records["z"][filled] = positions[valid].T
+        return len(filled)
+
+    def __publish_results(self, frame, records: np.ndarray):
+        """Publish the detections of a frame in one message"""
+        if self._mqtt_client is not None:
+            self._mqtt_client.publish_frame(frame.seq, frame.timestamp, records, self.labels)
+
+    def __select_target(self, frame, label_ids: np.ndarray, track_ids: np.ndarray, positions: np.ndarray):
+        """Choose the object to grab, None if no detection can be grabbed
+
+        The robot stays locked on the same track while it is seen. A new track is chosen when
+        it is lost : the closest to the optical axis during a sequence (the arm was moving
+        towards it, so its id may have changed), otherwise the most stable one.
+        """
+        candidates = np.flatnonzero(grabbable(label_ids, positions, self._label_id_to_grab, self._depth_range))
+        if not len(candidates):
+            return None
+        locked = candidates[track_ids[candidates] == self._locked_track]
+        if len(locked):
+            index = locked[0]
+        elif self._executor is not None and self._executor.in_sequence:
+            index = candidates[np.argmin(np.hypot(positions[candidates, 0], positions[candidates, 1]))]
+        else:
+            index = max(candidates, key=lambda i: self._tracker.hits_of(track_ids[i]))
+        self._locked_track = int(track_ids[index])
+        x, y, z = (round(float(v), 3) for v in positions[index])
+        return Target(x, y, z, self.label_index.name_of(label_ids[index]), frame.timestamp, frame.seq, self._locked_track)
+
+    def run(self, frame_source: FrameSource=None, profiler=None, standby_timeout: float=1.5, predictor: InterceptPredictor=None) -> None:
+        """Main loop to perform object detection and start the grabing sequence
 
-    def run(self) -> None:
-        """Main loop to perform object detection and start the grabing sequence"""
+        The camera loop only reads frames, publishes the results and hands the freshest object to grab
+        to a :obj:`RobotExecutor` running the niryo on its own thread.
+
+        Arguments:
+            frame_source (:obj:`FrameSource`, optional): Source of the frames, defaults to the OAK-D camera running the configured pipeline
+            profiler    (:obj:`LoopProfiler`, optional): Profiler timing each stage of the loop (benchmarks)
+            standby_timeout  (:obj:`float`, optional): Seconds without object to grab before niryo goes back to stand by
+            predictor (:obj:`InterceptPredictor`, optional): Grab at the predicted position in one move instead of the roi loop
+        """
 
         print("[!] Run started")
-        # Connect to device and start pipeline, Force usb2 otherwise OAK-D crash
-        with dai.Device(self.pipeline, usb2Mode=True) as device:
-
-            # Output queues will be used to get the rgb frames and nn data from the outputs defined above
-            self._previewQueue = device.getOutputQueue(name="rgb", maxSize=4, blocking=False)
-            self._detectionNNQueue = device.getOutputQueue(name="detections", maxSize=4, blocking=False)
-            self._xoutBoundingBoxDepthMappingQueue = device.getOutputQueue(name="boundingBoxDepthMapping", maxSize=4, blocking=False)
-            self._depthQueue = device.getOutputQueue(name="depth", maxSize=4, blocking=False)
-
-            self.__counter_start()
-            _, frame, _ = self.__get_frame()
-            self._frame_height = frame.shape[0]
-            self._frame_width  = frame.shape[1]
-            print("[CAM] Height {}, Width {} of rgb frame".format(self._frame_height, self._frame_width))
-            count = 0
-            #color = (255, 255, 255)
-            exec_time_avg = 0
-            fps_avg = 0
-
-            while self.mustStop != "True" and self.mustStop != "Error":
-                self.mustStop = os.environ.get("MustStop", "Error")
-
-                milli_start = int(round(time.time() * 1000))
-                # depthFrame values are in millimeters
-                inDet, frame, depthFrame = self.__get_frame()
-                detections = inDet.detections
-
-                self.__counter_end()
-                fps_avg+=self._fps
-                milli_end = int(round(time.time() * 1000))
-                exec_time = milli_end - milli_start
-                exec_time_avg+=exec_time
-                count+=1
-                count_before_stand_by = 0
-
-                if len(detections) != 0:
-                    for detection in detections:
-                        x1, x2, y1, y2, label = self.__get_roi(detection)
-                        x, y, z = self.__get_position(detection)
-                        pos = "{}:{}:{}:{}".format(label, x, y, z)
-                        roi = "{}:{}:{}:{}:{}".format(label, x1, x2, y1, y2)
-                        # Here we detection the objects in our rgb and depthframe, we stop the detection 
-                        # while niryo is moving (the main thread is blocked)
-                        # if class is not good -> do seq
-                        if isinstance(global_var.NIRYO, Niryo) and int(x) != 0 and int(y) != 0 and int(z) != 0: 
-                            if label == self._label_to_grab:
-                                #print("[CAMERA] Grabing label {} ..".format(label))
-                                # Grabing sequence
-                                if self._did_i_do_first_move == False:
-                                    if (global_var.NIRYO.seq_first_move_to_roi(x,y,z)):
-                                        self._did_i_do_first_move = True
-
-                                if not self._is_satisfying_pos and self._did_i_do_first_move == True:
-                                    self._is_satisfying_pos = global_var.NIRYO.seq_do_roi_loop(x,y,z)
-                                else:
-                                    # Go to Z and grab the object 
-                                    global_var.NIRYO.seq_grab_object(x, y, z)
-                                    self._is_satisfying_pos = False
-                                    self._did_i_do_first_move = False
-                                    count_before_stand_by=0
-
-                        elif self._did_i_do_first_move == True :
-                            # niryo trap in sequence 
-                            count_before_stand_by+=1
-
-                        self.__publish_results(pos, roi)
-                        if count_before_stand_by > 30:
-                            print("[NYRYO] Sequence abort, moving to standard position ..")
-                            global_var.NIRYO.position = global_var.NIRYO.stand_by
-                            self._is_satisfying_pos = False
-                            self._did_i_do_first_move = False
-                            count_before_stand_by = 0
-
-                        if self._counter % 30 == 0:
-                            print("[CAMERA] Exec Time {}ms Detected Label {} Raw Cam Pos x {} y {} z {}".format(exec_time, label, x, y, z))
-                            #print("[CAM] Exec Time {}ms\nPos ( x {}mm ; y {}mm ; z {}mm )\nclass {}\nROI ({};{};{};{})".format(exec_time, x, y, z, label, x1, x2, y1, y2))                    
-                            self.__publish_results(pos, roi)
-
-                elif len(detections) == 0 and self._did_i_do_first_move == True:
-                    print("[NYRYO] Sequence abort, moving to standard position ..")
-                    global_var.NIRYO.position = global_var.NIRYO.stand_by
-                    count_before_stand_by = 0
-                    self._is_satisfying_pos = False
-                    self._did_i_do_first_move = False
-
-                if count % 30 == 0:
-                    print("[CAM] Average detection time : {} ms | FPS {}".format(round(exec_time_avg/count, 2), round(fps_avg/count, 1)))
-                        
-                if cv2.waitKey(1) == ord('q'):
-                    print("[*] Exiting ..")
-                    break
+        if frame_source is None:
+            # Force usb2 otherwise OAK-D crash
+            frame_source = DeviceFrameSource(self.pipeline, usb2_mode=True, streams=tuple(self.streams))
+        self._frame_source = frame_source
+        profiler = profiler if profiler is not None else NullProfiler()
+
+        self._targets = LatestChannel(capacity=1)
+        executor = RobotExecutor(self._targets, frame_source.clock, standby_timeout, profiler, predictor)
+        if self._robot_paused:
+            executor.pause()
+        self._executor = executor
+        with frame_source:
+            executor.start()
+            try:
+                self.__loop(frame_source, profiler)
+            finally:
+                executor.stop()
+                self._executor = None
+                profiler.count("targets_dropped", self._targets.dropped)
+                for name, value in frame_source.counters().items():
+                    profiler.count(name, value)
+
+    def __loop(self, frame_source: FrameSource, profiler) -> None:
+        self.__counter_start()
+        first = self.__get_frame()
+        if first is None:
+            print("[!] Frame source is empty")
+            return
+        if first.rgb is not None:
+            self._frame_height = first.rgb.shape[0]
+            self._frame_width  = first.rgb.shape[1]
+        else:
+            # detections are normalized on the nn input
+            self._frame_height, self._frame_width = self.H, self.W
+        print("[CAM] Height {}, Width {} of rgb frame".format(self._frame_height, self._frame_width))
+        count = 0
+        #color = (255, 255, 255)
+        exec_time_avg = 0
+        fps_avg = 0
+
+        while self.mustStop != "True" and self.mustStop != "Error":
+            self.mustStop = os.environ.get("MustStop", "Error")
+
+            milli_start = int(round(time.time() * 1000))
+            # depthFrame values are in millimeters
+            with profiler.stage("get_frame"):
+                frame = self.__get_frame()
+            if frame is None:
+                print("[*] Frame source exhausted")
+                break
+            detections = frame.detections
+            profiler.count("frames")
+            profiler.count("detections", len(detections))
+
+            self.__counter_end()
+            fps_avg+=self._fps
+            milli_end = int(round(time.time() * 1000))
+            exec_time = milli_end - milli_start
+            exec_time_avg+=exec_time
+            count+=1
+
+            # one structured array per frame, laid out as the mqtt records
+            with profiler.stage("roi"):
+                records = to_array(detections, self._frame_width, self._frame_height)
+            with profiler.stage("depth"):
+                profiler.count("depth_fallbacks", self.__fill_depth(frame, records))
+            with profiler.stage("track"):
+                # the positions are in the frame of the camera, on the arm : not averaged across its moves
+                moved_at = self._executor.last_move_end if self._executor is not None else None
+                track_ids, positions = self._tracker.update(to_boxes(records), to_positions(records),
+                    records["label"], frame.timestamp, moved_at)
+
+            # The robot executor moves niryo on its own thread, the camera never waits
+            # for the robot : only the freshest target is kept in the channel
+            target = self.__select_target(frame, records["label"], track_ids, positions)
+            if target is not None:
+                self._targets.put(target)
+
+            if self._counter % 30 == 0:
+                for label, track_id, (x, y, z) in zip(self.label_index.names_of(records["label"]), track_ids, positions):
+                    print("[CAMERA] Exec Time {}ms Detected Label {} Track {} Cam Pos x {:.1f} y {:.1f} z {:.1f}".format(exec_time, label, track_id, x, y, z))
+
+            with profiler.stage("publish"):
+                self.__publish_results(frame, records)
+            if self.video is not None:
+                with profiler.stage("video"):
+                    self.video.put(frame, records)
+
+            if count % 30 == 0:
+                print("[CAM] Average detection time : {} ms | FPS {}".format(round(exec_time_avg/count, 2), round(fps_avg/count, 1)))
+                    
+            if frame_source.interactive and cv2.waitKey(1) == ord('q'):
+                print("[*] Exiting ..")
+                break
 
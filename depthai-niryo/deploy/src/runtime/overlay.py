@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""Overlay of the detections on the rgb frames
+
+This module demonstrates how to annotate every frame at a bounded cost. The text is never
+rasterized on the frame : each line of text (class and confidence of every class, groups of
+three digits followed or not by the unit) is drawn once in a cache of masks the first time it
+is needed, then a frame only copies the masks in place (``cv2.copyTo``). The masks are found
+by index from the values themselves, without formatting strings. The time spent on each frame
+is measured, once the budget of a frame is spent the remaining detections only get their box.
+
+Detail levels :
+
+    * ``box``   : boxes only
+    * ``label`` : boxes, class and confidence
+    * ``full``  : boxes, class, confidence and spatial coordinates
+"""
+
+import time
+import cv2
+import numpy as np
+from typing import Dict, Sequence, Tuple
+
+DETAIL_BOX, DETAIL_LABEL, DETAIL_FULL = 0, 1, 2
+DETAILS = {"box": DETAIL_BOX, "label": DETAIL_LABEL, "full": DETAIL_FULL}
+
+def parse_detail(detail) -> int:
+    """Detail level from its name or its value"""
+    if isinstance(detail, int):
+        return detail
+    try:
+        return DETAILS[str(detail).strip().lower()]
+    except KeyError:
+        raise ValueError("Unknown overlay detail {}, expected one of {}".format(detail, tuple(DETAILS)))
+
+class GlyphCache(object):
+    """Masks of rendered strings, drawn once
+
+    Every mask has the same height (the tallest glyph of the font) so that they line up.
+
+    Attributes:
+        height (int): Height of the masks in pixels
+    """
+    def __init__(self, font: int=cv2.FONT_HERSHEY_SIMPLEX, scale: float=0.4, thickness: int=1) -> None:
+        self.font = font
+        self.scale = scale
+        self.thickness = thickness
+        (_, ascent), descent = cv2.getTextSize("Xg|", font, scale, thickness)
+        self._origin = ascent + 1
+        self.height = ascent + descent + 2
+        self._glyphs = {}
+
+    def __len__(self) -> int:
+        return len(self._glyphs)
+
+    def render(self, text: str) -> Tuple[np.ndarray, int]:
+        """uint8 mask (height, width) of a string and its advance in pixels"""
+        (width, _), _ = cv2.getTextSize(text, self.font, self.scale, self.thickness)
+        mask = np.zeros((self.height, width + 2), dtype=np.uint8)
+        # no antialiasing : the mask is exactly the pixels putText would have drawn
+        cv2.putText(mask, text, (1, self._origin), self.font, self.scale, 255, self.thickness, cv2.LINE_8)
+        return mask, width
+
+    def get(self, text: str) -> Tuple[np.ndarray, int]:
+        """Cached :obj:`render`"""
+        glyph = self._glyphs.get(text)
+        if glyph is None:
+            glyph = self._glyphs[text] = self.render(text)
+        return glyph
+
+class OverlayRenderer(object):
+    """Draw the detection records of a frame in place
+
+    Not thread safe, each thread drawing frames needs its own renderer.
+
+    Attributes:
+        labels       (list): Label names of the model
+        detail        (int): ``DETAIL_BOX``, ``DETAIL_LABEL`` or ``DETAIL_FULL``
+        color       (tuple): BGR color of the boxes and the text
+        budget_ms   (float): Time of a frame after which the text is skipped, 0 for no limit
+        frames        (int): Frames drawn
+        degraded      (int): Frames whose budget was spent before the last detection
+        last_ms     (float): Time of the last frame
+        max_ms      (float): Longest frame
+    """
+    def __init__(self, labels: Sequence[str], detail=DETAIL_FULL, color: tuple=(255, 255, 255),
+        budget_ms: float=2., scale: float=0.4, clock=time.perf_counter) -> None:
+        self.labels = list(labels)
+        self.detail = parse_detail(detail)
+        self.color = tuple(int(c) for c in color)
+        self.budget_ms = budget_ms
+        self.clock = clock
+        self.glyphs = GlyphCache(scale=scale)
+        self._patch = np.empty((self.glyphs.height, 0, 3), dtype=np.uint8)
+        # text buffers, filled the first time each line is drawn (at most a few MB) :
+        # "<class> <confidence>%" for every class, "<axis> [-]<n> mm", "<n>" and "<nnn> mm" for n < 1000
+        self._label_lines = [[None] * 101 for _ in self.labels]
+        self._coordinates = [[[None] * 1000, [None] * 1000] for _ in range(3)]
+        self._numbers = [None] * 1000
+        self._padded_millimeters = [None] * 1000
+        self._axes = [(self.__glyph(axis + " "), self.__glyph(axis + " -")) for axis in "xyz"]
+        self._fps = self.__glyph("fps ")
+        self.reset()
+
+    def reset(self) -> None:
+        self.frames = 0
+        self.degraded = 0
+        self.last_ms = 0.
+        self.max_ms = 0.
+        self._total_ms = 0.
+
+    def report(self) -> Dict[str, float]:
+        """Frames drawn and time per frame (ms)"""
+        return {"frames": self.frames, "degraded": self.degraded, "last_ms": round(self.last_ms, 3),
+            "mean_ms": round(self._total_ms / self.frames, 3) if self.frames else 0., "max_ms": round(self.max_ms, 3),
+            "glyphs": len(self.glyphs) + sum(glyph is not None for table in [self._numbers, self._padded_millimeters]
+                + self._label_lines + [signs for axis in self._coordinates for signs in axis] for glyph in table)}
+
+    def __glyph(self, text: str, cached: bool=True) -> Tuple[np.ndarray, int, np.ndarray]:
+        """Mask, advance and the block of color of the size of the mask"""
+        mask, advance = self.glyphs.get(text) if cached else self.glyphs.render(text)
+        width = mask.shape[1]
+        if width > self._patch.shape[1]:
+            # plain color block the masks are copied from, as wide as the widest mask
+            self._patch = np.empty((self.glyphs.height, max(width, 2 * self._patch.shape[1]), 3), dtype=np.uint8)
+            self._patch[:] = self.color
+        return mask, advance, self._patch[:, :width]
+
+    def __cached(self, table: list, index: int, text: str) -> Tuple[np.ndarray, int, np.ndarray]:
+        glyph = table[index]
+        if glyph is None:
+            glyph = table[index] = self.__glyph(text.format(index), cached=False)
+        return glyph
+
+    def __label_line(self, label: int, confidence: float) -> Tuple[np.ndarray, int, np.ndarray]:
+        percent = min(max(int(confidence * 100), 0), 100)
+        if 0 <= label < len(self._label_lines):
+            glyph = self._label_lines[label][percent]
+            if glyph is None:
+                glyph = self._label_lines[label][percent] = self.__glyph("{} {}%".format(self.labels[label], percent), cached=False)
+            return glyph
+        # unknown ids are named after their number, as in the mqtt payload
+        return self.__glyph("{} {}%".format(label, percent))
+
+    def __blit(self, image: np.ndarray, glyph: tuple, x: int, y: int) -> int:
+        """Copy a glyph at (x, y) top left, clipped to the image, return the x of the next one"""
+        mask, advance, patch = glyph
+        height, width = mask.shape
+        if x >= 0 and y >= 0 and x + width <= image.shape[1] and y + height <= image.shape[0]:
+            cv2.copyTo(patch, mask, image[y:y + height, x:x + width])
+            return x + advance
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, image.shape[1]), min(y + height, image.shape[0])
+        if x0 < x1 and y0 < y1:
+            cv2.copyTo(patch[y0 - y:y1 - y, x0 - x:x1 - x], mask[y0 - y:y1 - y, x0 - x:x1 - x], image[y0:y1, x0:x1])
+        return x + advance
+
+    def __millimeters(self, image: np.ndarray, axis: int, value: int, x: int, y: int) -> None:
+        """Line "<axis> <value> mm", at most three glyphs"""
+        negative = value < 0
+        value = min(abs(value), 999999)
+        if value < 1000:
+            # one glyph for the whole line
+            glyph = self._coordinates[axis][negative][value]
+            if glyph is None:
+                glyph = self._coordinates[axis][negative][value] = self.__glyph("{} {}{} mm".format(
+                    "xyz"[axis], "-" if negative else "", value), cached=False)
+            self.__blit(image, glyph, x, y)
+        else:
+            x = self.__blit(image, self._axes[axis][negative], x, y)
+            x = self.__blit(image, self.__cached(self._numbers, value // 1000, "{}"), x, y)
+            self.__blit(image, self.__cached(self._padded_millimeters, value % 1000, "{:03d} mm"), x, y)
+
+    def draw(self, image: np.ndarray, records: np.ndarray, fps: float=None) -> float:
+        """Draw the boxes and the text of an array of ``DETECTION_DTYPE`` on a BGR image
+
+        Returns:
+            float: Time spent (ms)
+        """
+        start = self.clock()
+        deadline = start + self.budget_ms / 1000. if self.budget_ms else None
+        text = self.detail > DETAIL_BOX
+        degraded = False
+        if len(records):
+            # one conversion per column instead of one record object per detection
+            labels, confidences = records["label"].tolist(), records["confidence"].tolist()
+            x1s, x2s, y1s, y2s = records["x1"].tolist(), records["x2"].tolist(), records["y1"].tolist(), records["y2"].tolist()
+            positions = (records["x"].tolist(), records["y"].tolist(), records["z"].tolist()) if self.detail >= DETAIL_FULL else ()
+            line = self.glyphs.height
+            for i in range(len(labels)):
+                x1, y1 = x1s[i], y1s[i]
+                cv2.rectangle(image, (x1, y1), (x2s[i], y2s[i]), self.color, 1)
+                if not text:
+                    continue
+                if deadline is not None and self.clock() > deadline:
+                    # the remaining detections keep their box
+                    text, degraded = False, True
+                    continue
+                y = y1 + 2
+                self.__blit(image, self.__label_line(labels[i], confidences[i]), x1 + 3, y)
+                for axis, values in enumerate(positions):
+                    y += line
+                    self.__millimeters(image, axis, int(values[i]), x1 + 3, y)
+        if fps is not None:
+            y = image.shape[0] - self.glyphs.height - 2
+            x = self.__blit(image, self._fps, 2, y)
+            self.__blit(image, self.__cached(self._numbers, min(max(int(round(fps)), 0), 999), "{}"), x, y)
+        elapsed = (self.clock() - start) * 1000.
+        self.frames += 1
+        self.degraded += degraded
+        self.last_ms = elapsed
+        self.max_ms = max(self.max_ms, elapsed)
+        self._total_ms += elapsed
+        return elapsed
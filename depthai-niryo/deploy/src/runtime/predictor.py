@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Intercept predictor
+
+This module demonstrates how to grab an object moving on the conveyor in one move. The
+positions of the object in the robot base are observed while the arm is still, the velocity
+of the conveyor is their least squares slope over time. The intercept is where the object will
+be once the robot reached it, the time the robot needs being measured on the previous picks.
+"""
+
+import numpy as np
+from collections import deque
+from typing import NamedTuple, Optional, Tuple
+
+class Intercept(NamedTuple):
+    """Where and when to grab the object
+
+    Attributes:
+        x, y       (float): Position of the object in the robot base (m) at ``time``
+        time       (float): Time the gripper reaches the object, in the clock of the observations
+        vx, vy     (float): Velocity of the object (m/s)
+    """
+    x: float
+    y: float
+    time: float
+    vx: float
+    vy: float
+
+class LatencyEstimator(object):
+    """Exponential moving average of a measured duration
+
+    Attributes:
+        value      (float): Current estimate in seconds
+        smoothing  (float): Weight of a new measure
+        count        (int): Number of measures
+    """
+    def __init__(self, initial: float=1., smoothing: float=0.3) -> None:
+        self.value = initial
+        self.smoothing = smoothing
+        self.count = 0
+
+    def update(self, duration: float) -> float:
+        # the first measure replaces the initial guess
+        weight = 1. if self.count == 0 else self.smoothing
+        self.value += weight * (duration - self.value)
+        self.count += 1
+        return self.value
+
+class InterceptPredictor(object):
+    """Estimate the conveyor velocity and the intercept point of an object
+
+    Attributes:
+        min_samples    (int): Observations needed before predicting
+        max_samples    (int): Observations kept, the oldest are forgotten
+        max_age      (float): Observations older than this (s) are forgotten
+        max_speed    (float): Velocities above this (m/s) are treated as outliers, no prediction
+        latency (:obj:`LatencyEstimator`): Time between the decision and the gripper reaching the object
+    """
+    def __init__(self, min_samples: int=3, max_samples: int=15, max_age: float=1., max_speed: float=0.5,
+        latency: LatencyEstimator=None) -> None:
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.max_age = max_age
+        self.max_speed = max_speed
+        self.latency = latency if latency is not None else LatencyEstimator()
+        self._samples = deque(maxlen=max_samples)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    @property
+    def ready(self) -> bool:
+        return len(self._samples) >= self.min_samples
+
+    def reset(self) -> None:
+        """Forget the observations (new object)"""
+        self._samples.clear()
+
+    def observe(self, timestamp: float, x: float, y: float) -> None:
+        """Add a position (m, robot base) of the object seen at ``timestamp``"""
+        if self._samples and timestamp <= self._samples[-1][0]:
+            return
+        self._samples.append((timestamp, x, y))
+        while self._samples[0][0] < timestamp - self.max_age:
+            self._samples.popleft()
+
+    def fit(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Least squares fit, return the mean [t, x, y] and the velocity [vx, vy], None without enough samples"""
+        if not self.ready:
+            return None
+        samples = np.array(self._samples)
+        mean = samples.mean(axis=0)
+        centered = samples - mean
+        spread = np.dot(centered[:, 0], centered[:, 0])
+        if spread <= 0:
+            return None
+        velocity = centered[:, 0] @ centered[:, 1:] / spread
+        return mean, velocity
+
+    def predict(self, now: float) -> Optional[Intercept]:
+        """Intercept of the object if the robot starts moving at ``now``
+
+        Returns:
+            :obj:`Intercept`, None without enough observations or with an outlier velocity
+        """
+        fit = self.fit()
+        if fit is None:
+            return None
+        mean, velocity = fit
+        if np.hypot(*velocity) > self.max_speed:
+            return None
+        time = now + self.latency.value
+        x, y = mean[1:] + velocity * (time - mean[0])
+        return Intercept(float(x), float(y), time, float(velocity[0]), float(velocity[1]))
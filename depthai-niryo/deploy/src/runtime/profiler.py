@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Loop profiler
+
+This module demonstrates a lightweight profiler timing the stages of the detection loop
+(frame acquisition, roi computation, robot calls, mqtt publishing) and counting events
+such as picks. It is disabled by default, :obj:`NullProfiler` costs a method call per stage.
+"""
+
+import threading, time
+import numpy as np
+from typing import Dict
+
+class _Stage(object):
+    """Context manager adding its duration to a stage of the profiler"""
+    __slots__ = ("_samples", "_start")
+
+    def __init__(self, samples: list) -> None:
+        self._samples = samples
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._samples.append(time.perf_counter() - self._start)
+
+class _NullStage(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+class NullProfiler(object):
+    """Profiler doing nothing, used when the loop is not benchmarked"""
+    _stage = _NullStage()
+
+    def stage(self, name: str):
+        return self._stage
+
+    def count(self, name: str, value: int=1) -> None:
+        pass
+
+class LoopProfiler(object):
+    """Collect latency samples per stage and counters
+
+    Examples:
+        >>> profiler = LoopProfiler()
+        >>> with profiler.stage("get_frame"):
+        ...     frame = source.read()
+        >>> profiler.count("picks")
+        >>> profiler.report()["stages"]["get_frame"]["p50_ms"]
+
+    Attributes:
+        samples  (dict): Durations in seconds per stage name
+        counters (dict): Event counters per name
+    """
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self) -> None:
+        self.samples = {}
+        self.counters = {}
+        self._stages = {}
+        # the camera loop and the robot executor count events from their own thread
+        self._counters_lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def stage(self, name: str) -> _Stage:
+        """Context manager timing one execution of a stage"""
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = _Stage(self.samples.setdefault(name, []))
+        return stage
+
+    def count(self, name: str, value: int=1) -> None:
+        """Increment an event counter"""
+        with self._counters_lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @property
+    def elapsed(self) -> float:
+        """float: Seconds since the profiler was created"""
+        return time.perf_counter() - self._start
+
+    def report(self) -> Dict:
+        """Percentiles in milliseconds per stage and counters per second"""
+        elapsed = self.elapsed
+        with self._counters_lock:
+            counters = dict(self.counters)
+        stages = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            values = np.asarray(samples) * 1000
+            stage = {"count": len(values), "mean_ms": round(float(values.mean()), 4), "max_ms": round(float(values.max()), 4)}
+            for q, v in zip(self.PERCENTILES, np.percentile(values, self.PERCENTILES)):
+                stage["p{}_ms".format(q)] = round(float(v), 4)
+            stages[name] = stage
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "stages": stages,
+            "counters": counters,
+            "rates_per_s": {name: round(value / elapsed, 4) for name, value in counters.items()} if elapsed > 0 else {}
+        }
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Robot executor
+
+This module demonstrates the consumer side of the detection loop. The camera loop puts the
+detections to grab in a :obj:`LatestChannel`, the executor runs the grabing sequence of the
+Niryo on its own thread so the camera keeps its frame rate while the arm moves.
+
+The camera is mounted on the end effector : every frame captured while the arm was moving
+gives coordinates relative to an old position. After each move the executor only accepts
+detections captured once the move was over.
+
+With an :obj:`InterceptPredictor` the roi loop is replaced : once the camera looks down at the
+conveyor the arm stays still while the object is observed, then a single move brings the
+gripper where the object will be when the robot gets there.
+"""
+
+import threading, time
+from typing import Callable, NamedTuple, Optional
+from ..niryo import Niryo
+from ..utils import global_var
+from .channel import LatestChannel
+from .predictor import InterceptPredictor
+from .profiler import NullProfiler
+
+class Target(NamedTuple):
+    """Detection to grab, coordinates in the camera base (mm)
+
+    Attributes:
+        x, y, z   (float): Spatial coordinates of the object
+        label       (str): Label of the object
+        timestamp (float): Capture time of the frame, in the clock of the frame source
+        seq         (int): Sequence number of the frame
+        track_id    (int): Id of the object given by the :obj:`Tracker`, None if untracked
+    """
+    x: float
+    y: float
+    z: float
+    label: str
+    timestamp: float
+    seq: int
+    track_id: int = None
+
+class RobotExecutor(threading.Thread):
+    """Thread running the grabing sequence on the freshest target
+
+    Sequence :
+        * first move to the roi from the stand by position
+        * roi loop until the object is centered under the camera, or with a predictor
+          observations of the object then one move to its intercept point
+        * dive and grab the object
+
+    If no fresh target arrives during ``standby_timeout`` seconds in the middle of a sequence,
+    the sequence is aborted and the Niryo goes back to its stand by position. While paused the
+    targets are dropped and the current sequence is forgotten, the arm stays where it is.
+
+    Attributes:
+        channel (:obj:`LatestChannel`): Channel fed by the camera loop
+        clock              (Callable): Clock of the frame source, used to reject stale targets
+        standby_timeout       (float): Seconds without target before aborting a sequence
+        profiler    (:obj:`LoopProfiler`): Profiler timing the robot stages
+        predictor (:obj:`InterceptPredictor`): Conveyor velocity estimation, None for the roi loop
+        max_observations        (int): Targets observed before grabing even without a prediction
+    """
+    def __init__(self, channel: LatestChannel, clock: Callable[[], float]=None, standby_timeout: float=1.5, profiler=None,
+        predictor: InterceptPredictor=None, max_observations: int=10) -> None:
+        super().__init__(name="robot-executor", daemon=True)
+        self.channel = channel
+        self.clock = clock if clock is not None else time.monotonic
+        self.standby_timeout = standby_timeout
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.predictor = predictor
+        self.max_observations = max_observations
+        self._observations = 0
+        self._observed_track = None
+        self._did_i_do_first_move = False
+        self._is_satisfying_pos = False
+        self._last_move_end = None
+        self._stop_event = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def in_sequence(self) -> bool:
+        """bool: True between the first move and the grab"""
+        return self._did_i_do_first_move
+
+    @property
+    def last_move_end(self) -> Optional[float]:
+        """float: End of the last move of the arm in the clock of the executor, None before the first one"""
+        return self._last_move_end
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def pause(self) -> None:
+        """Stop grabing after the current move"""
+        self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    def stop(self, timeout: float=None) -> None:
+        """Stop after the current move and wait for the thread"""
+        self._stop_event.set()
+        self._running.set()
+        self.channel.close()
+        if self.is_alive():
+            self.join(timeout)
+
+    def __reset(self) -> None:
+        self._is_satisfying_pos = False
+        self._did_i_do_first_move = False
+        self._observations = 0
+        self._observed_track = None
+        if self.predictor is not None:
+            self.predictor.reset()
+
+    def __abort(self, niryo: Niryo) -> None:
+        print("[NYRYO] Sequence abort, moving to standard position ..")
+        niryo.position = niryo.stand_by
+        self.__reset()
+        self.profiler.count("aborts")
+
+    def __intercept(self, niryo: Niryo, target: Target) -> None:
+        """Observe the object from the still arm, grab it at its intercept point once predicted"""
+        if target.track_id != self._observed_track:
+            # another object, its past positions say nothing
+            self.predictor.reset()
+            self._observed_track = target.track_id
+        x, y = niryo.camera_to_robot(target.x, target.y)
+        self.predictor.observe(target.timestamp, x, y)
+        self._observations += 1
+        start = self.clock()
+        intercept = self.predictor.predict(start)
+        if intercept is None:
+            if not self.predictor.ready and self._observations < self.max_observations:
+                return
+            # outlier velocity or object lost in between, grab where it was last seen
+            self.profiler.count("no_prediction")
+        else:
+            x, y = intercept.x, intercept.y
+        with self.profiler.stage("niryo_intercept"):
+            niryo.seq_intercept(x, y)
+        self.predictor.latency.update(self.clock() - start)
+        with self.profiler.stage("niryo_grab"):
+            niryo.seq_leave()
+        self.profiler.count("picks")
+        self.__reset()
+
+    def step(self, niryo: Niryo, target: Target) -> None:
+        """Run one step of the grabing sequence with a fresh target"""
+        x, y, z = target.x, target.y, target.z
+        if self._did_i_do_first_move == False:
+            with self.profiler.stage("niryo_first_move"):
+                if niryo.seq_first_move_to_roi(x, y, z):
+                    self._did_i_do_first_move = True
+        elif self.predictor is not None:
+            self.__intercept(niryo, target)
+        elif not self._is_satisfying_pos:
+            with self.profiler.stage("niryo_roi_loop"):
+                self._is_satisfying_pos = niryo.seq_do_roi_loop(x, y, z)
+        if self._is_satisfying_pos:
+            # Go to Z and grab the object
+            with self.profiler.stage("niryo_grab"):
+                niryo.seq_grab_object(x, y, z)
+            self.profiler.count("picks")
+            self.__reset()
+
+    def run(self) -> None:
+        print("[NIRYO] Robot executor started")
+        while not self._stop_event.is_set():
+            if self.paused:
+                self.__reset()
+                self.channel.clear()
+                if self._running.wait(self.standby_timeout):
+                    # the arm may have been moved while paused
+                    self._last_move_end = self.clock()
+                continue
+            target = self.channel.get(timeout=self.standby_timeout, newer_than=self._last_move_end)
+            niryo = global_var.NIRYO
+            if not isinstance(niryo, Niryo):
+                self.__reset()
+                continue
+            if target is None:
+                if self._did_i_do_first_move and not self._stop_event.is_set():
+                    # niryo trapped in the sequence
+                    self.__abort(niryo)
+                    self._last_move_end = self.clock()
+                continue
+            self.profiler.count("targets")
+            self.step(niryo, target)
+            # frames captured until now were taken while the arm was moving
+            self._last_move_end = self.clock()
+        print("[NIRYO] Robot executor stopped")
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""Synchronization of the output queues of the device
+
+This module demonstrates how to put together the messages of one frame coming from several
+depthai queues, and how much each of them costs on the link. Every queue is drained without blocking (``tryGetAll``), the messages are kept
+in a bounded buffer keyed by sequence number, and only the newest complete set is returned :
+the older ones are dropped instead of piling up latency.
+
+Streams from the same sensor as the detections (the rgb passthrough) share their sequence
+numbers. Streams from other sensors (the depth computed from the mono cameras) have their own
+numbering, they are matched with the nearest timestamp instead.
+"""
+
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, Optional
+
+def message_size(message: Any) -> int:
+    """Bytes of the payload of a depthai message (detections only carry metadata, 0)"""
+    return message.getData().nbytes
+
+class StreamMeter(object):
+    """Messages and bytes received on each stream
+
+    Attributes:
+        messages (dict): Messages received per stream
+        bytes    (dict): Payload bytes received per stream
+    """
+    def __init__(self, clock=time.monotonic) -> None:
+        self.clock = clock
+        self.reset()
+
+    def reset(self) -> None:
+        self.messages = {}
+        self.bytes = {}
+        self._start = self.clock()
+
+    def add(self, name: str, message: Any) -> None:
+        self.messages[name] = self.messages.get(name, 0) + 1
+        self.bytes[name] = self.bytes.get(name, 0) + message_size(message)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Messages/s and bytes/s of every stream since the last reset"""
+        elapsed = max(self.clock() - self._start, 1e-9)
+        return {name: {"messages_per_s": round(count / elapsed, 2), "bytes_per_s": round(self.bytes[name] / elapsed, 1)}
+            for name, count in self.messages.items()}
+
+class SequenceSynchronizer(object):
+    """Match the messages of several streams belonging to the same frame
+
+    Attributes:
+        streams           (tuple): Streams matched by sequence number
+        timestamp_streams (tuple): Streams matched by the nearest timestamp
+        tolerance         (float): Maximum gap (s) between a timestamp matched message and its frame
+        capacity            (int): Frames (and messages per timestamp stream) kept in the buffer
+        emitted             (int): Complete sets returned
+        dropped             (int): Complete sets skipped because a newer one was ready
+        mismatched          (int): Sets that never got all their messages
+    """
+    def __init__(self, streams: Iterable[str], timestamp_streams: Iterable[str]=(), tolerance: float=0.02, capacity: int=8) -> None:
+        self.streams = tuple(streams)
+        self.timestamp_streams = tuple(timestamp_streams)
+        self.tolerance = tolerance
+        self.capacity = capacity
+        self.emitted = 0
+        self.dropped = 0
+        self.mismatched = 0
+        self._frames = OrderedDict()
+        # newest sequence number evicted or emitted, older messages are late
+        self._horizon = None
+        self._pending = {name: deque(maxlen=capacity) for name in self.timestamp_streams}
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def add(self, name: str, seq: int, timestamp: float, message: Any) -> None:
+        """Buffer the message of a stream"""
+        if name in self._pending:
+            self._pending[name].append((timestamp, message))
+            return
+        if self._horizon is not None and seq <= self._horizon:
+            # its frame was already emitted or given up
+            return
+        frame = self._frames.get(seq)
+        if frame is None:
+            frame = self._frames[seq] = {"seq": seq, "timestamp": timestamp}
+            # sequence numbers only grow, a late message may land before the newest ones
+            if len(self._frames) > 1 and seq < next(reversed(self._frames)):
+                self._frames = OrderedDict(sorted(self._frames.items()))
+            while len(self._frames) > self.capacity:
+                self._horizon, _ = self._frames.popitem(last=False)
+                self.mismatched += 1
+        frame[name] = message
+
+    def poll(self, queues: Dict[str, Any], meter: StreamMeter=None) -> int:
+        """Drain depthai output queues without blocking, return the number of messages read"""
+        count = 0
+        for name, queue in queues.items():
+            for message in queue.tryGetAll():
+                if meter is not None:
+                    meter.add(name, message)
+                self.add(name, message.getSequenceNum(), message.getTimestamp().total_seconds(), message)
+                count += 1
+        return count
+
+    def __nearest(self, name: str, timestamp: float) -> Optional[int]:
+        """Index of the pending message of ``name`` closest to ``timestamp``, None if too far"""
+        best, best_gap = None, self.tolerance
+        for i, (pending_timestamp, _) in enumerate(self._pending[name]):
+            gap = abs(pending_timestamp - timestamp)
+            if gap <= best_gap:
+                best, best_gap = i, gap
+        return best
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """Newest complete set, None if no frame is complete yet
+
+        Returns:
+            dict: ``seq``, ``timestamp`` and the message of every stream
+        """
+        for seq in reversed(self._frames):
+            frame = self._frames[seq]
+            if not all(name in frame for name in self.streams):
+                continue
+            matches = {name: self.__nearest(name, frame["timestamp"]) for name in self.timestamp_streams}
+            if any(index is None for index in matches.values()):
+                continue
+            for name, index in matches.items():
+                pending = self._pending[name]
+                frame[name] = pending[index][1]
+                # older messages can only match older frames
+                for _ in range(index + 1):
+                    pending.popleft()
+            # every older frame is stale now
+            while True:
+                older_seq, older = self._frames.popitem(last=False)
+                if older_seq == seq:
+                    break
+                if all(name in older for name in self.streams):
+                    self.dropped += 1
+                else:
+                    self.mismatched += 1
+            self._horizon = seq
+            self.emitted += 1
+            return frame
+        return None
+
+    def counters(self) -> Dict[str, int]:
+        return {"sync_emitted": self.emitted, "sync_dropped": self.dropped, "sync_mismatched": self.mismatched}
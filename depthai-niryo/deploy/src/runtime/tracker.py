@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""Multi-object tracker
+
+This module demonstrates a tracker giving the same id to an object from one frame to the next.
+Detections are associated with the tracks of the same label by the overlap of their boxes (IoU)
+and the distance between their 3D centroids, both computed for every pair at once with NumPy.
+The spatial coordinates of each track are smoothed with an exponential moving average, a
+detection without depth (0, 0, 0) keeps the last known position of its track. The camera is
+mounted on the arm : once the arm has moved, the positions seen before are in another frame,
+the first detection after the move restarts the average of its track.
+"""
+
+import numpy as np
+from typing import Tuple
+
+def iou_matrix(boxes: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """IoU of every pair of boxes
+
+    Arguments:
+        boxes  (:obj:`numpy.ndarray`): (N, 4) boxes xmin, ymin, xmax, ymax
+        others (:obj:`numpy.ndarray`): (M, 4) boxes xmin, ymin, xmax, ymax
+
+    Returns:
+        (N, M) array
+    """
+    top_left = np.maximum(boxes[:, None, :2], others[None, :, :2])
+    bottom_right = np.minimum(boxes[:, None, 2:], others[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    other_areas = np.prod(others[:, 2:] - others[:, :2], axis=1)
+    union = areas[:, None] + other_areas[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+class Tracker(object):
+    """Associate the detections of consecutive frames
+
+    Tracks are stored as arrays (one row per track) so the association of a frame is a few
+    vectorized operations whatever the number of objects.
+
+    Attributes:
+        iou_threshold      (float): Minimum IoU for a detection to continue a track
+        distance_threshold (float): Maximum distance (mm) between centroids to continue a track
+        smoothing          (float): Weight of the new position in the moving average, 1 disables it
+        max_misses           (int): Frames a track survives without detection
+        next_id              (int): Id of the next track
+    """
+    def __init__(self, iou_threshold: float=0.2, distance_threshold: float=60., smoothing: float=0.5, max_misses: int=10) -> None:
+        self.iou_threshold = iou_threshold
+        self.distance_threshold = distance_threshold
+        self.smoothing = smoothing
+        self.max_misses = max_misses
+        self.next_id = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every track"""
+        self.ids = np.empty(0, dtype=np.int64)
+        self.labels = np.empty(0, dtype=np.int64)
+        self.boxes = np.empty((0, 4), dtype=np.float64)
+        self.positions = np.empty((0, 3), dtype=np.float64)
+        self.hits = np.empty(0, dtype=np.int64)
+        self.misses = np.empty(0, dtype=np.int64)
+        self.last_seen = np.empty(0, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __associate(self, boxes: np.ndarray, positions: np.ndarray, labels: np.ndarray, moved: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Greedy association on the best scores, return the matched (detection, track) indexes"""
+        iou = iou_matrix(boxes, self.boxes)
+        distance = np.linalg.norm(positions[:, None, :] - self.positions[None, :, :], axis=2)
+        # a detection without depth, or a track last seen before the arm moved, can only be associated by its box
+        has_depth = np.any(positions != 0, axis=1)[:, None] & (np.any(self.positions != 0, axis=1) & ~moved)[None, :]
+        close = has_depth & (distance <= self.distance_threshold)
+        valid = (labels[:, None] == self.labels[None, :]) & ((iou >= self.iou_threshold) | close)
+        score = iou + np.where(close, 1. - distance / self.distance_threshold, 0.)
+        score[~valid] = -np.inf
+
+        detections, tracks = [], []
+        order = np.argsort(score, axis=None)[::-1][:np.count_nonzero(valid)]
+        used_detections = np.zeros(len(boxes), dtype=bool)
+        used_tracks = np.zeros(len(self.ids), dtype=bool)
+        for detection, track in zip(*np.unravel_index(order, score.shape)):
+            if not used_detections[detection] and not used_tracks[track]:
+                used_detections[detection] = used_tracks[track] = True
+                detections.append(detection)
+                tracks.append(track)
+        return np.array(detections, dtype=np.int64), np.array(tracks, dtype=np.int64)
+
+    def update(self, boxes: np.ndarray, positions: np.ndarray, labels: np.ndarray, timestamp: float=0.,
+        moved_at: float=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Associate the detections of a frame with the tracks
+
+        Arguments:
+            boxes     (:obj:`numpy.ndarray`): (N, 4) boxes xmin, ymin, xmax, ymax, normalized or in pixels
+            positions (:obj:`numpy.ndarray`): (N, 3) spatial coordinates (mm), zeros when the depth is unknown
+            labels    (:obj:`numpy.ndarray`): (N,) label ids
+            timestamp (:obj:`float`, optional): Capture time of the frame
+            moved_at  (:obj:`float`, optional): End of the last move of the arm, in the clock of the timestamps,
+                the positions of the tracks last seen before are not averaged with the new ones
+
+        Returns:
+            (N,) track id of every detection and (N, 3) smoothed positions of their tracks
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        labels = np.asarray(labels, dtype=np.int64).reshape(-1)
+        n = len(boxes)
+
+        moved = self.last_seen <= moved_at if moved_at is not None and timestamp > moved_at else np.zeros(len(self.ids), dtype=bool)
+        detections, tracks = self.__associate(boxes, positions, labels, moved)
+        # continued tracks
+        self.boxes[tracks] = boxes[detections]
+        observed = np.any(positions[detections] != 0, axis=1)
+        known = np.any(self.positions[tracks] != 0, axis=1) & ~moved[tracks]
+        weight = np.where(known, self.smoothing, 1.)[:, None]
+        smoothed = weight * positions[detections] + (1. - weight) * self.positions[tracks]
+        # a position seen before the move is unknown in the new frame
+        previous = np.where(moved[tracks][:, None], 0., self.positions[tracks])
+        self.positions[tracks] = np.where(observed[:, None], smoothed, previous)
+        self.hits[tracks] += 1
+        self.misses += 1
+        self.misses[tracks] = 0
+        self.last_seen[tracks] = timestamp
+
+        # new tracks for the remaining detections
+        new = np.ones(n, dtype=bool)
+        new[detections] = False
+        new_count = int(np.count_nonzero(new))
+        new_ids = np.arange(self.next_id, self.next_id + new_count)
+        self.next_id += new_count
+        self.ids = np.concatenate([self.ids, new_ids])
+        self.labels = np.concatenate([self.labels, labels[new]])
+        self.boxes = np.concatenate([self.boxes, boxes[new]])
+        self.positions = np.concatenate([self.positions, positions[new]])
+        self.hits = np.concatenate([self.hits, np.ones(new_count, dtype=np.int64)])
+        self.misses = np.concatenate([self.misses, np.zeros(new_count, dtype=np.int64)])
+        self.last_seen = np.concatenate([self.last_seen, np.full(new_count, timestamp)])
+
+        # index of the track of every detection, before dropping the lost tracks
+        rows = np.empty(n, dtype=np.int64)
+        rows[detections] = tracks
+        rows[new] = np.arange(len(self.ids) - new_count, len(self.ids))
+        ids, smoothed = self.ids[rows], self.positions[rows]
+
+        alive = self.misses <= self.max_misses
+        if not alive.all():
+            for name in ("ids", "labels", "boxes", "positions", "hits", "misses", "last_seen"):
+                setattr(self, name, getattr(self, name)[alive])
+        return ids, smoothed
+
+    def hits_of(self, track_id: int) -> int:
+        """Number of frames the track was seen in, 0 if it is lost"""
+        index = np.flatnonzero(self.ids == track_id)
+        return int(self.hits[index[0]]) if len(index) else 0
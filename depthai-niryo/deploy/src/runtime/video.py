@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Annotated video stream
+
+This module demonstrates how to watch the detections without a display. The detection loop
+puts its latest frame in a slot, a background thread draws the detections on it and encodes it
+in JPEG once, whatever the number of clients reading the MJPEG stream or the snapshots.
+
+When nobody watches, the loop does not even copy its frames and the thread sleeps. The
+threads (benchmarks) wait for the frames on a condition, the api waits on an ``asyncio.Event``
+of its event loop, set by the thread when a frame is encoded : a client never holds a thread.
+"""
+
+import asyncio, threading, time
+import cv2
+import numpy as np
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Tuple
+from .overlay import OverlayRenderer
+
+BOUNDARY = "frame"
+
+def multipart_part(jpeg: bytes) -> bytes:
+    """One part of a ``multipart/x-mixed-replace`` stream"""
+    return b"--" + BOUNDARY.encode() + b"\r\nContent-Type: image/jpeg\r\nContent-Length: " \
+        + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n"
+
+class VideoStreamer(threading.Thread):
+    """Thread encoding the latest frame for the viewers
+
+    Attributes:
+        quality         (int): JPEG quality
+        renderer (:obj:`OverlayRenderer`): Draws the detections on a copy of the frame, only used by the thread
+        encoded         (int): Frames encoded
+        skipped         (int): Frames put while the previous one was not encoded yet
+    """
+    def __init__(self, quality: int=80, renderer: OverlayRenderer=None, labels: List[str]=(), idle_timeout: float=1.) -> None:
+        super().__init__(name="video-streamer", daemon=True)
+        self.quality = quality
+        self.renderer = renderer if renderer is not None else OverlayRenderer(labels)
+        self.idle_timeout = idle_timeout
+        self.encoded = 0
+        self.skipped = 0
+        self._condition = threading.Condition()
+        self._viewers = 0
+        self._stopped = False
+        # (event loop, event) of every coroutine waiting for a frame
+        self._waiters = set()
+        # latest frame put by the loop
+        self._image = None
+        self._records = None
+        self._seq = None
+        self._fresh = False
+        # latest encoded frame
+        self._jpeg = None
+        self._jpeg_seq = -1
+
+    @property
+    def active(self) -> bool:
+        """bool: True while someone waits for frames"""
+        return self._viewers > 0
+
+    @property
+    def viewers(self) -> int:
+        return self._viewers
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    def put(self, frame, records: np.ndarray) -> bool:
+        """Offer the frame of the loop, only copied while someone watches
+
+        Returns:
+            bool: True if the frame was taken
+        """
+        if not self._viewers or frame.rgb is None:
+            return False
+        with self._condition:
+            if self._image is None or self._image.shape != frame.rgb.shape:
+                self._image = np.empty_like(frame.rgb)
+            # the source may reuse its buffers, the encoding thread works on its own copy
+            np.copyto(self._image, frame.rgb)
+            self._records = records.copy()
+            self._seq = frame.seq
+            if self._fresh:
+                self.skipped += 1
+            self._fresh = True
+            self._condition.notify_all()
+        return True
+
+    def run(self) -> None:
+        image = None
+        while True:
+            with self._condition:
+                while not self._stopped and not (self._fresh and self._viewers):
+                    self._condition.wait()
+                if self._stopped:
+                    break
+                if image is None or image.shape != self._image.shape:
+                    image = np.empty_like(self._image)
+                np.copyto(image, self._image)
+                records, seq = self._records, self._seq
+                self._fresh = False
+            # drawn and encoded outside of the lock, the loop keeps putting frames
+            self.renderer.draw(image, records)
+            ok, jpeg = cv2.imencode(".jpg", image, (cv2.IMWRITE_JPEG_QUALITY, self.quality))
+            if not ok:
+                continue
+            with self._condition:
+                self._jpeg, self._jpeg_seq = jpeg.tobytes(), seq
+                self.encoded += 1
+                self._condition.notify_all()
+                self.__wake()
+
+    def __wake(self) -> None:
+        """Set the events of the waiting coroutines from the thread, called with the lock held"""
+        for loop, event in self._waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # the loop of the waiter was closed
+                pass
+
+    def subscribe(self) -> None:
+        """Count a viewer, the frames are encoded while there is at least one"""
+        with self._condition:
+            self._viewers += 1
+
+    def unsubscribe(self) -> None:
+        with self._condition:
+            self._viewers = max(self._viewers - 1, 0)
+
+    def wait(self, after: int=None, timeout: float=1.) -> Optional[Tuple[int, bytes]]:
+        """Wait for a frame encoded after the frame ``after``
+
+        Returns:
+            tuple: Sequence number and JPEG of the frame, None if no frame came in time
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._jpeg is None or self._jpeg_seq == after:
+                remaining = deadline - time.monotonic()
+                if self._stopped or remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return self._jpeg_seq, self._jpeg
+
+    async def async_wait(self, after: int=None, timeout: float=1.) -> Optional[Tuple[int, bytes]]:
+        """Wait for a frame encoded after the frame ``after`` without blocking the event loop, see :obj:`wait`"""
+        loop = asyncio.get_running_loop()
+        waiter = (loop, asyncio.Event())
+        deadline = loop.time() + timeout
+        with self._condition:
+            self._waiters.add(waiter)
+        try:
+            while True:
+                # cleared before looking at the frame : a frame encoded after the look sets it again
+                waiter[1].clear()
+                with self._condition:
+                    if self._jpeg is not None and self._jpeg_seq != after:
+                        return self._jpeg_seq, self._jpeg
+                    if self._stopped:
+                        return None
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), remaining)
+                except asyncio.TimeoutError:
+                    return None
+        finally:
+            with self._condition:
+                self._waiters.discard(waiter)
+
+    def snapshot(self, timeout: float=2.) -> Optional[bytes]:
+        """JPEG of the next frame, None if no frame came in time"""
+        self.subscribe()
+        try:
+            result = self.wait(self._jpeg_seq, timeout)
+        finally:
+            self.unsubscribe()
+        return result[1] if result is not None else None
+
+    async def async_snapshot(self, timeout: float=2.) -> Optional[bytes]:
+        """JPEG of the next frame, None if no frame came in time, see :obj:`snapshot`"""
+        self.subscribe()
+        try:
+            result = await self.async_wait(self._jpeg_seq, timeout)
+        finally:
+            self.unsubscribe()
+        return result[1] if result is not None else None
+
+    def frames(self) -> Iterator[bytes]:
+        """Parts of a multipart MJPEG stream, one per encoded frame, until the generator is closed"""
+        self.subscribe()
+        last = None
+        try:
+            while not self._stopped:
+                result = self.wait(last, self.idle_timeout)
+                if result is not None:
+                    last, jpeg = result
+                    yield multipart_part(jpeg)
+        finally:
+            self.unsubscribe()
+
+    async def async_frames(self, disconnected: Callable[[], Awaitable[bool]]=None) -> AsyncIterator[bytes]:
+        """Parts of a multipart MJPEG stream for an event loop, see :obj:`frames`
+
+        Arguments:
+            disconnected (:obj:`Callable`, optional): Coroutine function telling if the client left,
+                checked at every frame and at least every ``idle_timeout``
+        """
+        self.subscribe()
+        last = None
+        try:
+            while not self._stopped:
+                if disconnected is not None and await disconnected():
+                    break
+                result = await self.async_wait(last, self.idle_timeout)
+                if result is not None:
+                    last, jpeg = result
+                    yield multipart_part(jpeg)
+        finally:
+            self.unsubscribe()
+
+    def stop(self, timeout: float=1.) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+            self.__wake()
+        if self.is_alive():
+            self.join(timeout)
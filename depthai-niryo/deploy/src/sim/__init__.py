@@ -0,0 +1,2 @@
+from .niryo_server import MockNiryoServer
+from .mqtt_broker import MockMqttBroker
\ No newline at end of file
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Mock MQTT broker
+
+This module demonstrates a minimal MQTT 3.1.1 broker used as a local stand-in of mosquitto.
+It supports CONNECT, PUBLISH (QoS 0 and 1), SUBSCRIBE with ``+``/``#`` wildcards, UNSUBSCRIBE,
+PINGREQ and DISCONNECT, and counts the messages and bytes received per topic.
+Retained messages, QoS 2, sessions and wills are not implemented.
+"""
+
+import asyncio, struct, threading
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """Check if a topic matches a subscription filter with ``+`` and ``#`` wildcards"""
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for i, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if i >= len(topic_levels) or (level != "+" and level != topic_levels[i]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+def encode_remaining_length(length: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        out.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(out)
+
+class MockMqttBroker(object):
+    """Asyncio MQTT broker
+
+    Attributes:
+        host        (str): Address the broker binds to
+        port        (int): Port the broker binds to, 0 picks a free port
+        messages   (dict): Number of PUBLISH received per topic
+        bytes      (dict): Payload bytes received per topic
+        last       (dict): Last payload received per topic
+    """
+    def __init__(self, host: str="127.0.0.1", port: int=1883) -> None:
+        self.host = host
+        self.port = port
+        self.messages = {}
+        self.bytes = {}
+        self.last = {}
+        self._subscriptions = {}
+        self._clients = set()
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def total_messages(self) -> int:
+        return sum(self.messages.values())
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.bytes.values())
+
+    @staticmethod
+    async def _read_packet(reader: asyncio.StreamReader):
+        header = await reader.readexactly(1)
+        multiplier, length = 1, 0
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                break
+            multiplier *= 128
+        body = await reader.readexactly(length) if length else b""
+        return header[0] >> 4, header[0] & 0x0F, body
+
+    @staticmethod
+    def _packet(packet_type: int, flags: int, body: bytes) -> bytes:
+        return bytes([packet_type << 4 | flags]) + encode_remaining_length(len(body)) + body
+
+    def _on_publish(self, flags: int, body: bytes, writer: asyncio.StreamWriter) -> None:
+        qos = (flags >> 1) & 0x03
+        topic_length = struct.unpack_from("!H", body)[0]
+        topic = body[2:2 + topic_length].decode()
+        offset = 2 + topic_length
+        if qos:
+            packet_id = body[offset:offset + 2]
+            offset += 2
+            writer.write(self._packet(PUBACK, 0, packet_id))
+        payload = body[offset:]
+        self.messages[topic] = self.messages.get(topic, 0) + 1
+        self.bytes[topic] = self.bytes.get(topic, 0) + len(payload)
+        self.last[topic] = payload
+        # subscribers receive the message with QoS 0
+        forward = self._packet(PUBLISH, 0, body[:2 + topic_length] + payload)
+        for subscriber, filters in self._subscriptions.items():
+            if any(topic_matches(f, topic) for f in filters):
+                subscriber.write(forward)
+
+    def _on_subscribe(self, body: bytes, writer: asyncio.StreamWriter) -> None:
+        packet_id, offset, granted = body[:2], 2, bytearray()
+        filters = self._subscriptions.setdefault(writer, set())
+        while offset < len(body):
+            length = struct.unpack_from("!H", body, offset)[0]
+            filters.add(body[offset + 2:offset + 2 + length].decode())
+            granted.append(min(body[offset + 2 + length], 1))
+            offset += 3 + length
+        writer.write(self._packet(SUBACK, 0, packet_id + bytes(granted)))
+
+    def _on_unsubscribe(self, body: bytes, writer: asyncio.StreamWriter) -> None:
+        packet_id, offset = body[:2], 2
+        filters = self._subscriptions.get(writer, set())
+        while offset < len(body):
+            length = struct.unpack_from("!H", body, offset)[0]
+            filters.discard(body[offset + 2:offset + 2 + length].decode())
+            offset += 2 + length
+        writer.write(self._packet(UNSUBACK, 0, packet_id))
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients.add(writer)
+        try:
+            while True:
+                packet_type, flags, body = await self._read_packet(reader)
+                if packet_type == CONNECT:
+                    writer.write(self._packet(CONNACK, 0, b"\x00\x00"))
+                elif packet_type == PUBLISH:
+                    self._on_publish(flags, body, writer)
+                elif packet_type == SUBSCRIBE:
+                    self._on_subscribe(body, writer)
+                elif packet_type == UNSUBSCRIBE:
+                    self._on_unsubscribe(body, writer)
+                elif packet_type == PINGREQ:
+                    writer.write(self._packet(PINGRESP, 0, b""))
+                elif packet_type == DISCONNECT:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._subscriptions.pop(writer, None)
+            self._clients.discard(writer)
+            writer.close()
+
+    async def start(self) -> None:
+        """Start listening, the bound port is stored in ``port``"""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def start_in_thread(self) -> "MockMqttBroker":
+        """Run the broker in its own event loop and thread, return once it is listening"""
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def serve():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="mock-mqtt", daemon=True)
+        self._thread.start()
+        ready.wait()
+        print("[SIM] Mock mqtt broker listening on {}:{}".format(self.host, self.port))
+        return self
+
+    def stop_thread(self) -> None:
+        """Stop a broker started with ``start_in_thread``"""
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
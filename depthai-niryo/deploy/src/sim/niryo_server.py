@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+"""Mock Niryo TCP server
+
+This module demonstrates a local stand-in of the NiryoOne tcp server (port 40001).
+It answers the text protocol built by ``PacketBuilder`` (``COMMAND:param1,param2``) with
+``COMMAND:OK[,data]``, ``COMMAND:KO,reason`` or, for long answers, ``COMMAND:OK,SIZE,PAYLOAD``.
+
+Every command of the ``Command`` enum is implemented. The server keeps the state of the robot
+(pose, joints, tool, pins, workspaces, conveyors) and simulates the duration of the motions
+from the arm max velocity, so the latency and the pick-cycle time of :obj:`Niryo` can be
+measured without a physical arm. Several clients can connect at the same time, they share
+the same arm and their motions are executed one after the other.
+
+Examples:
+    Serve on the default port, ten times faster than the real robot:
+
+        >>> server = MockNiryoServer(time_scale=0.1).start_in_thread()
+        >>> niryo = Niryo(ip=server.host, port=server.port)
+"""
+
+import asyncio, math, threading, time
+from typing import List, Tuple
+
+STAND_BY_POSE = [0.10, 0.0, 0.4, 0., 1.2, 0.0]
+MOTOR_NAMES = "['Stepper Axis 1', 'Stepper Axis 2', 'Stepper Axis 3', 'Servo Axis 4', 'Servo Axis 5', 'Servo Axis 6']"
+MOTOR_TYPES = "['Niryo Stepper', 'Niryo Stepper', 'Niryo Stepper', 'DXL XL-430', 'DXL XL-430', 'DXL XL-320']"
+AXES = ["X", "Y", "Z", "ROLL", "PITCH", "YAW"]
+# pin name -> gpio id on the Raspberry Pi
+PINS = {"GPIO_1A": 2, "GPIO_1B": 3, "GPIO_1C": 16, "GPIO_2A": 26, "GPIO_2B": 19, "GPIO_2C": 6}
+GRIPPERS = ("GRIPPER_1", "GRIPPER_2", "GRIPPER_3")
+CONVEYOR_IDS = ("6", "7")
+
+# motion model of the arm at 100% velocity
+MAX_LINEAR_SPEED = 0.25     # m/s
+MAX_ANGULAR_SPEED = 1.5     # rad/s
+PLANNING_LATENCY = 0.1      # s, trajectory planning before every move
+GRIPPER_DURATION = 0.4      # s, at speed 1000
+TOOL_DURATION = 0.2         # s, vacuum pump, electromagnet
+CALIBRATION_DURATION = 2.0  # s
+MAX_REACH = 0.45            # m, horizontal reach of the arm
+
+class CommandError(Exception):
+    """Raised by a handler to answer KO with a reason"""
+    pass
+
+def motion_duration(start: List[float], goal: List[float], velocity: int) -> float:
+    """Duration in seconds of a move between two poses at the given velocity (%)"""
+    ratio = max(velocity, 1) / 100.
+    linear = math.sqrt(sum((g - s) ** 2 for s, g in zip(start[:3], goal[:3])))
+    angular = max(abs(g - s) for s, g in zip(start[3:], goal[3:]))
+    return PLANNING_LATENCY + max(linear / (MAX_LINEAR_SPEED * ratio), angular / (MAX_ANGULAR_SPEED * ratio))
+
+def parse_floats(params: list, count: int) -> List[float]:
+    if len(params) != count:
+        raise CommandError("{} parameters expected, {} given".format(count, len(params)))
+    try:
+        return [float(p) for p in params]
+    except ValueError as e:
+        raise CommandError(str(e))
+
+def parse_bool(value: str) -> bool:
+    if value not in ("TRUE", "FALSE"):
+        raise CommandError("Expected TRUE or FALSE, given {}".format(value))
+    return value == "TRUE"
+
+class MockNiryoServer(object):
+    """Asyncio tcp server answering the NiryoOne protocol
+
+    Attributes:
+        host             (str): Address the server binds to
+        port             (int): Port the server binds to, 0 picks a free port
+        time_scale     (float): Factor applied to every simulated duration, 0 answers immediately
+        command_latency(float): Processing time of every command on the robot side (s)
+        split_delay    (float): When set, every answer is sent in two segments cut in its middle,
+                                the second one this many seconds after the first (split by the network)
+        velocity         (int): Arm max velocity in %
+        commands        (dict): Number of commands received per command name
+        busy_time      (float): Total time spent moving (simulated seconds, before scaling)
+    """
+    def __init__(self, host: str="127.0.0.1", port: int=40001, time_scale: float=1., command_latency: float=0.002,
+        split_delay: float=None) -> None:
+        self.host = host
+        self.port = port
+        self.time_scale = time_scale
+        self.command_latency = command_latency
+        self.split_delay = split_delay
+        self.velocity = 100
+        self.commands = {}
+        self.busy_time = 0.
+        self.calibration_needed = True
+        self.learning_mode = False
+        self.joints = [0., 0.5, -1.25, 0., 0., 0.]
+        self.tool = "NONE"
+        self.pins = {name: {"mode": 1, "state": 0} for name in PINS}
+        self.workspaces = {}
+        self.conveyors = {}
+        self._pose = list(STAND_BY_POSE)
+        self._motion = None
+        self._arm_lock = None
+        self._image = None
+        self._clients = set()
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._handlers = {
+            "CALIBRATE": self._calibrate,
+            "SET_LEARNING_MODE": self._set_learning_mode,
+            "MOVE_JOINTS": self._move_joints,
+            "MOVE_POSE": self._move_pose,
+            "SHIFT_POSE": self._shift_pose,
+            "SET_ARM_MAX_VELOCITY": self._set_arm_max_velocity,
+            "ENABLE_JOYSTICK": self._enable_joystick,
+            "SET_PIN_MODE": self._set_pin_mode,
+            "DIGITAL_WRITE": self._digital_write,
+            "DIGITAL_READ": self._digital_read,
+            "CHANGE_TOOL": self._change_tool,
+            "OPEN_GRIPPER": self._gripper,
+            "CLOSE_GRIPPER": self._gripper,
+            "PULL_AIR_VACUUM_PUMP": self._vacuum_pump,
+            "PUSH_AIR_VACUUM_PUMP": self._vacuum_pump,
+            "SETUP_ELECTROMAGNET": self._electromagnet,
+            "ACTIVATE_ELECTROMAGNET": self._electromagnet,
+            "DEACTIVATE_ELECTROMAGNET": self._electromagnet,
+            "GET_JOINTS": self._get_joints,
+            "GET_POSE": self._get_pose,
+            "GET_HARDWARE_STATUS": self._get_hardware_status,
+            "GET_LEARNING_MODE": self._get_learning_mode,
+            "GET_DIGITAL_IO_STATE": self._get_digital_io_state,
+            "GET_IMAGE_COMPRESSED": self._get_img_compressed,
+            "CREATE_WORKSPACE": self._create_workspace,
+            "REMOVE_WORKSPACE": self._remove_workspace,
+            "GET_TARGET_POSE_FROM_REL": self._get_target_pose_from_rel,
+            "GET_TARGET_POSE_FROM_CAM": self._get_target_pose_from_cam,
+            "DETECT_OBJECT": self._detect_object,
+            "GET_CURRENT_TOOL_ID": self._get_current_tool_id,
+            "GET_WORKSPACE_RATIO": self._get_workspace_ratio,
+            "GET_WORKSPACE_LIST": self._get_workspace_list,
+            "VISION_PICK": self._vision_pick,
+            "MOVE_TO_OBJECT": self._move_to_object,
+            "PICK_FROM_POSE": self._pick_from_pose,
+            "PLACE_FROM_POSE": self._place_from_pose,
+            "SET_CONVEYOR": self._set_conveyor,
+            "CONTROL_CONVEYOR": self._control_conveyor,
+            "UPDATE_CONVEYOR_ID": self._update_conveyor_id,
+            "GET_CALIBRATION_OBJECT": self._get_calibration_object,
+        }
+        # answers sent as STATUS,SIZE,PAYLOAD
+        self._long_answers = {"GET_IMAGE_COMPRESSED", "GET_WORKSPACE_LIST", "GET_CALIBRATION_OBJECT"}
+
+    """ state """
+    @property
+    def pose(self) -> List[float]:
+        """list: Pose of the arm, interpolated when a motion is in progress"""
+        if self._motion is None:
+            return list(self._pose)
+        start, goal, t0, duration = self._motion
+        ratio = min((time.monotonic() - t0) / duration, 1.) if duration > 0 else 1.
+        return [s + (g - s) * ratio for s, g in zip(start, goal)]
+
+    @pose.setter
+    def pose(self, value: List[float]) -> None:
+        self._pose = [float(v) for v in value]
+
+    async def _sleep(self, duration: float) -> None:
+        if self.time_scale > 0 and duration > 0:
+            await asyncio.sleep(duration * self.time_scale)
+
+    def _check_can_move(self) -> None:
+        if self.calibration_needed:
+            raise CommandError("Robot not calibrated")
+        if self.learning_mode:
+            raise CommandError("Learning mode is activated, deactivate it to move the arm")
+
+    @staticmethod
+    def _check_reachable(pose: List[float]) -> None:
+        x, y, z = pose[:3]
+        if math.sqrt(x ** 2 + y ** 2) > MAX_REACH or z < 0. or z > 0.6:
+            raise CommandError("Goal pose ({:.3f}, {:.3f}, {:.3f}) is not reachable".format(x, y, z))
+
+    async def _move(self, goal: List[float]) -> None:
+        """Move the arm to a pose, the arm executes one motion at a time"""
+        self._check_can_move()
+        self._check_reachable(goal)
+        async with self._arm_lock:
+            start = self.pose
+            duration = motion_duration(start, goal, self.velocity)
+            self._motion = (start, goal, time.monotonic(), duration * self.time_scale)
+            try:
+                await self._sleep(duration)
+            finally:
+                self._motion = None
+            self.pose = goal
+            self.busy_time += duration
+
+    async def _actuate(self, duration: float) -> None:
+        """Tool actions also block the arm"""
+        async with self._arm_lock:
+            await self._sleep(duration)
+            self.busy_time += duration
+
+    """ handlers """
+    async def _calibrate(self, params: list):
+        if params != ["AUTO"] and params != ["MANUAL"]:
+            raise CommandError("Expected AUTO or MANUAL")
+        if self.calibration_needed:
+            await self._actuate(CALIBRATION_DURATION)
+            self.calibration_needed = False
+
+    async def _set_learning_mode(self, params: list):
+        self.learning_mode = parse_bool(params[0])
+
+    async def _move_joints(self, params: list):
+        joints = parse_floats(params, 6)
+        self._check_can_move()
+        async with self._arm_lock:
+            duration = PLANNING_LATENCY + max(abs(j - c) for j, c in zip(joints, self.joints)) / (MAX_ANGULAR_SPEED * max(self.velocity, 1) / 100.)
+            await self._sleep(duration)
+            self.joints = joints
+            self.busy_time += duration
+
+    async def _move_pose(self, params: list):
+        await self._move(parse_floats(params, 6))
+
+    async def _shift_pose(self, params: list):
+        if len(params) != 2 or params[0] not in AXES:
+            raise CommandError("Expected [axis, shift_value]")
+        goal = self.pose
+        goal[AXES.index(params[0])] += parse_floats(params[1:], 1)[0]
+        await self._move(goal)
+
+    async def _set_arm_max_velocity(self, params: list):
+        velocity = int(parse_floats(params, 1)[0])
+        if not 1 <= velocity <= 100:
+            raise CommandError("Velocity must be in [1, 100]")
+        self.velocity = velocity
+
+    async def _enable_joystick(self, params: list):
+        parse_bool(params[0])
+
+    def _pin(self, name: str) -> dict:
+        if name not in self.pins:
+            raise CommandError("Unknown pin {}".format(name))
+        return self.pins[name]
+
+    async def _set_pin_mode(self, params: list):
+        self._pin(params[0])["mode"] = 0 if params[1] == "INPUT" else 1
+
+    async def _digital_write(self, params: list):
+        pin = self._pin(params[0])
+        if pin["mode"] != 1:
+            raise CommandError("Pin {} is not an output".format(params[0]))
+        pin["state"] = 1 if params[1] == "HIGH" else 0
+
+    async def _digital_read(self, params: list):
+        return str(self._pin(params[0])["state"])
+
+    async def _change_tool(self, params: list):
+        self.tool = params[0]
+
+    async def _gripper(self, params: list):
+        if len(params) != 2 or params[0] not in GRIPPERS:
+            raise CommandError("Expected [gripper, speed]")
+        if params[0] != self.tool:
+            raise CommandError("Gripper {} is not the current tool ({})".format(params[0], self.tool))
+        speed = max(int(parse_floats(params[1:], 1)[0]), 1)
+        await self._actuate(GRIPPER_DURATION * min(1000. / speed, 10.))
+
+    async def _vacuum_pump(self, params: list):
+        if params[0] != self.tool:
+            raise CommandError("Vacuum pump {} is not the current tool ({})".format(params[0], self.tool))
+        await self._actuate(TOOL_DURATION)
+
+    async def _electromagnet(self, params: list):
+        if len(params) != 2:
+            raise CommandError("Expected [electromagnet, pin]")
+        self._pin(params[1])
+        await self._actuate(TOOL_DURATION)
+
+    async def _get_joints(self, params: list):
+        return ",".join(repr(j) for j in self.joints)
+
+    async def _get_pose(self, params: list):
+        return ",".join(repr(v) for v in self.pose)
+
+    async def _get_hardware_status(self, params: list):
+        return "34,1,True,'',{},False,{},{},(34, 34, 34, 36, 37, 35),(0.0, 0.0, 0.0, 11.3, 11.2, 7.4),(0, 0, 0, 0, 0, 0)".format(
+            int(self.calibration_needed), MOTOR_NAMES, MOTOR_TYPES)
+
+    async def _get_learning_mode(self, params: list):
+        return str(self.learning_mode).upper()
+
+    async def _get_digital_io_state(self, params: list):
+        return ",".join("[{}, '{}', {}, {}]".format(gpio, name[5:], self.pins[name]["mode"], self.pins[name]["state"])
+            for name, gpio in PINS.items())
+
+    async def _get_img_compressed(self, params: list):
+        if self._image is None:
+            self._image = self.synthetic_image()
+        return self._image
+
+    async def _create_workspace(self, params: list):
+        if len(params) != 25:
+            raise CommandError("25 parameters expected, {} given".format(len(params)))
+        poses = parse_floats(params[1:], 24)
+        self.workspaces[params[0]] = [poses[i:i + 6] for i in range(0, 24, 6)]
+
+    def _workspace(self, name: str) -> List[List[float]]:
+        if name not in self.workspaces:
+            raise CommandError("Workspace {} does not exist".format(name))
+        return self.workspaces[name]
+
+    async def _remove_workspace(self, params: list):
+        self._workspace(params[0])
+        del self.workspaces[params[0]]
+
+    def _pose_from_rel(self, workspace: str, height_offset: float, x_rel: float, y_rel: float, yaw_rel: float) -> List[float]:
+        origin, pose_1, _, pose_3 = self._workspace(workspace)
+        # bilinear position in the workspace, origin and opposite corners define the axes
+        pose = [origin[i] + x_rel * (pose_1[i] - origin[i]) + y_rel * (pose_3[i] - origin[i]) for i in range(3)]
+        pose[2] += height_offset
+        return pose + [0., 1.57, yaw_rel]
+
+    async def _get_target_pose_from_rel(self, params: list):
+        values = parse_floats(params[1:], 4)
+        return ",".join(repr(v) for v in self._pose_from_rel(params[0], *values))
+
+    async def _get_target_pose_from_cam(self, params: list):
+        height_offset = parse_floats(params[1:2], 1)[0]
+        shape, color = self._found_object(params[2], params[3])
+        pose = self._pose_from_rel(params[0], height_offset, 0.5, 0.5, 0.)
+        return "True," + ",".join(repr(v) for v in pose) + ",{},{}".format(shape, color)
+
+    @staticmethod
+    def _found_object(shape: str, color: str) -> Tuple[str, str]:
+        return "CIRCLE" if shape == "ANY" else shape, "RED" if color == "ANY" else color
+
+    async def _detect_object(self, params: list):
+        self._workspace(params[0])
+        shape, color = self._found_object(params[1], params[2])
+        return "True,0.5,0.5,0.0,{},{}".format(shape, color)
+
+    async def _get_current_tool_id(self, params: list):
+        return self.tool
+
+    async def _get_workspace_ratio(self, params: list):
+        self._workspace(params[0])
+        return "1.0"
+
+    async def _get_workspace_list(self, params: list):
+        return ",".join(self.workspaces)
+
+    async def _vision_pick(self, params: list):
+        height_offset = parse_floats(params[1:2], 1)[0]
+        shape, color = self._found_object(params[2], params[3])
+        await self._pick(self._pose_from_rel(params[0], height_offset, 0.5, 0.5, 0.))
+        return "True,{},{}".format(shape, color)
+
+    async def _move_to_object(self, params: list):
+        height_offset = parse_floats(params[1:2], 1)[0]
+        shape, color = self._found_object(params[2], params[3])
+        await self._move(self._pose_from_rel(params[0], height_offset, 0.5, 0.5, 0.))
+        return "True,{},{}".format(shape, color)
+
+    async def _pick(self, pose: List[float]) -> None:
+        """Approach 5cm above, go down, grab, go up"""
+        approach = pose[:2] + [pose[2] + 0.05] + pose[3:]
+        await self._move(approach)
+        await self._move(pose)
+        await self._actuate(GRIPPER_DURATION)
+        await self._move(approach)
+
+    async def _pick_from_pose(self, params: list):
+        await self._pick(parse_floats(params, 6))
+
+    async def _place_from_pose(self, params: list):
+        await self._pick(parse_floats(params, 6))
+
+    def _conveyor(self, conveyor_id: str) -> dict:
+        if conveyor_id not in self.conveyors:
+            raise CommandError("Conveyor {} is not set".format(conveyor_id))
+        return self.conveyors[conveyor_id]
+
+    async def _set_conveyor(self, params: list):
+        if len(params) != 2 or params[0] not in CONVEYOR_IDS:
+            raise CommandError("Expected [conveyor_id, activate]")
+        if parse_bool(params[1]):
+            self.conveyors.setdefault(params[0], {"on": False, "speed": 0, "direction": 1})
+        else:
+            self.conveyors.pop(params[0], None)
+
+    async def _control_conveyor(self, params: list):
+        if len(params) != 4:
+            raise CommandError("Expected [conveyor_id, control_on, speed, direction]")
+        conveyor = self._conveyor(params[0])
+        speed = int(parse_floats(params[2:3], 1)[0])
+        if not 0 <= speed <= 100:
+            raise CommandError("Speed must be in [0, 100]")
+        conveyor.update(on=parse_bool(params[1]), speed=speed, direction=int(params[3]))
+
+    async def _update_conveyor_id(self, params: list):
+        if len(params) != 2 or params[1] not in CONVEYOR_IDS:
+            raise CommandError("Expected [old_id, new_id]")
+        self.conveyors[params[1]] = self.conveyors.pop(params[0], None) or self._conveyor(params[0])
+
+    async def _get_calibration_object(self, params: list):
+        return "True,[[520.0, 0.0, 320.0], [0.0, 520.0, 240.0], [0.0, 0.0, 1.0]],[0.12, -0.25, 0.0, 0.0, 0.1]"
+
+    @staticmethod
+    def synthetic_image(width: int=640, height: int=480) -> bytes:
+        """JPEG image of a gradient, random bytes if opencv is not installed"""
+        try:
+            import cv2
+            import numpy as np
+        except ImportError:
+            import os
+            return os.urandom(width * height // 10)
+        gradient = np.linspace(0, 255, width, dtype=np.uint8)
+        image = np.dstack([np.tile(gradient, (height, 1))] * 3)
+        cv2.circle(image, (width // 2, height // 2), height // 6, (0, 0, 255), -1)
+        return cv2.imencode(".jpg", image)[1].tobytes()
+
+    """ protocol """
+    async def handle_packet(self, packet: str) -> bytes:
+        """Execute one packet and return the formated answer"""
+        name, _, raw_params = packet.partition(":")
+        params = raw_params.split(",") if raw_params else []
+        self.commands[name] = self.commands.get(name, 0) + 1
+        await self._sleep(self.command_latency)
+        handler = self._handlers.get(name)
+        if handler is None:
+            return "{}:KO,Unknown command".format(name).encode()
+        try:
+            data = await handler(params)
+        except (CommandError, ValueError, IndexError) as e:
+            return "{}:KO,{}".format(name, e).encode()
+        if name in self._long_answers:
+            payload = data if isinstance(data, bytes) else data.encode()
+            return "{}:OK,{},".format(name, len(payload)).encode() + payload
+        answer = "{}:OK".format(name)
+        return (answer if data is None else "{},{}".format(answer, data)).encode()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients.add(writer)
+        try:
+            while True:
+                packet = await reader.read(1024)
+                if not packet:
+                    break
+                answer = await self.handle_packet(packet.decode())
+                if self.split_delay is not None:
+                    writer.write(answer[:len(answer) // 2])
+                    await writer.drain()
+                    await asyncio.sleep(self.split_delay)
+                    answer = answer[len(answer) // 2:]
+                writer.write(answer)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def start(self) -> None:
+        """Start listening, the bound port is stored in ``port``"""
+        self._arm_lock = asyncio.Lock()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        print("[SIM] Mock niryo server listening on {}:{}".format(self.host, self.port))
+        await self._server.serve_forever()
+
+    def start_in_thread(self) -> "MockNiryoServer":
+        """Run the server in its own event loop and thread, return once it is listening"""
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def serve():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="mock-niryo", daemon=True)
+        self._thread.start()
+        ready.wait()
+        print("[SIM] Mock niryo server listening on {}:{}".format(self.host, self.port))
+        return self
+
+    def stop_thread(self) -> None:
+        """Stop a server started with ``start_in_thread``"""
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Mock NiryoOne tcp server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=40001)
+    parser.add_argument("--time-scale", type=float, default=1., help="factor applied to the motion durations")
+    args = parser.parse_args()
+    asyncio.run(MockNiryoServer(args.host, args.port, args.time_scale).serve_forever())
@@ -13,9 +13,13 @@ def init_var():
     global APP 
     global app_thread
     global NIRYO
+    global VIDEO
+    global REGISTRY
     global API_PORT
 
     APP = None
     app_thread = None
     NIRYO = None
+    VIDEO = None
+    REGISTRY = None
     API_PORT = 4000